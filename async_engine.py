@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any
+
+from requests.adapters import HTTPAdapter
+
+from scraper import fetch_new_items_for_group, group_profiles_by_query, get_group_label, commit_group_fingerprint
+from utils import HostRateLimiter
+from proxy_pool import ProxyPool
+from keyword_matcher import KeywordMatcher
+from circuit_breaker import HostCircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+# Callback dostane (profile_config, new_items_strings, new_items_data_list, found_ids)
+# a vrací True, pokud byly u profilu nové nálezy.
+ProfileResultCallback = Callable[[Dict[str, Any], list, list, set], bool]
+# Callback dostane profile_config, jehož dotaz se nepodařil (vyčerpané pokusy, otevřený jistič, chyba).
+ProfileFailureCallback = Callable[[Dict[str, Any]], None]
+
+
+def ensure_connection_pool(session, pool_size: int):
+    """Připojí ke session (u ProxyPool ke všem jeho session) HTTP adaptér s dostatečně velkým poolem spojení pro paralelní dotazy."""
+    for http_session in (session.sessions if isinstance(session, ProxyPool) else [session]):
+        if getattr(http_session, "_vinted_pool_size", 0) >= pool_size:
+            continue
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        http_session.mount("https://", adapter)
+        http_session.mount("http://", adapter)
+        http_session._vinted_pool_size = pool_size
+        logger.debug(f"Session používá sdílený pool spojení o velikosti {pool_size}.")
+
+
+async def _poll_group(loop, executor, semaphore, session, group, rate_limiter, keyword_matcher, circuit_breaker, on_profile_result, on_profile_failure) -> bool:
+    group_label = get_group_label(group)
+    async with semaphore:
+        try:
+            group_results = await loop.run_in_executor(executor, fetch_new_items_for_group, session, group, rate_limiter, keyword_matcher, circuit_breaker)
+        except Exception as e:
+            logger.error(f"Profil '{group_label}': Neočekávaná chyba v asynchronním pollingu: {e}", exc_info=True)
+            group_results = [(profile_config, None) for profile_config in group["profiles"]]
+    # Zpracování výsledků běží ve vlákně event loopu, tedy sériově (zápis nálezů, Telegram, seen_ids).
+    any_new, all_handled = False, True
+    for profile_config, profile_results in group_results:
+        if profile_results is None:
+            if on_profile_failure:
+                on_profile_failure(profile_config)
+            continue
+        try:
+            if on_profile_result(profile_config, *profile_results):
+                any_new = True
+        except Exception as e:
+            all_handled = False
+            logger.error(f"Profil '{profile_config.get('name', 'N/A')}': Chyba při zpracování výsledků: {e}", exc_info=True)
+    if all_handled: # Jinak se odpověď příště zpracuje znovu celá
+        commit_group_fingerprint(group)
+    return any_new
+
+
+async def poll_profiles_concurrently(
+    session,
+    profiles: List[Dict[str, Any]],
+    on_profile_result: ProfileResultCallback,
+    max_concurrency: int = 8,
+    rate_limiter: HostRateLimiter = None,
+    keyword_matcher: KeywordMatcher = None,
+    circuit_breaker: HostCircuitBreaker = None,
+    on_profile_failure: ProfileFailureCallback = None,
+) -> bool:
+    max_concurrency = max(1, int(max_concurrency))
+    ensure_connection_pool(session, max_concurrency)
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    query_groups = group_profiles_by_query(profiles)
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="vinted-poll") as executor:
+        results = await asyncio.gather(*[
+            _poll_group(loop, executor, semaphore, session, group, rate_limiter, keyword_matcher, circuit_breaker, on_profile_result, on_profile_failure)
+            for group in query_groups
+        ])
+    return any(results)
+
+
+def run_profiles_async(
+    session,
+    profiles: List[Dict[str, Any]],
+    on_profile_result: ProfileResultCallback,
+    max_concurrency: int = 8,
+    rate_limiter: HostRateLimiter = None,
+    keyword_matcher: KeywordMatcher = None,
+    circuit_breaker: HostCircuitBreaker = None,
+    on_profile_failure: ProfileFailureCallback = None,
+) -> bool:
+    """Zpracuje všechny profily jednoho cyklu paralelně (profily se stejným dotazem sdílí jeden request). Vrací True, pokud byl nalezen aspoň jeden nový předmět."""
+    return asyncio.run(poll_profiles_concurrently(session, profiles, on_profile_result, max_concurrency, rate_limiter, keyword_matcher, circuit_breaker, on_profile_failure))
@@ -0,0 +1,91 @@
+"""Mikro-benchmark: scraper.check_keywords vs. KeywordMatcher na titulcích z new_finds.jsonl.
+
+Spuštění z kořene repozitáře:
+    python benchmarks/bench_keyword_matcher.py [--profiles 40] [--repeat 5]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import timeit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from scraper import check_keywords  # noqa: E402
+from keyword_matcher import KeywordMatcher  # noqa: E402
+
+SAMPLE_FILTERS = [
+    {"exclude_keywords": ["tričko"], "keywords_case_sensitive": False},
+    {"must_have_keywords": ["carhartt", "jacket"], "exclude_keywords": ["kids", "dětská"]},
+    {"must_have_keywords": [["supreme", "palace"], ["tee", "t-shirt", "tričko"]]},
+    {"must_have_keywords": ["Nike"], "keywords_case_sensitive": True},
+    {"must_have_keywords": [["active", "detroit"]], "exclude_keywords": ["fake", "replika", "  "]},
+    {},
+]
+
+
+def load_titles(path):
+    titles = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                titles.append(json.loads(line).get("title", ""))
+    return titles
+
+
+def build_profiles(count, profiles_path):
+    base_filters = list(SAMPLE_FILTERS)
+    if os.path.exists(profiles_path):
+        with open(profiles_path, 'r', encoding='utf-8') as f:
+            base_filters += [p.get("filters", {}) for p in json.load(f) if isinstance(p, dict)]
+    return [{"name": f"bench-{i}", "filters": base_filters[i % len(base_filters)]} for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--finds", default=os.path.join(ROOT_DIR, "new_finds.jsonl"))
+    parser.add_argument("--profiles-file", default=os.path.join(ROOT_DIR, "user_profiles.json"))
+    parser.add_argument("--profiles", type=int, default=40, help="Počet profilů sdílejících stejné titulky.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    titles = load_titles(args.finds)
+    profiles = build_profiles(args.profiles, args.profiles_file)
+    names = [p["name"] for p in profiles]
+    matcher = KeywordMatcher(profiles)
+
+    mismatches = 0
+    for title in titles:
+        matched = matcher.match(title, names)
+        for p in profiles:
+            if matched[p["name"]] != check_keywords(title, p["filters"]):
+                mismatches += 1
+    if mismatches:
+        print(f"CHYBA: {mismatches} rozdílných výsledků oproti check_keywords!")
+        sys.exit(1)
+
+    def run_check_keywords():
+        for title in titles:
+            for p in profiles:
+                check_keywords(title, p["filters"])
+
+    def run_matcher():
+        for title in titles:
+            matcher.match(title, names)
+
+    t_old = min(timeit.repeat(run_check_keywords, number=1, repeat=args.repeat))
+    t_new = min(timeit.repeat(run_matcher, number=1, repeat=args.repeat))
+    t_compile = min(timeit.repeat(lambda: KeywordMatcher(profiles), number=1, repeat=args.repeat))
+    evaluations = len(titles) * len(profiles)
+    print(f"Titulků: {len(titles)}, profilů: {len(profiles)}, vyhodnocení: {evaluations} (výsledky shodné)")
+    print(f"check_keywords : {t_old * 1000:8.2f} ms ({t_old / evaluations * 1e6:.2f} µs / vyhodnocení)")
+    print(f"KeywordMatcher : {t_new * 1000:8.2f} ms ({t_new / evaluations * 1e6:.2f} µs / vyhodnocení)")
+    print(f"Kompilace      : {t_compile * 1000:8.2f} ms (jednou při načtení profilů)")
+    print(f"Zrychlení      : {t_old / t_new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Benchmark logování na horké cestě scraperu (log_facade vs. f-string přes logging).
+
+Porovná per-položkový debug výpis ve dvou podobách - dřívější f-string (zpráva se
+sestaví vždy, i když se debug nezapisuje) a StructLogger s %-argumenty - a změří
+scraper.resolve_item_timestamp na syntetických položkách. Kromě času počítá vytvořené
+LogRecordy a volání __str__ na argumentech, takže při INFO musí u facade vyjít nula
+formátování na položku.
+
+Spuštění z kořene repozitáře:
+    python benchmarks/bench_logging.py [--items 200000] [--level INFO]
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import scraper  # noqa: E402
+from log_facade import get_logger, DeferredQueueHandler, build_formatter  # noqa: E402
+from fake_vinted_server import load_templates, raw_item_from_template  # noqa: E402
+
+
+class StrProbe:
+    """Argument logu, který počítá, kolikrát byl převeden na text."""
+
+    calls = 0
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self) -> str:
+        StrProbe.calls += 1
+        return str(self.value)
+
+    def __format__(self, spec: str) -> str: # f-string volá __format__, ne __str__
+        return format(str(self), spec)
+
+
+class RecordCounter:
+    """Továrna LogRecordů, která je počítá (obalí výchozí logging.getLogRecordFactory())."""
+
+    def __init__(self):
+        self.original = logging.getLogRecordFactory()
+        self.records = 0
+
+    def __call__(self, *args, **kwargs):
+        self.records += 1
+        return self.original(*args, **kwargs)
+
+
+def setup_logging(level: str) -> logging.handlers.QueueListener:
+    """Stejné zapojení jako main.py (fronta + listener), výstup jde do os.devnull."""
+    log_queue = queue.SimpleQueue()
+    output = logging.StreamHandler(open(os.devnull, "w", encoding="utf-8"))
+    output.setFormatter(build_formatter("text"))
+    listener = logging.handlers.QueueListener(log_queue, output)
+    root = logging.getLogger()
+    root.handlers[:] = [DeferredQueueHandler(log_queue)]
+    root.setLevel(getattr(logging, level))
+    listener.start()
+    return listener
+
+
+def build_items(count: int) -> list:
+    templates = load_templates()
+    started_ts = int(time.time())
+    return [raw_item_from_template(templates[i % len(templates)], 7_000_000_000 + i, started_ts - i) for i in range(count)]
+
+
+def measure(label: str, func, items: list, counter: RecordCounter) -> dict:
+    StrProbe.calls, records_before = 0, counter.records
+    started_at = time.perf_counter()
+    for item in items:
+        func(item)
+    seconds = time.perf_counter() - started_at
+    result = {
+        "case": label,
+        "ns_per_item": round(seconds / len(items) * 1e9, 1),
+        "records_per_item": round((counter.records - records_before) / len(items), 3),
+        "str_calls_per_item": round(StrProbe.calls / len(items), 3),
+    }
+    print(f"  {label:<34} {result['ns_per_item']:>9.1f} ns/položku  LogRecordy {result['records_per_item']:>5}  __str__ {result['str_calls_per_item']:>5}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--level", default="INFO", choices=("DEBUG", "INFO", "WARNING"))
+    args = parser.parse_args()
+
+    listener = setup_logging(args.level)
+    counter = RecordCounter()
+    logging.setLogRecordFactory(counter)
+    std_logger = logging.getLogger("bench.stdlib")
+    facade_logger = get_logger("bench.facade")
+    items = build_items(args.items)
+
+    def eager_fstring(item):
+        std_logger.debug(f"Item ID {item['id']}: Finální TS = {StrProbe(item['photo'])}, Titulek = {item['title'][:30]}")
+
+    def facade_lazy(item):
+        facade_logger.debug("Item ID %s: Finální TS = %s, Titulek = %.30s", item['id'], StrProbe(item['photo']), item['title'])
+
+    print(f"{args.items} položek, úroveň {args.level}:")
+    try:
+        results = [
+            measure("f-string + logging.debug", eager_fstring, items, counter),
+            measure("StructLogger.debug (%-argumenty)", facade_lazy, items, counter),
+            measure("scraper.resolve_item_timestamp", scraper.resolve_item_timestamp, items, counter),
+        ]
+    finally:
+        logging.setLogRecordFactory(counter.original)
+        listener.stop()
+    if args.level != "DEBUG" and (results[1]["records_per_item"] or results[1]["str_calls_per_item"]):
+        print("Pozor: facade při vypnutém debug logu formátuje argumenty nebo vytváří záznamy.")
+
+
+if __name__ == "__main__":
+    main()
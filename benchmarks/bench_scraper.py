@@ -0,0 +1,275 @@
+"""Offline benchmark scraperu proti lokální náhradě Vinted API (benchmarks/fake_vinted_server.py).
+
+Spustí server v samostatném procesu (aby nesdílel GIL s měřeným kódem), zahřeje session
+přes get_vinted_session a pro každý počet profilů projde několik cyklů fetch_new_items.
+Vypisuje requesty/s, CPU čas klienta na request, čas zpracování položky (resolve_item_timestamp) a paměť; výsledek
+s hashem commitu lze uložit do JSON a porovnat s během z jiného commitu.
+
+Spuštění z kořene repozitáře:
+    python benchmarks/bench_scraper.py [--profiles 10,100,1000,5000] [--cycles 3] [--latency-ms 0]
+    python benchmarks/bench_scraper.py --output bench_new.json --compare bench_old.json
+    python benchmarks/bench_scraper.py --log-level INFO   # i s logováním přes frontu jako v main.py
+
+Čekání před opakováním requestu (exponential_backoff_sleep) se ve výchozím stavu jen
+započítá bez skutečného spánku; --real-backoff ho ponechá.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import requests  # noqa: E402
+import utils  # noqa: E402
+import scraper  # noqa: E402
+from seen_ids import ensure_seen_id_set  # noqa: E402
+from bench_keyword_matcher import SAMPLE_FILTERS  # noqa: E402
+
+SERVER_SCRIPT = os.path.join(ROOT_DIR, "benchmarks", "fake_vinted_server.py")
+
+
+class ParseTimer:
+    """Obalí zpracování položky ve scraperu (resolve_item_timestamp) a sčítá čas a počet položek."""
+
+    def __init__(self, original):
+        self.original = original
+        self.seconds = 0.0
+        self.items = 0
+
+    def __call__(self, *args, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            return self.original(*args, **kwargs)
+        finally:
+            self.seconds += time.perf_counter() - started_at
+            self.items += 1
+
+
+class BackoffRecorder:
+    """Náhrada exponential_backoff_sleep bez spánku - jen sečte, kolik by se čekalo (bez náhodné složky)."""
+
+    def __init__(self):
+        self.calls = 0
+        self.nominal_seconds = 0.0
+
+    def __call__(self, attempt, base_delay=4, max_delay=240, context="API"):
+        self.calls += 1
+        self.nominal_seconds += min(max_delay, base_delay * (1.8 ** attempt))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args) -> tuple:
+    port = free_port()
+    command = [sys.executable, SERVER_SCRIPT, "--port", str(port), "--latency-ms", str(args.latency_ms),
+               "--latency-jitter-ms", str(args.latency_jitter_ms), "--error-rate", str(args.error_rate),
+               "--error-burst-length", str(args.error_burst_length), "--malformed-rate", str(args.malformed_rate),
+               "--new-items-per-request", str(args.new_items_per_request), "--seed", str(args.seed)]
+    if args.etag:
+        command.append("--etag")
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{base_url}/__stats", timeout=1)
+            return process, base_url
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f"Fake server na {base_url} nenaběhl.")
+
+
+def server_stats(base_url: str) -> dict:
+    return requests.get(f"{base_url}/__stats", timeout=5).json()
+
+
+def build_profiles(count: int, base_url: str) -> list:
+    return [{"name": f"bench-{count}-{i}", "enabled": True,
+             "vinted_url": f"{base_url}/catalog?search_text=bench-{count}-{i}&order=newest_first",
+             "filters": SAMPLE_FILTERS[i % len(SAMPLE_FILTERS)], "seen_ids": []}
+            for i in range(count)]
+
+
+def run_cycle(session, profiles: list) -> int:
+    """Jeden průchod všech profilů jako v main (bez Telegramu a ukládání). Vrací počet nových nálezů."""
+    new_finds = 0
+    for profile_config in profiles:
+        new_strings, _, ids_to_mark = scraper.fetch_new_items(session, profile_config)
+        ensure_seen_id_set(profile_config).update(ids_to_mark)
+        new_finds += len(new_strings)
+    return new_finds
+
+
+def bench_profile_count(count: int, args, base_url: str) -> dict:
+    session_started_at = time.perf_counter()
+    session = scraper.get_vinted_session()
+    session_seconds = time.perf_counter() - session_started_at
+    if session is None:
+        raise RuntimeError("get_vinted_session selhala proti fake serveru.")
+
+    profiles = build_profiles(count, base_url)
+    cycles = []
+    for cycle_index in range(args.cycles):
+        parse_timer = ParseTimer(scraper.resolve_item_timestamp)
+        scraper.resolve_item_timestamp = parse_timer
+        stats_before = server_stats(base_url)
+        started_at, cpu_started_at = time.perf_counter(), time.process_time()
+        try:
+            new_finds = run_cycle(session, profiles)
+        finally:
+            scraper.resolve_item_timestamp = parse_timer.original
+        wall_seconds = time.perf_counter() - started_at
+        cpu_seconds = time.process_time() - cpu_started_at # Server běží v jiném procesu - jen práce klienta
+        stats_after = server_stats(base_url)
+        api_requests = stats_after["api_requests"] - stats_before["api_requests"]
+        cycles.append({
+            "cycle": cycle_index + 1,
+            "wall_seconds": round(wall_seconds, 4),
+            "api_requests": api_requests,
+            "requests_per_second": round(api_requests / wall_seconds, 2) if wall_seconds else None,
+            "client_cpu_seconds": round(cpu_seconds, 4),
+            "items_parsed": parse_timer.items,
+            "parse_us_per_item": round(parse_timer.seconds / parse_timer.items * 1e6, 3) if parse_timer.items else None,
+            "new_finds": new_finds,
+        })
+
+    # Paměť se měří v samostatném cyklu - tracemalloc by zkreslil časy.
+    tracemalloc.start()
+    run_cycle(session, profiles)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    session.close()
+
+    steady = cycles[1:] or cycles # První cyklus zpracovává celé okno, další už jen přírůstky
+    return {
+        "profiles": count,
+        "session_warmup_seconds": round(session_seconds, 4),
+        "cycles": cycles,
+        "steady_requests_per_second": round(sum(c["api_requests"] for c in steady) / sum(c["wall_seconds"] for c in steady), 2),
+        "steady_client_cpu_us_per_request": round(sum(c["client_cpu_seconds"] for c in steady) / max(1, sum(c["api_requests"] for c in steady)) * 1e6, 1),
+        "cold_parse_us_per_item": cycles[0]["parse_us_per_item"],
+        "tracemalloc_peak_mb": round(traced_peak / 1024 / 1024, 2),
+        "seen_ids_mb": round(sum(ensure_seen_id_set(p).nbytes for p in profiles) / 1024 / 1024, 3),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError: # Windows
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1) # Linux hlásí KiB
+
+
+def print_comparison(results: dict, previous: dict):
+    previous_by_count = {r["profiles"]: r for r in previous.get("results", [])}
+    print(f"\nPorovnání s {previous.get('git_commit', '?')}:")
+    previous_params = previous.get("params", {})
+    differing = sorted(k for k, v in results["params"].items() if k != "profiles" and k in previous_params and previous_params[k] != v)
+    if differing:
+        print(f"  Pozor: běhy se liší v parametrech {', '.join(differing)} - čísla nejsou přímo srovnatelná.")
+    for result in results["results"]:
+        old = previous_by_count.get(result["profiles"])
+        if not old:
+            continue
+        for key in ("steady_requests_per_second", "steady_client_cpu_us_per_request", "cold_parse_us_per_item", "tracemalloc_peak_mb"):
+            if old.get(key) and result.get(key) is not None:
+                print(f"  {result['profiles']:>5} profilů  {key:<28} {old[key]:>10} -> {result[key]:>10}  ({(result[key] / old[key] - 1) * 100:+.1f} %)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", default="10,100,1000,5000", help="Čárkou oddělené počty profilů.")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Pravděpodobnost začátku dávky 429/403.")
+    parser.add_argument("--error-burst-length", type=int, default=3)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--new-items-per-request", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--etag", action="store_true", help="Fake server posílá ETag a odpovídá 304.")
+    parser.add_argument("--real-backoff", action="store_true", help="Skutečně čekat při 429/403 (výchozí: jen započítat).")
+    parser.add_argument("--log-level", default="OFF", choices=("OFF", "WARNING", "INFO", "DEBUG"),
+                        help="Logovat přes frontu jako main.py (výstup do os.devnull); OFF = logování vypnuto.")
+    parser.add_argument("--output", help="Uložit výsledky do JSON.")
+    parser.add_argument("--compare", help="JSON z předchozího běhu k porovnání.")
+    args = parser.parse_args()
+    log_listener = None
+    if args.log_level == "OFF":
+        logging.disable(logging.CRITICAL)
+    else:
+        from bench_logging import setup_logging
+        log_listener = setup_logging(args.log_level)
+
+    backoff = None
+    if not args.real_backoff:
+        backoff = scraper.exponential_backoff_sleep = BackoffRecorder()
+
+    process, base_url = start_server(args)
+    utils.DEFAULT_VINTED_BASE_URL = base_url # get_vinted_session zahřívá session na této adrese
+    try:
+        results = []
+        for count in (int(c) for c in args.profiles.split(",") if c.strip()):
+            result = bench_profile_count(count, args, base_url)
+            results.append(result)
+            last = result["cycles"][-1]
+            print(f"{count:>5} profilů: {result['steady_requests_per_second']:>8.1f} req/s, "
+                  f"CPU klienta {result['steady_client_cpu_us_per_request']:.0f} µs/request, "
+                  f"parse {result['cold_parse_us_per_item'] or 0:.1f} µs/položku, "
+                  f"nálezy v posledním cyklu {last['new_finds']}, tracemalloc peak {result['tracemalloc_peak_mb']} MB, "
+                  f"seen_ids {result['seen_ids_mb']} MB")
+        stats = server_stats(base_url)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        if log_listener:
+            log_listener.stop()
+
+    report = {
+        "git_commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "requests_version": requests.__version__,
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": results,
+        "server_stats": stats,
+        "backoff": {"calls": backoff.calls, "nominal_seconds": round(backoff.nominal_seconds, 1)} if backoff else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(f"Server: {stats['api_requests']} API requestů, chyby {stats['errors']}, poškozený JSON {stats['malformed']}, "
+          f"304 {stats.get('not_modified', 0)}; peak RSS {report['peak_rss_mb']} MB")
+    if backoff and backoff.calls:
+        print(f"Backoff: {backoff.calls}x, nominálně {backoff.nominal_seconds:.0f} s čekání (přeskočeno)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Výsledky uloženy do {args.output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Lokální náhrada Vinted API pro offline benchmarky.
+
+Emuluje `/`, `/catalog` (HTML + cookie pro zahřátí session) a `/api/v2/catalog/items`.
+Položky katalogu se generují podle tvaru záznamů v new_finds.jsonl (titulek, cena,
+značka, velikost, fotka s timestampem); každý dotaz (search_text) má vlastní proud
+položek s rostoucími ID. Lze přidat latenci, dávky odpovědí 429/403 a poškozený JSON;
+s --etag server posílá ETag a na shodný If-None-Match odpoví 304.
+
+Samostatné spuštění:
+    python benchmarks/fake_vinted_server.py --port 8765 --latency-ms 50 --error-rate 0.02
+
+Počítadla requestů/chyb vrací GET /__stats (JSON).
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TEMPLATE_FINDS = os.path.join(ROOT_DIR, "new_finds.jsonl")
+
+FALLBACK_TEMPLATES = [
+    {"title": "Carhartt active jacket", "price_str": "1500.0", "currency": "CZK", "status": "Velmi dobrý", "size": "M", "brand": "Carhartt"},
+    {"title": "Nike tričko", "price_str": "250.0", "currency": "CZK", "status": "Nový s visačkou", "size": "L", "brand": "Nike"},
+]
+INITIAL_HISTORY = 1000
+ID_SPACE_PER_QUERY = 10_000_000
+
+
+def load_templates(path: str = DEFAULT_TEMPLATE_FINDS) -> list:
+    templates = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    try: templates.append(json.loads(line))
+                    except json.JSONDecodeError: pass
+    return templates or list(FALLBACK_TEMPLATES)
+
+
+def raw_item_from_template(template: dict, item_id: int, created_ts: int) -> dict:
+    """Surová položka ve tvaru odpovědi /api/v2/catalog/items (opak VintedItem / scraper.extract_item_details)."""
+    title = template.get("title", "N/A")
+    slug = "-".join(title.lower().split())[:60]
+    photo_url = f"https://images1.vinted.net/t/bench/f800/{created_ts}.jpeg"
+    return {
+        "id": item_id,
+        "title": title,
+        "price": {"amount": str(template.get("price_str", template.get("price_numeric", "100.0"))),
+                  "currency_code": template.get("currency", "CZK")},
+        "status": template.get("status", "N/A"),
+        "size_title": template.get("size", "N/A"),
+        "brand_title": template.get("brand", "N/A"),
+        "url": f"/items/{item_id}-{slug}",
+        "photo": {"url": photo_url, "high_resolution": {"url": photo_url, "timestamp": created_ts}},
+    }
+
+
+class FakeVintedServer:
+    """HTTP server na pozadí; konfigurace se dá měnit i za běhu (atributy)."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, templates: list = None, latency_ms: float = 0.0,
+                 latency_jitter_ms: float = 0.0, error_rate: float = 0.0, error_burst_length: int = 3,
+                 error_statuses=(429, 403), malformed_rate: float = 0.0, new_items_per_request: float = 2.0, seed: int = 1,
+                 etag: bool = False):
+        self.templates = templates or load_templates()
+        self.latency_ms, self.latency_jitter_ms = latency_ms, latency_jitter_ms
+        self.error_rate, self.error_burst_length, self.error_statuses = error_rate, error_burst_length, tuple(error_statuses)
+        self.malformed_rate = malformed_rate
+        self.new_items_per_request = new_items_per_request
+        self.etag = etag
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._streams = {} # search_text -> [první ID, čas vzniku proudu, počet položek]
+        self._next_base_id = 7_000_000_000
+        self._burst_remaining, self._burst_status = 0, None
+        self.stats = {"requests": 0, "api_requests": 0, "items_served": 0, "errors": {}, "malformed": 0, "not_modified": 0}
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeVintedServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-vinted", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"requests": 0, "api_requests": 0, "items_served": 0, "errors": {}, "malformed": 0, "not_modified": 0}
+
+    def _catalog_page(self, search_text: str, per_page: int, page: int) -> list:
+        with self._lock:
+            stream = self._streams.get(search_text)
+            if stream is None: # Nový dotaz - katalog už má historii INITIAL_HISTORY položek
+                self._next_base_id += ID_SPACE_PER_QUERY
+                stream = self._streams[search_text] = [self._next_base_id, int(time.time()), INITIAL_HISTORY]
+            if self.new_items_per_request > 0:
+                stream[2] += int(self._random.expovariate(1.0 / self.new_items_per_request))
+            base_id, start_ts, count = stream
+            seed_base = zlib.crc32(search_text.encode("utf-8")) & 0xFFFF # Stabilní napříč procesy (na rozdíl od hash)
+        items = []
+        newest_index = count - 1 - (page - 1) * per_page
+        for index in range(newest_index, max(-1, newest_index - per_page), -1):
+            # Položka s indexem má v proudu dotazu vždy stejné ID i čas, novější mají vyšší.
+            item_id = base_id + index * 7
+            template = self.templates[(index + seed_base) % len(self.templates)]
+            items.append(raw_item_from_template(template, item_id, start_ts + (index - INITIAL_HISTORY) * 30))
+        return items
+
+    def _pick_failure(self):
+        with self._lock:
+            if self._burst_remaining > 0:
+                self._burst_remaining -= 1
+                return self._burst_status
+            if self.error_rate and self._random.random() < self.error_rate:
+                self._burst_status = self._random.choice(self.error_statuses)
+                self._burst_remaining = self.error_burst_length - 1
+                return self._burst_status
+            if self.malformed_rate and self._random.random() < self.malformed_rate:
+                return "malformed"
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive jako u skutečného serveru
+            disable_nagle_algorithm = True # Hlavičky a tělo jdou zvlášť, s Naglem by každá odpověď čekala na ACK
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str, extra_headers: dict = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (extra_headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                with server._lock:
+                    server.stats["requests"] += 1
+                if parsed.path.startswith("/api/v2/catalog/items"):
+                    self._api(parse_qs(parsed.query))
+                elif parsed.path == "/__stats":
+                    with server._lock:
+                        body = json.dumps(server.stats).encode("utf-8")
+                    self._send(200, body, "application/json")
+                elif parsed.path in ("/", "/catalog"):
+                    self._send(200, b"<html><body>fake vinted</body></html>", "text/html; charset=utf-8",
+                               {"Set-Cookie": "_vinted_fr_session=bench; Path=/"})
+                else:
+                    self._send(404, b"not found", "text/plain")
+
+            def _api(self, query: dict):
+                with server._lock:
+                    server.stats["api_requests"] += 1
+                delay_ms = server.latency_ms + (server._random.uniform(0, server.latency_jitter_ms) if server.latency_jitter_ms else 0)
+                if delay_ms > 0:
+                    time.sleep(delay_ms / 1000.0)
+                failure = server._pick_failure()
+                if isinstance(failure, int):
+                    with server._lock:
+                        server.stats["errors"][str(failure)] = server.stats["errors"].get(str(failure), 0) + 1
+                    self._send(failure, b'{"message": "bench error"}', "application/json")
+                    return
+                per_page = int(query.get("per_page", ["96"])[0])
+                page = int(query.get("page", ["1"])[0])
+                items = server._catalog_page(query.get("search_text", [""])[0], per_page, page)
+                body = json.dumps({"items": items, "pagination": {"current_page": page, "per_page": per_page}}).encode("utf-8")
+                if failure == "malformed":
+                    with server._lock:
+                        server.stats["malformed"] += 1
+                    body = body[: len(body) // 2]
+                elif server.etag:
+                    etag = f'"{zlib.crc32(body):08x}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        with server._lock:
+                            server.stats["not_modified"] += 1
+                        self._send(304, b"", "application/json", {"ETag": etag})
+                        return
+                    with server._lock:
+                        server.stats["items_served"] += len(items)
+                    self._send(200, body, "application/json", {"ETag": etag})
+                    return
+                else:
+                    with server._lock:
+                        server.stats["items_served"] += len(items)
+                self._send(200, body, "application/json")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Pravděpodobnost začátku dávky 429/403.")
+    parser.add_argument("--error-burst-length", type=int, default=3)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--new-items-per-request", type=float, default=2.0, help="Průměrný počet nových položek dotazu mezi dvěma requesty.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--etag", action="store_true", help="Posílat ETag a odpovídat 304 na shodný If-None-Match.")
+    args = parser.parse_args()
+    server = FakeVintedServer(args.host, args.port, latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms,
+                              error_rate=args.error_rate, error_burst_length=args.error_burst_length,
+                              malformed_rate=args.malformed_rate, new_items_per_request=args.new_items_per_request,
+                              seed=args.seed, etag=args.etag).start()
+    print(f"Fake Vinted API běží na {server.base_url} (Ctrl+C ukončí)", flush=True)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
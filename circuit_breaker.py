@@ -0,0 +1,142 @@
+"""Jistič (circuit breaker) pro host Vinted API, sdílený všemi profily.
+
+Při 429 nebo dávce 401/403 se jistič pro host otevře a requesty všech profilů na ten host
+se po dobu cooldownu vůbec neposílají (profil se přeskočí a zkusí se v dalším cyklu).
+Po cooldownu projde jediný zkušební request (half-open): uspěje - jistič se zavře,
+selže - otevře se znovu s dvojnásobným cooldownem. Místo vlastního backoffu každého
+profilu tak celý cyklus čeká nejvýše jeden cooldown.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from metrics import CIRCUIT_STATE, CIRCUIT_OPENS, REQUESTS_SHORT_CIRCUITED
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2} # Hodnota gauge vinted_circuit_state
+MAX_COOLDOWN_SECONDS = 1800
+AUTH_FAILURE_THRESHOLD = 3        # Tolik 401/403 ...
+AUTH_FAILURE_WINDOW_SECONDS = 60  # ... během této doby otevře jistič
+PROBE_TIMEOUT_SECONDS = 60        # Zkušební request bez výsledku (pád vlákna) - pustí se další
+
+
+def retry_after_seconds(value) -> Optional[float]:
+    """Hlavička Retry-After v sekundách (varianta s datem se ignoruje)."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class _HostCircuit:
+    def __init__(self):
+        self.state = CLOSED
+        self.open_until = 0.0      # monotonic
+        self.probe_started_at = 0.0
+        self.trip_count = 0        # Otevření po sobě bez úspěšného zkušebního requestu
+        self.auth_failures = deque()
+
+
+class HostCircuitBreaker:
+    """Stav jističe pro každý host (bezpečné i napříč vlákny async režimu).
+
+    Scraper před requestem volá allow_request(host) a po něm record_response / record_failure.
+    S ProxyPool se nepoužívá - omezení jedné IP tam řeší karanténa konkrétní proxy.
+    """
+
+    def __init__(self, cooldown_seconds: float = 120, max_cooldown_seconds: float = MAX_COOLDOWN_SECONDS):
+        self.set_cooldown(cooldown_seconds, max_cooldown_seconds)
+        self._circuits: Dict[str, _HostCircuit] = {}
+        self._lock = threading.Lock()
+
+    def set_cooldown(self, cooldown_seconds: float, max_cooldown_seconds: float = MAX_COOLDOWN_SECONDS):
+        """Platí pro další otevření jističe; už běžící cooldown se nezkracuje."""
+        self.cooldown_seconds = max(1.0, float(cooldown_seconds))
+        self.max_cooldown_seconds = max(self.cooldown_seconds, float(max_cooldown_seconds))
+
+    def _circuit(self, host: str) -> _HostCircuit:
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = self._circuits[host] = _HostCircuit()
+        return circuit
+
+    def _set_state(self, host: str, circuit: _HostCircuit, state: str):
+        circuit.state = state
+        CIRCUIT_STATE.set(STATE_VALUES[state], host=host)
+
+    def state(self, host: str) -> str:
+        with self._lock:
+            circuit = self._circuits.get(host)
+            return circuit.state if circuit else CLOSED
+
+    def remaining_cooldown(self, host: str) -> float:
+        with self._lock:
+            circuit = self._circuits.get(host)
+            if circuit is None or circuit.state != OPEN:
+                return 0.0
+            return max(0.0, circuit.open_until - time.monotonic())
+
+    def any_open(self) -> bool:
+        """Je některý host v cooldownu (sync smyčka pak nečeká mezi profily zbytečně)?"""
+        now = time.monotonic()
+        with self._lock:
+            return any(c.state == OPEN and c.open_until > now for c in self._circuits.values())
+
+    def allow_request(self, host: str) -> bool:
+        """Smí jít request na host? Po uplynutí cooldownu pustí jediný zkušební request."""
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuit(host)
+            if circuit.state == CLOSED:
+                return True
+            if circuit.state == OPEN and now >= circuit.open_until:
+                self._set_state(host, circuit, HALF_OPEN)
+                circuit.probe_started_at = now
+                logger.info(f"Jistič pro '{host}': cooldown uplynul, posílám zkušební request.")
+                return True
+            if circuit.state == HALF_OPEN and now - circuit.probe_started_at > PROBE_TIMEOUT_SECONDS:
+                circuit.probe_started_at = now
+                return True
+            REQUESTS_SHORT_CIRCUITED.inc(host=host)
+            return False
+
+    def record_response(self, host: str, status_code: int, retry_after=None):
+        """Započte odpověď: 429 jistič otevře hned, 401/403 až dávka; jiná odpověď na zkušební request ho zavře."""
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuit(host)
+            if status_code == 429:
+                self._trip(host, circuit, "429", retry_after_seconds(retry_after))
+            elif status_code in (401, 403):
+                circuit.auth_failures.append(now)
+                while now - circuit.auth_failures[0] > AUTH_FAILURE_WINDOW_SECONDS:
+                    circuit.auth_failures.popleft()
+                if circuit.state == HALF_OPEN or len(circuit.auth_failures) >= AUTH_FAILURE_THRESHOLD:
+                    self._trip(host, circuit, str(status_code))
+            elif circuit.state == HALF_OPEN:
+                self._set_state(host, circuit, CLOSED)
+                circuit.trip_count = 0
+                circuit.auth_failures.clear()
+                logger.info(f"Jistič pro '{host}': zkušební request prošel (status {status_code}), requesty pokračují.")
+
+    def record_failure(self, host: str):
+        """Síťová chyba / timeout: v zavřeném stavu řeší retry scraperu, zkušební request ale neprošel."""
+        with self._lock:
+            circuit = self._circuit(host)
+            if circuit.state == HALF_OPEN:
+                self._trip(host, circuit, "probe_error")
+
+    def _trip(self, host: str, circuit: _HostCircuit, reason: str, retry_after: Optional[float] = None):
+        if circuit.state == OPEN: # Odpověď requestu puštěného ještě před otevřením
+            return
+        circuit.trip_count += 1
+        cooldown = min(self.max_cooldown_seconds, max(retry_after or 0.0, self.cooldown_seconds * 2 ** (circuit.trip_count - 1)))
+        circuit.open_until = time.monotonic() + cooldown
+        circuit.auth_failures.clear()
+        self._set_state(host, circuit, OPEN)
+        CIRCUIT_OPENS.inc(host=host, reason=reason)
+        logger.warning(f"Jistič pro '{host}' otevřen ({reason}): requesty všech profilů stojí {cooldown:.0f}s.")
@@ -0,0 +1,28 @@
+import os
+from typing import Optional
+
+
+class FileChangeWatcher:
+    """Levná kontrola, zda se soubor od minula změnil - jen os.stat (mtime v ns a velikost), bez čtení obsahu.
+
+    Volá se mezi cykly scraperu; změnu pozná i po atomickém přepsání přes os.replace (app.py).
+    Vlastní zápisy backendu (sloučení žurnálu profilů) se také ohlásí - volající pak jen nenajde rozdíl.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._signature = self._stat()
+
+    def _stat(self) -> Optional[tuple]:
+        try:
+            stat_result = os.stat(self.filepath)
+        except OSError: # Soubor (zatím) neexistuje nebo je právě nahrazován
+            return None
+        return stat_result.st_mtime_ns, stat_result.st_size
+
+    def changed(self) -> bool:
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        return signature is not None
@@ -0,0 +1,99 @@
+import logging
+import re
+import unicodedata
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class _FoldTable(dict):
+    """Překladová tabulka pro str.translate, doplňovaná za běhu: znak -> znak bez diakritiky."""
+
+    def __missing__(self, codepoint: int) -> str:
+        decomposed = unicodedata.normalize("NFKD", chr(codepoint))
+        folded = self[codepoint] = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+        return folded
+
+
+_FOLD_TABLE = _FoldTable()
+
+
+def fold_text(text: str) -> str:
+    """Malá písmena bez diakritiky ("Žlutá Bunda" -> "zluta bunda")."""
+    text = str(text).lower()
+    return text if text.isascii() else text.translate(_FOLD_TABLE)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(fold_text(text))
+
+
+class FindsIndex:
+    """Vyhledávací index nad seřazenými nálezy (od nejnovějších), sestavený jednou pro danou verzi dat.
+
+    Invertovaný index token -> pozice v seřazeném seznamu a pozice po profilech. Hledané
+    slovo odpovídá každému tokenu titulku, který ho obsahuje (bez ohledu na diakritiku),
+    více slov musí být v titulku všechna. Pozice jsou vzestupné, takže výsledek je
+    rovnou ve správném pořadí.
+    """
+
+    SEARCH_CACHE_SIZE = 32
+
+    def __init__(self, sorted_finds: List[Dict[str, Any]], version: int = 0, previous: Optional["FindsIndex"] = None):
+        self.finds = sorted_finds
+        self.version = version
+        # Tokeny titulků se při přestavbě přebírají z předchozího indexu (stejné objekty nálezů).
+        previous_tokens = previous._tokens_by_find if previous is not None else {}
+        self._tokens_by_find: Dict[int, List[str]] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._profile_postings: Dict[str, List[int]] = {}
+        for position, find_data in enumerate(sorted_finds):
+            tokens = previous_tokens.get(id(find_data))
+            if tokens is None:
+                tokens = sorted(set(tokenize(find_data.get("title", ""))))
+            self._tokens_by_find[id(find_data)] = tokens
+            for token in tokens:
+                self._postings.setdefault(token, []).append(position)
+            self._profile_postings.setdefault(find_data.get("profile_name_found", "Neznámý"), []).append(position)
+        self._vocabulary = sorted(self._postings)
+        self._search_cache: Dict[Tuple, List[int]] = {}
+
+    @property
+    def profile_names(self) -> List[str]:
+        return sorted(self._profile_postings)
+
+    def _positions_for_term(self, term: str) -> set:
+        positions = set()
+        for token in self._vocabulary:
+            if term in token:
+                positions.update(self._postings[token])
+        return positions
+
+    def search(self, profile_name: Optional[str] = None, search_query: Optional[str] = None) -> List[int]:
+        """Vrátí vzestupné pozice (= pořadí od nejnovějších) nálezů odpovídajících filtru."""
+        terms = tokenize(search_query) if search_query else []
+        cache_key = (profile_name, tuple(terms))
+        cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if not terms:
+            result = list(range(len(self.finds))) if profile_name is None else self._profile_postings.get(profile_name, [])
+        else:
+            candidate_sets = sorted((self._positions_for_term(term) for term in set(terms)), key=len)
+            if profile_name is not None:
+                candidate_sets.insert(0, set(self._profile_postings.get(profile_name, [])))
+            matching = candidate_sets[0].intersection(*candidate_sets[1:])
+            result = sorted(matching)
+
+        if len(self._search_cache) >= self.SEARCH_CACHE_SIZE:
+            self._search_cache.pop(next(iter(self._search_cache)))
+        self._search_cache[cache_key] = result
+        return result
+
+    def page(self, offset: int = 0, limit: int = 100, profile_name: Optional[str] = None,
+             search_query: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        positions = self.search(profile_name, search_query)
+        return [self.finds[position] for position in positions[offset:offset + limit]], len(positions)
@@ -0,0 +1,329 @@
+import argparse
+import bisect
+import logging
+import os
+import sqlite3
+import time
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from finds_index import FindsIndex, tokenize
+from json_codec import loads, dumps, dumps_line, DECODE_ERRORS
+
+logger = logging.getLogger(__name__)
+
+NEW_FINDS_FILENAME = "new_finds.jsonl"
+FINDS_DB_FILENAME = "new_finds.sqlite3"
+FINDS_STORE_BACKENDS = ("jsonl", "sqlite")
+
+
+def sort_finds_key(item):
+    vinted_ts = item.get("vinted_item_timestamp", 0)
+    our_ts = item.get("timestamp_found_unix", 0)
+    if vinted_ts and vinted_ts > 0:
+        return (1, vinted_ts, our_ts)
+    else:
+        return (0, our_ts, 0)
+
+
+def _descending_sort_key(item):
+    # Vzestupné řazení podle tohoto klíče = sestupné podle sort_finds_key (pro bisect.insort).
+    return tuple(-(value or 0) for value in sort_finds_key(item))
+
+
+def _folded_title(title) -> str:
+    # Titulek pro hledání: malá písmena bez diakritiky, tokeny oddělené mezerou.
+    return " ".join(tokenize(title or ""))
+
+
+class JsonlFindsStore:
+    """Původní úložiště nálezů: jeden JSON objekt na řádek v new_finds.jsonl.
+
+    Seřazená kopie pro UI se načítá inkrementálně: refresh() si pamatuje, kolik bajtů
+    souboru už přečetl, a zařadí jen nově připsané řádky. Zkrácení nebo nahrazení
+    souboru (čištění starých nálezů) vede k úplnému načtení.
+    """
+
+    backend = "jsonl"
+    INSORT_MAX_NEW_FINDS = 256 # Víc nových řádků najednou -> extend + sort (Timsort sloučí dva běhy)
+
+    def __init__(self, filepath: str = NEW_FINDS_FILENAME):
+        self.filepath = filepath
+        self._sorted_cache: Optional[List[Dict[str, Any]]] = None
+        self._read_offset = 0
+        self._file_identity = None
+        self.version = 0 # Zvyšuje se při každé změně načtených dat
+        self._index: Optional[FindsIndex] = None
+
+    def add_many(self, finds: List[Dict[str, Any]]):
+        if not finds:
+            return
+        with open(self.filepath, "ab") as f_finds:
+            f_finds.write(b"".join(dumps_line(find_data) for find_data in finds))
+        if self._sorted_cache is not None:
+            self.refresh()
+
+    def iter_finds(self) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(self.filepath):
+            return
+        with open(self.filepath, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield loads(line)
+                except DECODE_ERRORS:
+                    logger.warning(f"Přeskakuji poškozený řádek v {self.filepath}: {line.strip()[:100].decode('utf-8', errors='replace')}")
+
+    def delete_older_than(self, max_age_days: float) -> int:
+        filepath = self.filepath
+        if not os.path.exists(filepath): logger.debug(f"Soubor {filepath} pro pročištění neexistuje."); return 0
+        logger.info(f"Zahajuji pročištění nálezů starších než {max_age_days} dní (dle Vinted času) z {filepath}...")
+        kept_count = 0; removed_count = 0; processed_count = 0
+        now_unix = time.time(); age_limit_seconds = max_age_days * 24 * 60 * 60
+        temp_filepath = filepath + ".tmp"
+        try:
+            with open(filepath, 'rb') as f_in, \
+                 open(temp_filepath, 'wb') as f_out:
+                for line in f_in:
+                    processed_count += 1
+                    try:
+                        find_data = loads(line)
+                        item_vinted_ts = find_data.get("vinted_item_timestamp")
+                        if item_vinted_ts and isinstance(item_vinted_ts, (int, float)) and item_vinted_ts > 0:
+                            if (now_unix - item_vinted_ts) <= age_limit_seconds: f_out.write(line); kept_count += 1
+                            else: removed_count += 1; logger.debug(f"Odstraňuji starý nález (Vinted TS: {item_vinted_ts}): {find_data.get('title', 'N/A')[:30]}")
+                        else:
+                            f_out.write(line); kept_count += 1
+                            if item_vinted_ts == 0: logger.debug(f"Ponechávám nález s TS=0: {find_data.get('title', 'N/A')[:30]}")
+                            else: logger.debug(f"Ponechávám nález s chybějícím/neplatným Vinted TS: {find_data.get('title', 'N/A')[:30]}")
+                    except DECODE_ERRORS: logger.warning(f"Přeskakuji poškozený řádek v {filepath} při čištění: {line.strip().decode('utf-8', errors='replace')}")
+            os.replace(temp_filepath, filepath)
+            self._sorted_cache = None
+            logger.info(f"Pročištění dokončeno. Zpracováno {processed_count} řádků. Odstraněno {removed_count}. Ponecháno {kept_count}.")
+        except IOError as e: logger.error(f"Chyba I/O při pročišťování {filepath}: {e}"); _remove_file_quietly(temp_filepath)
+        except Exception as e_general: logger.error(f"Neočekávaná chyba při pročišťování {filepath}: {e_general}", exc_info=True); _remove_file_quietly(temp_filepath)
+        return removed_count
+
+    def refresh(self):
+        """Dočte řádky připsané od posledního volání; při zkrácení/nahrazení souboru načte vše znovu."""
+        try:
+            file_stat = os.stat(self.filepath)
+        except FileNotFoundError:
+            if self._sorted_cache != []:
+                self._sorted_cache, self._read_offset, self._file_identity = [], 0, None
+                self.version += 1
+            return
+        file_identity = (file_stat.st_dev, file_stat.st_ino)
+        full_reload = (self._sorted_cache is None or file_identity != self._file_identity
+                       or file_stat.st_size < self._read_offset)
+        if full_reload:
+            self._sorted_cache, self._read_offset, self._file_identity = [], 0, file_identity
+            self.version += 1
+        if file_stat.st_size == self._read_offset:
+            return
+
+        with open(self.filepath, "rb") as f:
+            f.seek(self._read_offset)
+            chunk = f.read(file_stat.st_size - self._read_offset)
+        complete_length = chunk.rfind(b"\n") + 1 # Neúplný poslední řádek (zápis právě probíhá) se dočte příště
+        if not complete_length:
+            return
+        self._read_offset += complete_length
+
+        new_finds = []
+        for line in chunk[:complete_length].splitlines():
+            if not line.strip():
+                continue
+            try:
+                new_finds.append(loads(line))
+            except DECODE_ERRORS:
+                logger.warning(f"Přeskakuji poškozený řádek v {self.filepath}: {line.strip()[:100].decode('utf-8', errors='replace')}")
+        if not new_finds:
+            return
+        if full_reload or len(new_finds) > self.INSORT_MAX_NEW_FINDS:
+            self._sorted_cache.extend(new_finds)
+            self._sorted_cache.sort(key=_descending_sort_key)
+        else:
+            for find_data in new_finds:
+                bisect.insort(self._sorted_cache, find_data, key=_descending_sort_key)
+        self.version += 1
+        logger.debug(f"{self.filepath}: načteno {len(new_finds)} nálezů ({'celý soubor' if full_reload else 'přírůstek'}), celkem {len(self._sorted_cache)}.")
+
+    def _sorted_finds(self) -> List[Dict[str, Any]]:
+        if self._sorted_cache is None:
+            self.refresh()
+        return self._sorted_cache
+
+    def _get_index(self) -> FindsIndex:
+        sorted_finds = self._sorted_finds()
+        if self._index is None or self._index.version != self.version:
+            self._index = FindsIndex(sorted_finds, self.version, previous=self._index)
+        return self._index
+
+    def query(self, offset: int = 0, limit: int = 100, profile_name: Optional[str] = None,
+              search_query: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Vrátí (stránka nálezů seřazená od nejnovějších, celkový počet odpovídajících filtru)."""
+        return self._get_index().page(offset, limit, profile_name, search_query)
+
+    def profile_names(self) -> List[str]:
+        return self._get_index().profile_names
+
+    def count(self) -> int:
+        return len(self._sorted_finds())
+
+    def close(self):
+        pass
+
+
+class SqliteFindsStore:
+    """Nálezy v SQLite s indexy na čas Vinted, profil a ID položky.
+
+    Zápisy jsou dávkové (jedna transakce na cyklus), čištění je jeden indexovaný DELETE
+    a UI čte po stránkách přes query().
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, filepath: str = FINDS_DB_FILENAME, import_jsonl_from: Optional[str] = NEW_FINDS_FILENAME):
+        self.filepath = filepath
+        self._conn = sqlite3.connect(filepath, timeout=30, check_same_thread=False) # Streamlit může volat z různých vláken
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        if import_jsonl_from:
+            self.import_jsonl(import_jsonl_from)
+
+    def _create_schema(self):
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS finds (
+                    item_id INTEGER,
+                    profile_name_found TEXT,
+                    vinted_item_timestamp INTEGER,
+                    timestamp_found_unix REAL,
+                    title_lower TEXT, -- titulek pro hledání (bez diakritiky, viz _folded_title)
+                    sort_rank INTEGER,
+                    sort_ts REAL,
+                    sort_ts2 REAL,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_finds_vinted_ts ON finds (vinted_item_timestamp);
+                CREATE INDEX IF NOT EXISTS idx_finds_profile ON finds (profile_name_found, sort_rank, sort_ts, sort_ts2);
+                CREATE INDEX IF NOT EXISTS idx_finds_item_id ON finds (item_id);
+                CREATE INDEX IF NOT EXISTS idx_finds_sort ON finds (sort_rank, sort_ts, sort_ts2);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """)
+
+    @staticmethod
+    def _row_values(find_data: Dict[str, Any]) -> tuple:
+        sort_rank, sort_ts, sort_ts2 = sort_finds_key(find_data)
+        item_id = find_data.get("id")
+        return (
+            item_id if isinstance(item_id, int) else None,
+            find_data.get("profile_name_found"),
+            find_data.get("vinted_item_timestamp"),
+            find_data.get("timestamp_found_unix"),
+            _folded_title(str(find_data.get("title", ""))),
+            sort_rank, sort_ts, sort_ts2,
+            dumps(find_data),
+        )
+
+    def add_many(self, finds: Iterable[Dict[str, Any]]):
+        rows = [self._row_values(find_data) for find_data in finds]
+        if not rows:
+            return
+        with self._conn:
+            self._conn.executemany("INSERT INTO finds VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def import_jsonl(self, jsonl_filepath: str) -> int:
+        """Jednorázový import z new_finds.jsonl (provede se jen jednou pro danou databázi)."""
+        if self._conn.execute("SELECT 1 FROM meta WHERE key = 'jsonl_imported'").fetchone():
+            return 0
+        source = JsonlFindsStore(jsonl_filepath)
+        imported_count, batch = 0, []
+        for find_data in source.iter_finds():
+            batch.append(find_data)
+            if len(batch) >= 5000:
+                self.add_many(batch); imported_count += len(batch); batch = []
+        self.add_many(batch); imported_count += len(batch)
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('jsonl_imported', ?)", (str(time.time()),))
+        if imported_count:
+            logger.info(f"Importováno {imported_count} nálezů z '{jsonl_filepath}' do '{self.filepath}'.")
+        return imported_count
+
+    def export_jsonl(self, jsonl_filepath: str) -> int:
+        """Export všech nálezů do JSONL (formát shodný s new_finds.jsonl), atomicky."""
+        temp_filepath = jsonl_filepath + ".tmp"
+        exported_count = 0
+        with open(temp_filepath, "w", encoding="utf-8") as f_out:
+            for (data,) in self._conn.execute("SELECT data FROM finds ORDER BY rowid"):
+                f_out.write(data + "\n"); exported_count += 1
+        os.replace(temp_filepath, jsonl_filepath)
+        return exported_count
+
+    def iter_finds(self) -> Iterator[Dict[str, Any]]:
+        for (data,) in self._conn.execute("SELECT data FROM finds ORDER BY rowid"):
+            yield loads(data)
+
+    def delete_older_than(self, max_age_days: float) -> int:
+        age_limit_ts = time.time() - max_age_days * 24 * 60 * 60
+        with self._conn:
+            cursor = self._conn.execute("DELETE FROM finds WHERE vinted_item_timestamp > 0 AND vinted_item_timestamp < ?", (age_limit_ts,))
+        logger.info(f"Pročištění nálezů starších než {max_age_days} dní v '{self.filepath}' dokončeno. Odstraněno {cursor.rowcount}.")
+        return cursor.rowcount
+
+    def refresh(self):
+        pass # Každý dotaz čte aktuální data z databáze
+
+    def query(self, offset: int = 0, limit: int = 100, profile_name: Optional[str] = None,
+              search_query: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        conditions, params = [], []
+        if profile_name is not None:
+            conditions.append("profile_name_found = ?"); params.append(profile_name)
+        for term in set(tokenize(search_query or "")): # Stejná sémantika jako FindsIndex: všechna slova, bez diakritiky
+            conditions.append("instr(title_lower, ?) > 0"); params.append(term)
+        where_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        total = self._conn.execute(f"SELECT COUNT(*) FROM finds {where_sql}", params).fetchone()[0]
+        rows = self._conn.execute(
+            f"SELECT data FROM finds {where_sql} ORDER BY sort_rank DESC, sort_ts DESC, sort_ts2 DESC LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        return [loads(data) for (data,) in rows], total
+
+    def profile_names(self) -> List[str]:
+        return sorted(name if name is not None else "Neznámý" for (name,) in self._conn.execute("SELECT DISTINCT profile_name_found FROM finds"))
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM finds").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+def _remove_file_quietly(filepath):
+    if os.path.exists(filepath):
+        try: os.remove(filepath)
+        except OSError: pass
+
+
+def get_finds_store(backend: str = "jsonl", jsonl_filepath: str = NEW_FINDS_FILENAME, db_filepath: str = FINDS_DB_FILENAME):
+    if str(backend).lower() == "sqlite":
+        return SqliteFindsStore(db_filepath, import_jsonl_from=jsonl_filepath)
+    return JsonlFindsStore(jsonl_filepath)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Import/export nálezů mezi new_finds.jsonl a SQLite úložištěm.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("--jsonl", default=NEW_FINDS_FILENAME)
+    parser.add_argument("--db", default=FINDS_DB_FILENAME)
+    args = parser.parse_args()
+    if args.command == "import":
+        store = SqliteFindsStore(args.db, import_jsonl_from=args.jsonl)
+        print(f"V databázi '{args.db}' je {store.count()} nálezů.")
+    else:
+        store = SqliteFindsStore(args.db, import_jsonl_from=None)
+        print(f"Exportováno {store.export_jsonl(args.jsonl)} nálezů do '{args.jsonl}'.")
+    store.close()
@@ -0,0 +1,159 @@
+"""Jednotná vrstva pro JSON: msgspec nebo orjson, pokud jsou nainstalované, jinak standardní json.
+
+Výběr lze vynutit proměnnou prostředí VINTED_JSON_BACKEND (msgspec / orjson / json),
+např. pro srovnání v benchmarku. Všechny varianty čtou str i bytes a zapisují UTF-8
+bez escapování diakritiky; JSONL řádky se kódují rovnou do bytes.
+"""
+import json
+import logging
+import os
+from typing import Any, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+_REQUESTED_BACKEND = os.environ.get("VINTED_JSON_BACKEND", "").strip().lower()
+
+msgspec = orjson = None
+if _REQUESTED_BACKEND in ("", "msgspec"):
+    try:
+        import msgspec
+    except ImportError:
+        msgspec = None
+if msgspec is None and _REQUESTED_BACKEND in ("", "orjson"):
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+
+BACKEND = "msgspec" if msgspec is not None else "orjson" if orjson is not None else "json"
+
+# Chyby dekódování všech variant (orjson.JSONDecodeError je podtřída json.JSONDecodeError).
+DECODE_ERRORS: tuple = (json.JSONDecodeError, UnicodeDecodeError) + ((msgspec.DecodeError,) if msgspec is not None else ())
+
+if BACKEND == "msgspec":
+    _encoder = msgspec.json.Encoder()
+    _decoder = msgspec.json.Decoder()
+
+    def loads(data: Union[str, bytes]) -> Any:
+        return _decoder.decode(data)
+
+    def dumps_bytes(obj: Any, indent: int = None) -> bytes:
+        encoded = _encoder.encode(obj)
+        return msgspec.json.format(encoded, indent=indent) if indent else encoded
+
+elif BACKEND == "orjson":
+    def loads(data: Union[str, bytes]) -> Any:
+        return orjson.loads(data)
+
+    def dumps_bytes(obj: Any, indent: int = None) -> bytes:
+        # orjson umí jen odsazení 2 mezerami - pro čitelnost souboru to stačí.
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0))
+
+else:
+    def loads(data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+    def dumps_bytes(obj: Any, indent: int = None) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, indent=indent).encode("utf-8")
+
+
+def dumps(obj: Any, indent: int = None) -> str:
+    return dumps_bytes(obj, indent).decode("utf-8")
+
+
+def dumps_line(obj: Any) -> bytes:
+    """Jeden JSONL řádek včetně konce řádku."""
+    return dumps_bytes(obj) + b"\n"
+
+
+def load_file(filepath: str) -> Any:
+    with open(filepath, "rb") as f:
+        return loads(f.read())
+
+
+def dump_file(obj: Any, filepath: str, indent: int = 4):
+    with open(filepath, "wb") as f:
+        f.write(dumps_bytes(obj, indent))
+
+
+# --- Odpověď /api/v2/catalog/items ---
+
+if BACKEND == "msgspec":
+    class _ApiStruct(msgspec.Struct, gc=False):
+        """Položka odpovědi s rozhraním slovníku (get / []), aby ji scraper četl stejně jako dict."""
+
+        def get(self, key: str, default: Any = None) -> Any:
+            value = getattr(self, key, msgspec.UNSET)
+            return default if value is msgspec.UNSET else value
+
+        def __getitem__(self, key: str) -> Any:
+            value = getattr(self, key, msgspec.UNSET)
+            if value is msgspec.UNSET:
+                raise KeyError(key)
+            return value
+
+    class HighResolutionPhoto(_ApiStruct, gc=False):
+        url: Any = msgspec.UNSET
+        timestamp: Any = msgspec.UNSET
+
+    class ItemPhoto(_ApiStruct, gc=False):
+        url: Any = msgspec.UNSET
+        high_resolution: Union[HighResolutionPhoto, None, msgspec.UnsetType] = msgspec.UNSET
+
+    class ItemPrice(_ApiStruct, gc=False):
+        amount: Any = msgspec.UNSET
+        currency: Any = msgspec.UNSET
+        currency_code: Any = msgspec.UNSET
+
+    class CatalogItem(_ApiStruct, gc=False):
+        """Jen pole, která scraper čte; ostatní pole odpovědi se při dekódování přeskočí."""
+        id: Any = msgspec.UNSET
+        title: Any = msgspec.UNSET
+        price: Union[str, ItemPrice, None, msgspec.UnsetType] = msgspec.UNSET
+        currency: Any = msgspec.UNSET
+        status: Any = msgspec.UNSET
+        size_title: Any = msgspec.UNSET
+        brand_title: Any = msgspec.UNSET
+        url: Any = msgspec.UNSET
+        photo: Union[ItemPhoto, None, msgspec.UnsetType] = msgspec.UNSET
+        created_at_ts: Any = msgspec.UNSET
+        created_at: Any = msgspec.UNSET
+
+    class CatalogResponse(msgspec.Struct, gc=False):
+        items: List[CatalogItem] = []
+
+    class CatalogItemId(msgspec.Struct, gc=False):
+        id: Any = None
+
+    class CatalogIdsResponse(msgspec.Struct, gc=False):
+        items: List[CatalogItemId] = []
+
+    _catalog_decoder = msgspec.json.Decoder(CatalogResponse)
+    _catalog_ids_decoder = msgspec.json.Decoder(CatalogIdsResponse)
+    MAPPING_TYPES: tuple = (dict, _ApiStruct)
+
+    def decode_catalog_items(content: Union[str, bytes]) -> list:
+        """Položky katalogu přímo jako typované struktury (CatalogItem)."""
+        try:
+            return _catalog_decoder.decode(content).items
+        except msgspec.ValidationError as e:
+            # Neočekávaný tvar (např. cena jako číslo) - radši obecné dekódování než ztráta odpovědi.
+            logger.debug(f"Odpověď katalogu neodpovídá CatalogItem ({e}), dekóduji obecně.")
+            return loads(content).get("items", [])
+
+    def decode_catalog_ids(content: Union[str, bytes]) -> Optional[list]:
+        """Jen ID položek v pořadí odpovědi - ostatní pole se přeskočí bez vytváření objektů."""
+        try:
+            return [item.id for item in _catalog_ids_decoder.decode(content).items]
+        except (msgspec.ValidationError, msgspec.DecodeError):
+            return None
+
+else:
+    MAPPING_TYPES: tuple = (dict,)
+
+    def decode_catalog_items(content: Union[str, bytes]) -> list:
+        return loads(content).get("items", [])
+
+    def decode_catalog_ids(content: Union[str, bytes]) -> Optional[list]:
+        """Bez msgspec není částečné dekódování levnější než plné - ID se vezmou až z decode_catalog_items."""
+        return None
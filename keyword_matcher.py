@@ -0,0 +1,172 @@
+import logging
+from collections import deque
+from typing import Dict, Any, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AhoCorasick:
+    """Automat Aho-Corasick: jeden průchod textem najde všechny obsažené vzory (podřetězce)."""
+
+    # Pro malý počet vzorů je rychlejší C implementace `in` než průchod automatem v Pythonu.
+    LINEAR_SCAN_MAX_PATTERNS = 48
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[tuple] = [()]
+        pattern_index: Dict[str, int] = {}
+        for pattern in patterns:
+            if not pattern or pattern in pattern_index:
+                continue
+            pattern_index[pattern] = len(self.patterns)
+            self.patterns.append(pattern)
+            self._add(pattern, pattern_index[pattern])
+        self._build_failure_links()
+
+    def _add(self, pattern: str, index: int):
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({}); self._fail.append(0); self._out.append(())
+            state = next_state
+        self._out[state] = self._out[state] + (index,)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values()) # Uzly první úrovně mají failure link na kořen.
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def find_all(self, text: str) -> set:
+        """Vrátí množinu indexů vzorů (viz self.patterns), které se v textu vyskytují."""
+        found = set()
+        if not self.patterns:
+            return found
+        if len(self.patterns) <= self.LINEAR_SCAN_MAX_PATTERNS:
+            return {i for i, pattern in enumerate(self.patterns) if pattern in text}
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+def _process_keyword(keyword, case_sensitive: bool) -> str:
+    # Stejné zpracování jako v scraper.check_keywords: str(), případně lower(), strip().
+    keyword = str(keyword)
+    return (keyword if case_sensitive else keyword.lower()).strip()
+
+
+class _CompiledFilters:
+    __slots__ = ("case_sensitive", "exclude", "and_keywords", "or_groups")
+
+    def __init__(self, case_sensitive: bool):
+        self.case_sensitive = case_sensitive
+        self.exclude: List[str] = []
+        self.and_keywords: Optional[List[str]] = None
+        self.or_groups: Optional[List[List[str]]] = None
+
+    def keywords(self) -> Iterable[str]:
+        yield from self.exclude
+        yield from self.and_keywords or ()
+        for or_group in self.or_groups or ():
+            yield from or_group
+
+
+def compile_filters(profile_filters: dict, profile_name: str = "N/A") -> _CompiledFilters:
+    """Předzpracuje lokální filtry profilu. Sémantika je totožná s scraper.check_keywords."""
+    case_sensitive = profile_filters.get("keywords_case_sensitive", False)
+    compiled = _CompiledFilters(case_sensitive)
+    exclude_keywords_list = profile_filters.get("exclude_keywords", [])
+    if exclude_keywords_list:
+        compiled.exclude = [kw for kw in (_process_keyword(ex, case_sensitive) for ex in exclude_keywords_list) if kw]
+
+    must_have_config = profile_filters.get("must_have_keywords", [])
+    if must_have_config:
+        if not isinstance(must_have_config, list):
+            logger.warning(f"Profil '{profile_name}': Neplatný formát must_have_keywords: {must_have_config}.")
+        elif all(isinstance(item, list) for item in must_have_config):
+            # Prázdné OR skupiny se přeskakují; skupina bez neprázdného slova nemůže být splněna.
+            compiled.or_groups = [
+                [kw for kw in (_process_keyword(k, case_sensitive) for k in or_group) if kw]
+                for or_group in must_have_config if or_group
+            ]
+        elif all(isinstance(item, str) for item in must_have_config):
+            compiled.and_keywords = [kw for kw in (_process_keyword(k, case_sensitive) for k in must_have_config) if kw]
+        else:
+            logger.warning(f"Profil '{profile_name}': Neplatný smíšený formát must_have_keywords: {must_have_config}.")
+    return compiled
+
+
+class KeywordMatcher:
+    """Lokální filtry všech profilů zkompilované do dvou automatů (s/bez rozlišení velikosti písmen).
+
+    Jeden průchod titulkem dá výsledek pro všechny profily, které titulek sdílí.
+    Sestavuje se jednou při načtení (nebo změně) profilů.
+    """
+
+    def __init__(self, profiles: Iterable[Dict[str, Any]]):
+        self._filters: Dict[str, _CompiledFilters] = {}
+        for profile_config in profiles:
+            profile_name = profile_config.get("name")
+            if profile_name is None:
+                continue
+            self._filters[profile_name] = compile_filters(profile_config.get("filters", {}) or {}, profile_name)
+
+        self._automaton_cs = AhoCorasick(kw for f in self._filters.values() if f.case_sensitive for kw in f.keywords())
+        self._automaton_ci = AhoCorasick(kw for f in self._filters.values() if not f.case_sensitive for kw in f.keywords())
+        logger.debug(f"KeywordMatcher: zkompilováno {len(self._filters)} profilů, "
+                     f"{len(self._automaton_ci.patterns)} + {len(self._automaton_cs.patterns)} (case-sensitive) unikátních klíčových slov.")
+
+    def __contains__(self, profile_name: str) -> bool:
+        return profile_name in self._filters
+
+    def match(self, title: str, profile_names: Iterable[str]) -> Dict[str, bool]:
+        """Vrátí {název profilu: prošel filtry} pro zadané (zkompilované) profily."""
+        filters_by_name = [(name, self._filters[name]) for name in profile_names]
+        found_ci = found_cs = None
+        results = {}
+        for name, compiled in filters_by_name:
+            if compiled.case_sensitive:
+                if found_cs is None:
+                    found_cs = {self._automaton_cs.patterns[i] for i in self._automaton_cs.find_all(title)}
+                found = found_cs
+            else:
+                if found_ci is None:
+                    found_ci = {self._automaton_ci.patterns[i] for i in self._automaton_ci.find_all(title.lower())}
+                found = found_ci
+            results[name] = self._evaluate(compiled, found)
+        return results
+
+    def accepts(self, title: str, profile_name: str) -> bool:
+        return self.match(title, (profile_name,))[profile_name]
+
+    @staticmethod
+    def _evaluate(compiled: _CompiledFilters, found: set) -> bool:
+        for keyword in compiled.exclude:
+            if keyword in found:
+                return False
+        if compiled.or_groups is not None:
+            for or_group in compiled.or_groups:
+                if not any(keyword in found for keyword in or_group):
+                    return False
+        elif compiled.and_keywords is not None:
+            for keyword in compiled.and_keywords:
+                if keyword not in found:
+                    return False
+        return True
@@ -0,0 +1,118 @@
+import logging
+import logging.handlers
+from typing import Callable
+
+from json_codec import dumps
+
+LOG_FORMATS = ("text", "jsonl")
+_JSON_SAFE_TYPES = (str, int, float, bool, type(None), list, dict)
+
+
+class Lazy:
+    """Hodnota pro log spočítaná až při formátování záznamu (Lazy(dumps, params)).
+
+    Pokud se záznam kvůli úrovni logování vůbec nevytvoří, funkce se nezavolá.
+    """
+
+    __slots__ = ("_func", "_args", "_kwargs")
+
+    def __init__(self, func: Callable, *args, **kwargs):
+        self._func, self._args, self._kwargs = func, args, kwargs
+
+    def __str__(self) -> str:
+        return str(self._func(*self._args, **self._kwargs))
+
+    __repr__ = __str__
+
+
+class StructLogger:
+    """Tenká vrstva nad logging.Logger: kontrola úrovně před čímkoli dalším, %-argumenty a strukturovaná pole.
+
+    logger.info("Profil '%s': %d položek", name, count, profile=name, items=count)
+    Zpráva se zformátuje až ve výstupním handleru (mimo scraping vlákno), pole jdou
+    do záznamu jako record.fields a JsonLinesFormatter je zapíše jako samostatné klíče.
+    """
+
+    __slots__ = ("_logger",)
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(name)
+
+    @property
+    def name(self) -> str:
+        return self._logger.name
+
+    @property
+    def debug_enabled(self) -> bool:
+        """Pro stráž kolem dražšího debug výpisu (smyčky, výpis surových dat)."""
+        return self._logger.isEnabledFor(logging.DEBUG)
+
+    def isEnabledFor(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def getEffectiveLevel(self) -> int:
+        return self._logger.getEffectiveLevel()
+
+    def _log(self, level: int, msg: str, args: tuple, fields: dict):
+        exc_info = fields.pop("exc_info", False)
+        self._logger.log(level, msg, *args, exc_info=exc_info, extra={"fields": fields} if fields else None, stacklevel=3)
+
+    def debug(self, msg: str, *args, **fields):
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._log(logging.DEBUG, msg, args, fields)
+
+    def info(self, msg: str, *args, **fields):
+        if self._logger.isEnabledFor(logging.INFO):
+            self._log(logging.INFO, msg, args, fields)
+
+    def warning(self, msg: str, *args, **fields):
+        if self._logger.isEnabledFor(logging.WARNING):
+            self._log(logging.WARNING, msg, args, fields)
+
+    def error(self, msg: str, *args, **fields):
+        if self._logger.isEnabledFor(logging.ERROR):
+            self._log(logging.ERROR, msg, args, fields)
+
+
+def get_logger(name: str) -> StructLogger:
+    return StructLogger(name)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Jeden JSON objekt na řádek: čas, úroveň, místo v kódu, zpráva a strukturovaná pole záznamu."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": record.created,
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "where": f"{record.module}.{record.funcName}:{record.lineno}",
+            "msg": record.getMessage(),
+        }
+        for key, value in (getattr(record, "fields", None) or {}).items():
+            entry.setdefault(key, value if isinstance(value, _JSON_SAFE_TYPES) else str(value))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        try:
+            return dumps(entry)
+        except (TypeError, ValueError): # Nepřevoditelná hodnota uvnitř seznamu/slovníku pole
+            return dumps({key: value if isinstance(value, (str, int, float, bool, type(None))) else str(value) for key, value in entry.items()})
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, který záznam nepředformátovává - zprávu (i Lazy argumenty) sestaví až QueueListener.
+
+    Fronta je v rámci jednoho procesu, takže argumenty i traceback se nemusí převádět na text.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def build_formatter(log_format: str) -> logging.Formatter:
+    if str(log_format).lower() == "jsonl":
+        return JsonLinesFormatter()
+    return logging.Formatter('%(asctime)s - %(levelname)s - [%(module)s.%(funcName)s:%(lineno)d] - %(message)s')
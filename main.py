@@ -3,71 +3,129 @@ import random
 import sys
 import logging
 import signal
-import json 
 import os   
 import datetime 
-import requests # Přidáno pro Telegram notifikace
-
-from profile_manager import load_profiles, save_profiles_state, PROFILES_FILENAME
-from scraper import fetch_new_items, get_vinted_session 
+import sqlite3
+import atexit
+import queue
+import logging.handlers
+from urllib.parse import urlparse
+
+from profile_manager import load_profiles, save_profiles_state, merge_profiles_from_disk, PROFILES_FILENAME
+from scraper import fetch_new_items_for_group, group_profiles_by_query, get_group_label, reset_query_state, commit_group_fingerprint
+from async_engine import run_profiles_async
+from utils import HostRateLimiter
+from circuit_breaker import HostCircuitBreaker
+from keyword_matcher import KeywordMatcher
+from scheduler import PollScheduler
+from request_plan import get_request_plan
+from telegram_dispatcher import TelegramDispatcher, TELEGRAM_OUTBOX_FILENAME
+from json_codec import load_file, dump_file, DECODE_ERRORS
+from seen_ids import ensure_seen_id_set
+from status_channel import StatusPublisher
+from metrics import start_metrics_server, NEW_FINDS, CYCLE_DURATION, PROFILE_SAVE_DURATION
+from finds_store import get_finds_store, NEW_FINDS_FILENAME, FINDS_DB_FILENAME
+from log_facade import build_formatter, DeferredQueueHandler
+from session_manager import SessionManager
+from config_watcher import FileChangeWatcher
 
 # --- Výchozí Konfigurace ---
 DEFAULT_SETTINGS = {
     "manual_cookie": "", "proxies_config": None, "main_loop_sleep_seconds": 300,
     "profile_sleep_min": 25, "profile_sleep_max": 55, "cycles_before_session_refresh": 10,
     "cycles_before_profiles_save": 1, "log_level": "INFO",
+    "log_max_bytes": 5 * 1024 * 1024,      # Rotace scraper.log po dosažení velikosti
+    "log_backup_count": 3,                 # Počet starých logů (scraper.log.1 ...)
+    "log_format": "text",                  # "text" = čitelný řádek, "jsonl" = JSON objekt na řádek (strojové zpracování)
+    "metrics_port": 0,                     # >0 = Prometheus metriky na http://127.0.0.1:<port>/metrics
     "max_finds_age_days": 3,
     "telegram_notifications_enabled": False, # Nové defaultní nastavení
     "telegram_bot_token": "",              # Nové defaultní nastavení
-    "telegram_chat_id": ""                 # Nové defaultní nastavení
+    "telegram_chat_id": "",                # Nové defaultní nastavení
+    "telegram_digest_mode": False,         # Nálezy jednoho cyklu v několika souhrnných zprávách
+    "telegram_digest_media_groups": False, # Souhrn jako media group s fotkami
+    "finds_store_backend": "jsonl",        # "jsonl" = new_finds.jsonl, "sqlite" = new_finds.sqlite3 s indexy
+    "engine_mode": "sync",                 # "sync" = původní sekvenční smyčka, "async" = paralelní polling
+    "async_max_concurrency": 8,
+    "host_requests_per_minute": 30,        # Globální rozpočet requestů na host v režimu "async"; s poolem proxy tempo každé proxy
+    "proxy_quarantine_seconds": 300,       # Karanténa proxy z poolu (proxies_config jako seznam) po opakovaných 403/429/timeoutech
+    "circuit_breaker_cooldown_seconds": 120, # Pauza všech requestů na host po 429 / dávce 403 (bez poolu proxy)
+    "session_cookies_max_age_seconds": 21600, # Cookies zahřáté session na disku pro rychlý restart; 0 = neukládat
+    "scheduler_mode": "fixed",             # "fixed" = všechny profily každý cyklus, "adaptive" = podle frekvence nálezů
+    "adaptive_min_interval_seconds": 60,
+    "adaptive_max_interval_seconds": 1800,
+    "adaptive_requests_per_minute": 6
 }
 SCRAPER_SETTINGS_FILENAME = "scraper_settings.json"
-NEW_FINDS_FILENAME = "new_finds.jsonl" 
 SCRAPER_LOG_FILENAME = "scraper.log"
-STATUS_FILENAME = "scraper_current_status.txt"
+# Změna těchto nastavení za běhu se projeví až po restartu backendu (session, úložiště, logování, Telegram).
+RESTART_REQUIRED_SETTINGS = (
+    "manual_cookie", "proxies_config", "proxy_quarantine_seconds", "session_cookies_max_age_seconds",
+    "finds_store_backend", "log_format", "log_max_bytes", "log_backup_count", "metrics_port",
+    "telegram_notifications_enabled", "telegram_bot_token", "telegram_chat_id",
+)
+CONFIG_CHECK_INTERVAL_SECONDS = 2 # Jak často se během čekání mezi cykly kontrolují změny profilů a nastavení
 
 # ... (Konfigurace loggeru a funkce load_scraper_settings zůstávají stejné) ...
 _temp_settings_for_log_level = DEFAULT_SETTINGS.copy()
 if os.path.exists(SCRAPER_SETTINGS_FILENAME):
     try:
-        with open(SCRAPER_SETTINGS_FILENAME, 'r', encoding='utf-8') as _f:
-            _loaded_s = json.load(_f)
-            _temp_settings_for_log_level.update(_loaded_s)
+        _loaded_s = load_file(SCRAPER_SETTINGS_FILENAME)
+        _temp_settings_for_log_level.update(_loaded_s)
     except Exception: pass 
 
 _log_level_str = _temp_settings_for_log_level.get("log_level", "INFO").upper()
 _numeric_log_level = getattr(logging, _log_level_str, logging.INFO)
 
-logging.basicConfig(
-    level=_numeric_log_level, 
-    format='%(asctime)s - %(levelname)s - [%(module)s.%(funcName)s:%(lineno)d] - %(message)s',
-    handlers=[ 
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler(SCRAPER_LOG_FILENAME, encoding='utf-8', mode='a')
-    ]
-)
+# Zápis logů (konzole, rotovaný soubor) běží ve vlákně QueueListeneru, scraping jen vloží záznam do fronty.
+# Zprávu z %-argumentů sestaví až listener (DeferredQueueHandler), formát text/jsonl podle nastavení.
+_log_formatter = build_formatter(_temp_settings_for_log_level.get("log_format", DEFAULT_SETTINGS["log_format"]))
+_log_output_handlers = [
+    logging.StreamHandler(sys.stdout),
+    logging.handlers.RotatingFileHandler(
+        SCRAPER_LOG_FILENAME, encoding='utf-8', mode='a',
+        maxBytes=int(_temp_settings_for_log_level.get("log_max_bytes", DEFAULT_SETTINGS["log_max_bytes"])),
+        backupCount=int(_temp_settings_for_log_level.get("log_backup_count", DEFAULT_SETTINGS["log_backup_count"])),
+    ),
+]
+for _handler in _log_output_handlers:
+    _handler.setFormatter(_log_formatter)
+_log_queue = queue.SimpleQueue()
+LOG_LISTENER = logging.handlers.QueueListener(_log_queue, *_log_output_handlers)
+LOG_LISTENER.start()
+atexit.register(LOG_LISTENER.stop) # Při ukončení dopíše zbytek fronty
+
+_queue_handler = DeferredQueueHandler(_log_queue)
+logging.basicConfig(level=_numeric_log_level, handlers=[_queue_handler])
 logger = logging.getLogger(__name__) 
 
-def load_scraper_settings(filepath: str = SCRAPER_SETTINGS_FILENAME) -> dict:
+def load_scraper_settings(filepath: str = SCRAPER_SETTINGS_FILENAME, fallback: dict = None) -> dict:
+    """Při chybě čtení vrací fallback (aktuální nastavení při změně za běhu), jinak výchozí nastavení."""
     settings = DEFAULT_SETTINGS.copy() 
     if os.path.exists(filepath):
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                loaded_settings = json.load(f)
-                # Zajistíme, že všechny klíče z DEFAULT_SETTINGS jsou přítomny
-                for key, value in DEFAULT_SETTINGS.items():
-                    settings.setdefault(key, value)
-                settings.update(loaded_settings) # Aktualizujeme hodnotami ze souboru
-                logger.info(f"Konfigurace scraperu úspěšně načtena z '{filepath}'.")
-        except json.JSONDecodeError:
+            loaded_settings = load_file(filepath)
+            if fallback is not None and not isinstance(loaded_settings, dict):
+                raise ValueError("obsah není JSON objekt")
+            # Zajistíme, že všechny klíče z DEFAULT_SETTINGS jsou přítomny
+            for key, value in DEFAULT_SETTINGS.items():
+                settings.setdefault(key, value)
+            settings.update(loaded_settings) # Aktualizujeme hodnotami ze souboru
+            logger.info(f"Konfigurace scraperu úspěšně načtena z '{filepath}'.")
+        except DECODE_ERRORS:
+            if fallback is not None:
+                logger.error(f"Chyba při parsování JSON v '{filepath}'. Ponechávám aktuální nastavení.")
+                return fallback
             logger.error(f"Chyba při parsování JSON v '{filepath}'. Používají se výchozí nastavení.", exc_info=True)
         except Exception as e:
+            if fallback is not None:
+                logger.error(f"Chyba při načítání '{filepath}': {e}. Ponechávám aktuální nastavení.")
+                return fallback
             logger.error(f"Neočekávaná chyba při načítání '{filepath}': {e}. Používají se výchozí nastavení.", exc_info=True)
     else:
         logger.warning(f"Soubor '{filepath}' nenalezen. Používají se výchozí nastavení a bude vytvořen nový.")
         try: 
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, indent=4) # Uložíme defaultní (nebo prázdné, pokud by DEFAULT_SETTINGS byl prázdný)
+            dump_file(settings, filepath, indent=4) # Uložíme defaultní (nebo prázdné, pokud by DEFAULT_SETTINGS byl prázdný)
             logger.info(f"Vytvořen nový konfigurační soubor '{filepath}' s výchozími hodnotami.")
         except IOError as e_create:
             logger.error(f"Nepodařilo se vytvořit konfigurační soubor '{filepath}': {e_create}")
@@ -76,6 +134,7 @@ def load_scraper_settings(filepath: str = SCRAPER_SETTINGS_FILENAME) -> dict:
     new_numeric_log_level = getattr(logging, new_log_level_str, logging.INFO)
     if logger.getEffectiveLevel() != new_numeric_log_level:
         logger.setLevel(new_numeric_log_level)
+        logging.getLogger().setLevel(new_numeric_log_level) # Ostatní moduly (scraper, ...) dědí úroveň z root loggeru
         logger.info(f"Úroveň logování aktualizována na: {new_log_level_str} podle nastavení.")
         for handler in logging.getLogger().handlers: 
             handler.setLevel(new_numeric_log_level)
@@ -84,104 +143,79 @@ def load_scraper_settings(filepath: str = SCRAPER_SETTINGS_FILENAME) -> dict:
 SCRAPER_SETTINGS = load_scraper_settings() 
 PROFILES_IN_MEMORY: list = []
 
-# --- Funkce pro Telegram ---
-def send_telegram_notification(bot_token: str, chat_id: str, message: str):
-    """Odešle zprávu na Telegram."""
-    if not bot_token or not chat_id:
-        logger.debug("Telegram bot_token nebo chat_id není nastaven. Notifikace se neodesílá.")
-        return
-
-    api_url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    payload = {
-        'chat_id': chat_id,
-        'text': message,
-        'parse_mode': 'MarkdownV2' # Nebo 'HTML', pokud preferuješ
-    }
-    try:
-        response = requests.post(api_url, data=payload, timeout=10)
-        response.raise_for_status() # Vyvolá chybu pro 4xx/5xx odpovědi
-        logger.info(f"Telegram notifikace odeslána na chat ID {chat_id}.")
-        logger.debug(f"Odpověď Telegram API: {response.json()}")
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Chyba při odesílání Telegram notifikace: {e}")
-    except Exception as e_general:
-        logger.error(f"Neočekávaná chyba při odesílání Telegram notifikace: {e_general}", exc_info=True)
-
-def format_telegram_message(item_details: dict, profile_name: str) -> str:
-    """Formátuje zprávu pro Telegram s MarkdownV2."""
-    title = item_details.get('title', 'N/A').replace("-", "\\-").replace(".", "\\.").replace("!", "\\!").replace("(", "\\(").replace(")", "\\)") # Escapování pro MarkdownV2
-    price_num = item_details.get('price_numeric')
-    currency = item_details.get('currency', 'CZK')
-    url = item_details.get('url', '#')
-    
-    price_str = "N/A"
-    if price_num is not None:
-        price_str = f"{price_num:,.0f}".replace(",", " ") + f" {currency}"
-    else:
-        price_str = f"{item_details.get('price_str', 'N/A')} {currency}"
-    
-    message = (
-        f"🔥 *Nový Nález \\- Profil: {profile_name.replace('-', '\\-')}*\n\n"
-        f"*{title}*\n"
-        f"Cena: *{price_str}*\n"
-        f"Stav: {item_details.get('status', 'N/A')}\n"
-        f"Velikost: {item_details.get('size', 'N/A')}\n"
-        f"Značka: {item_details.get('brand', 'N/A')}\n\n"
-        f"[Odkaz na Vinted]({url})"
-    )
-    return message
+TELEGRAM_DISPATCHER: TelegramDispatcher = None
+FINDS_STORE = None
+STATUS_PUBLISHER: StatusPublisher = None
+PENDING_FINDS: list = []
 
 # ... (cleanup_old_finds a update_status_file zůstávají stejné) ...
 def cleanup_old_finds(max_age_days: int):
-    if not os.path.exists(NEW_FINDS_FILENAME): logger.debug(f"Soubor {NEW_FINDS_FILENAME} pro pročištění neexistuje."); return
-    logger.info(f"Zahajuji pročištění nálezů starších než {max_age_days} dní (dle Vinted času) z {NEW_FINDS_FILENAME}...")
-    kept_finds = []; removed_count = 0; processed_count = 0
-    now_unix = time.time(); age_limit_seconds = max_age_days * 24 * 60 * 60
-    temp_filepath = NEW_FINDS_FILENAME + ".tmp"
-    try:
-        with open(NEW_FINDS_FILENAME, 'r', encoding='utf-8') as f_in, \
-             open(temp_filepath, 'w', encoding='utf-8') as f_out:
-            for line in f_in:
-                processed_count += 1
-                try:
-                    find_data = json.loads(line)
-                    item_vinted_ts = find_data.get("vinted_item_timestamp")
-                    if item_vinted_ts and isinstance(item_vinted_ts, (int, float)) and item_vinted_ts > 0:
-                        if (now_unix - item_vinted_ts) <= age_limit_seconds: f_out.write(line); kept_finds.append(find_data)
-                        else: removed_count += 1; logger.debug(f"Odstraňuji starý nález (Vinted TS: {item_vinted_ts}): {find_data.get('title', 'N/A')[:30]}")
-                    else:
-                        f_out.write(line); kept_finds.append(find_data)
-                        if item_vinted_ts == 0: logger.debug(f"Ponechávám nález s TS=0: {find_data.get('title', 'N/A')[:30]}")
-                        else: logger.debug(f"Ponechávám nález s chybějícím/neplatným Vinted TS: {find_data.get('title', 'N/A')[:30]}")
-                except json.JSONDecodeError: logger.warning(f"Přeskakuji poškozený řádek v {NEW_FINDS_FILENAME} při čištění: {line.strip()}")
-        os.replace(temp_filepath, NEW_FINDS_FILENAME)
-        logger.info(f"Pročištění dokončeno. Zpracováno {processed_count} řádků. Odstraněno {removed_count}. Ponecháno {len(kept_finds)}.")
-    except IOError as e: logger.error(f"Chyba I/O při pročišťování {NEW_FINDS_FILENAME}: {e}"); cleanup_temp_file(temp_filepath)
-    except Exception as e_general: logger.error(f"Neočekávaná chyba při pročišťování {NEW_FINDS_FILENAME}: {e_general}", exc_info=True); cleanup_temp_file(temp_filepath)
-
-def cleanup_temp_file(filepath):
-    if os.path.exists(filepath):
-        try: os.remove(filepath)
-        except OSError: pass
+    FINDS_STORE.delete_older_than(max_age_days)
 
-def update_status_file(message: str):
+def flush_pending_finds():
+    """Zapíše nálezy nasbírané během cyklu do úložiště jednou dávkou."""
+    global PENDING_FINDS
+    if not PENDING_FINDS:
+        return
+    finds_to_write, PENDING_FINDS = PENDING_FINDS, []
+    try:
+        FINDS_STORE.add_many(finds_to_write)
+        logger.info(f"{len(finds_to_write)} nových nálezů uloženo do úložiště ({FINDS_STORE.backend}).")
+    except (IOError, sqlite3.Error) as e_io:
+        logger.error(f"Chyba při zápisu {len(finds_to_write)} nálezů do úložiště ({FINDS_STORE.backend}): {e_io}")
+
+def update_status(message: str, **fields):
+    """Zveřejní stav backendu pro UI (status kanál); fields = phase, profile, next_poll_at apod."""
+    if STATUS_PUBLISHER is None:
+        return
     try:
-        with open(STATUS_FILENAME, 'w', encoding='utf-8') as f:
-            f.write(f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}")
-        logger.debug(f"Status soubor aktualizován: {message}")
-    except IOError as e:
-        logger.error(f"Chyba při zápisu do status souboru '{STATUS_FILENAME}': {e}")
+        STATUS_PUBLISHER.publish(message=message, **fields)
+    except (ValueError, OSError) as e:
+        logger.error(f"Chyba při zápisu do status kanálu '{STATUS_PUBLISHER.filepath}': {e}")
+
+def process_profile_results(profile_config: dict, new_items_strings: list, new_items_data_list: list, found_ids_for_profile: set) -> bool:
+    """Zařadí nové nálezy profilu k uložení, aktualizuje jeho seen_ids a Telegram notifikace. Vrací True, pokud něco bylo nalezeno."""
+    if not new_items_data_list:
+        return False
+    profile_name = profile_config.get("name", "N/A")
+    for item in new_items_data_list:
+        item_to_save = item.to_record(
+            profile_name_found=profile_name,
+            timestamp_found_iso=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            timestamp_found_unix=time.time(),
+        )
+        PENDING_FINDS.append(item_to_save) # Do úložiště se zapisuje dávkově na konci cyklu
+        
+        # Telegram notifikace jen zařadíme do fronty, odesílá je dispatcher na pozadí
+        if TELEGRAM_DISPATCHER:
+            TELEGRAM_DISPATCHER.enqueue(item, profile_name)
+
+    # Za viděné se ID označí až po zařazení nálezů - při chybě výše se příště najdou znovu.
+    profile_config["seen_ids"].update(found_ids_for_profile)
+    NEW_FINDS.inc(len(new_items_data_list), profile=profile_name)
+    logger.info(f"Profil '{profile_name}': Aktualizováno {len(found_ids_for_profile)} ID. Celkem v paměti: {len(profile_config['seen_ids'])}")
+    logger.info(f"Profil '{profile_name}': {len(new_items_data_list)} nových nálezů připraveno k uložení (a zařazeno k odeslání na Telegram, pokud povoleno).")
+    return True
 
 def signal_handler_fn(signum, frame):
     status_msg = f"Přijat signál {signal.Signals(signum).name}. Ukončuji..."
-    logger.info(status_msg); update_status_file(status_msg)
-    if PROFILES_IN_MEMORY: save_profiles_state(PROFILES_IN_MEMORY)
+    logger.info(status_msg); update_status(status_msg, phase="stopping")
+    if FINDS_STORE: flush_pending_finds()
+    if PROFILES_IN_MEMORY: save_profiles_state(PROFILES_IN_MEMORY, compact=True)
     logger.info("Stav profilů uložen. Ukončuji."); sys.exit(0)
 
 
 def main():
-    global PROFILES_IN_MEMORY
-    update_status_file("Scraper se spouští, inicializace...")
+    global PROFILES_IN_MEMORY, TELEGRAM_DISPATCHER, FINDS_STORE, STATUS_PUBLISHER
+    try:
+        STATUS_PUBLISHER = StatusPublisher()
+        STATUS_PUBLISHER.start()
+    except (OSError, ValueError) as e:
+        logger.error(f"Nepodařilo se otevřít status kanál: {e}. UI nebude vidět stav backendu.")
+    update_status("Scraper se spouští, inicializace...", phase="starting")
+    metrics_port = int(SCRAPER_SETTINGS.get("metrics_port", DEFAULT_SETTINGS["metrics_port"]) or 0)
+    if metrics_port > 0:
+        start_metrics_server(metrics_port)
     
     try:
         signal.signal(signal.SIGINT, signal_handler_fn)
@@ -200,19 +234,134 @@ def main():
     telegram_enabled = SCRAPER_SETTINGS.get("telegram_notifications_enabled", False)
     telegram_token = SCRAPER_SETTINGS.get("telegram_bot_token", "")
     telegram_chat = SCRAPER_SETTINGS.get("telegram_chat_id", "")
+    engine_mode = str(SCRAPER_SETTINGS.get("engine_mode", DEFAULT_SETTINGS["engine_mode"])).lower()
+    async_max_concurrency = SCRAPER_SETTINGS.get("async_max_concurrency", DEFAULT_SETTINGS["async_max_concurrency"])
+    host_requests_per_minute = SCRAPER_SETTINGS.get("host_requests_per_minute", DEFAULT_SETTINGS["host_requests_per_minute"])
+    host_rate_limiter = HostRateLimiter(host_requests_per_minute)
+    circuit_breaker = HostCircuitBreaker(SCRAPER_SETTINGS.get("circuit_breaker_cooldown_seconds", DEFAULT_SETTINGS["circuit_breaker_cooldown_seconds"]))
+    poll_scheduler = PollScheduler(
+        mode=str(SCRAPER_SETTINGS.get("scheduler_mode", DEFAULT_SETTINGS["scheduler_mode"])).lower(),
+        main_loop_sleep=main_loop_sleep,
+        min_interval=SCRAPER_SETTINGS.get("adaptive_min_interval_seconds", DEFAULT_SETTINGS["adaptive_min_interval_seconds"]),
+        max_interval=SCRAPER_SETTINGS.get("adaptive_max_interval_seconds", DEFAULT_SETTINGS["adaptive_max_interval_seconds"]),
+        requests_per_minute=SCRAPER_SETTINGS.get("adaptive_requests_per_minute", DEFAULT_SETTINGS["adaptive_requests_per_minute"]),
+    )
+
+    def on_profile_result(profile_config, new_items_strings, new_items_data_list, found_ids_for_profile):
+        poll_scheduler.record_poll(profile_config, len(new_items_data_list))
+        return process_profile_results(profile_config, new_items_strings, new_items_data_list, found_ids_for_profile)
+
+    def on_profile_failure(profile_config):
+        # Neúspěšný dotaz není "žádný nový nález" - frekvence profilu se nesnižuje, zkusí se znovu po cooldownu jističe.
+        plan = get_request_plan(profile_config)
+        retry_in = circuit_breaker.remaining_cooldown(urlparse(plan.api_endpoint).netloc) if plan else 0.0
+        poll_scheduler.record_failed_poll(profile_config, retry_in)
+
+    def apply_settings_change(previous_settings: dict):
+        """Použije změny scraper_settings.json, které jdou provést za běhu; u ostatních upozorní na nutný restart."""
+        nonlocal main_loop_sleep, profile_sleep_min, profile_sleep_max, cycles_session_refresh, cycles_profiles_save, max_finds_age_days, engine_mode, async_max_concurrency
+        changed_keys = sorted(k for k in set(previous_settings) | set(SCRAPER_SETTINGS) if previous_settings.get(k) != SCRAPER_SETTINGS.get(k))
+        if not changed_keys:
+            return False
+
+        def setting(key):
+            return SCRAPER_SETTINGS.get(key, DEFAULT_SETTINGS[key])
+
+        main_loop_sleep, cycles_session_refresh = setting("main_loop_sleep_seconds"), setting("cycles_before_session_refresh")
+        profile_sleep_min, profile_sleep_max = setting("profile_sleep_min"), setting("profile_sleep_max")
+        cycles_profiles_save, max_finds_age_days = setting("cycles_before_profiles_save"), setting("max_finds_age_days")
+        engine_mode, async_max_concurrency = str(setting("engine_mode")).lower(), setting("async_max_concurrency")
+        host_rate_limiter.set_rate(setting("host_requests_per_minute"))
+        session_manager.set_requests_per_minute(setting("host_requests_per_minute"))
+        circuit_breaker.set_cooldown(setting("circuit_breaker_cooldown_seconds"))
+        poll_scheduler.configure(str(setting("scheduler_mode")).lower(), main_loop_sleep, setting("adaptive_min_interval_seconds"),
+                                 setting("adaptive_max_interval_seconds"), setting("adaptive_requests_per_minute"))
+        if TELEGRAM_DISPATCHER:
+            TELEGRAM_DISPATCHER.digest_mode = setting("telegram_digest_mode")
+            TELEGRAM_DISPATCHER.digest_media_groups = setting("telegram_digest_media_groups")
+
+        restart_keys = [k for k in changed_keys if k in RESTART_REQUIRED_SETTINGS]
+        applied_keys = [k for k in changed_keys if k not in RESTART_REQUIRED_SETTINGS]
+        if applied_keys:
+            logger.info(f"Nastavení změněno za běhu: {', '.join(applied_keys)}.")
+        if restart_keys:
+            logger.warning(f"Změna nastavení {', '.join(restart_keys)} se projeví až po restartu backendu.")
+        return True
+
+    def apply_profiles_change() -> bool:
+        """Převezme přidané, odebrané a upravené profily ze souboru; seen_ids nezměněných profilů zůstávají. Vrací True při změně."""
+        global PROFILES_IN_MEMORY
+        merged = merge_profiles_from_disk(PROFILES_IN_MEMORY)
+        if merged is None:
+            return False
+        PROFILES_IN_MEMORY, added_profiles, removed_names, changed_profiles = merged
+        for profile_config, changed_keys in changed_profiles:
+            if changed_keys & {"vinted_url", "filters"}:
+                reset_query_state(profile_config)
+            poll_scheduler.poll_soon(profile_config)
+        for profile_config in added_profiles:
+            poll_scheduler.poll_soon(profile_config)
+        if not (added_profiles or removed_names or changed_profiles):
+            return False # Např. vlastní zápis backendu (sloučení žurnálu)
+        changes = [f"+{p.get('name', 'N/A')}" for p in added_profiles] + [f"-{name}" for name in removed_names]
+        changes += [f"{p.get('name', 'N/A')} ({', '.join(sorted(keys))})" for p, keys in changed_profiles]
+        logger.info(f"Profily změněny za běhu: {'; '.join(changes)}. Celkem {len(PROFILES_IN_MEMORY)} profilů.")
+        return True
+
+    def apply_config_changes() -> bool:
+        """Převezme úpravy z frontendu bez restartu (session, seen_ids i stav plánovače zůstávají). Vrací True při změně."""
+        global SCRAPER_SETTINGS
+        nonlocal keyword_matcher
+        changed = False
+        if settings_watcher.changed():
+            previous_settings, SCRAPER_SETTINGS = SCRAPER_SETTINGS, load_scraper_settings(fallback=SCRAPER_SETTINGS)
+            changed = apply_settings_change(previous_settings)
+        if profiles_watcher.changed() and apply_profiles_change():
+            keyword_matcher = KeywordMatcher(PROFILES_IN_MEMORY)
+            changed = True
+        return changed
+
+    def wait_for_next_cycle(wait_seconds: float):
+        """Čeká po krátkých úsecích; po změně profilů nebo nastavení čekání ukončí a další cyklus začne hned."""
+        wait_until = time.monotonic() + wait_seconds
+        while True:
+            remaining = wait_until - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(CONFIG_CHECK_INTERVAL_SECONDS, remaining))
+            if apply_config_changes():
+                logger.info("Čekání mezi cykly přerušeno změnou profilů / nastavení, další cyklus začíná hned.")
+                return
 
 
     logger.info("🚀 Vinted Scraper Backend (s Telegram notifikacemi) spuštěn.")
-    if telegram_enabled: logger.info(f"Telegram notifikace jsou ZAPNUTY pro chat ID: {telegram_chat[:4]}... (token skryt)")
+    if telegram_enabled and (not telegram_token or not telegram_chat):
+        logger.warning("Telegram bot_token nebo chat_id není nastaven. Notifikace se neodesílají.")
+        telegram_enabled = False
+    if telegram_enabled:
+        logger.info(f"Telegram notifikace jsou ZAPNUTY pro chat ID: {telegram_chat[:4]}... (token skryt)")
+        TELEGRAM_DISPATCHER = TelegramDispatcher(
+            telegram_token, telegram_chat, outbox_path=TELEGRAM_OUTBOX_FILENAME,
+            digest_mode=SCRAPER_SETTINGS.get("telegram_digest_mode", DEFAULT_SETTINGS["telegram_digest_mode"]),
+            digest_media_groups=SCRAPER_SETTINGS.get("telegram_digest_media_groups", DEFAULT_SETTINGS["telegram_digest_media_groups"]),
+        )
+        TELEGRAM_DISPATCHER.start()
     else: logger.info("Telegram notifikace jsou VYPNUTY.")
+    if engine_mode == "async": logger.info(f"Režim ASYNC: max. {async_max_concurrency} profilů současně, limit {host_rate_limiter.min_interval:.1f}s mezi requesty na host.")
+    else: logger.info("Režim SYNC: profily se zpracovávají postupně s pauzami mezi nimi.")
+    if poll_scheduler.mode == "adaptive": logger.info(f"Plánovač ADAPTIVE: interval profilu {poll_scheduler.min_interval:.0f}-{poll_scheduler.max_interval:.0f}s, rozpočet {poll_scheduler.requests_per_minute:g} requestů/min.")
     # ... (ostatní INFO logy) ...
-    update_status_file("Načítání profilů, session a čištění starých nálezů...")
+    update_status("Načítání profilů, session a čištění starých nálezů...", phase="starting")
+    FINDS_STORE = get_finds_store(SCRAPER_SETTINGS.get("finds_store_backend", DEFAULT_SETTINGS["finds_store_backend"]), NEW_FINDS_FILENAME, FINDS_DB_FILENAME)
+    logger.info(f"Úložiště nálezů: {FINDS_STORE.backend} ({FINDS_STORE.filepath}).")
     cleanup_old_finds(max_finds_age_days)
     PROFILES_IN_MEMORY = load_profiles()
     # ... (logování profilů) ...
     if not PROFILES_IN_MEMORY:
         msg = f"Nebyly načteny žádné profily z '{PROFILES_FILENAME}'. Ukončuji."
-        logger.critical(msg); update_status_file(msg); return
+        logger.critical(msg); update_status(msg, phase="error")
+        if STATUS_PUBLISHER: STATUS_PUBLISHER.close()
+        return
         
     logger.info(f"Načteno {len(PROFILES_IN_MEMORY)} profilů ke zpracování:")
     for i, p in enumerate(PROFILES_IN_MEMORY):
@@ -224,128 +373,158 @@ def main():
         case_sensitive = local_filters.get('keywords_case_sensitive', False)
         logger.info(f"  Profil {i+1}: {profile_name} (URL: '{vinted_url}', Lokální filtry - Musí: {must_haves}, Nesmí: {excludes}, CaseSensitive: {case_sensitive})")
     logger.info("-" * 40)
+    keyword_matcher = KeywordMatcher(PROFILES_IN_MEMORY)
+    poll_scheduler.seed_rates_from_finds(FINDS_STORE.iter_finds())
 
-    vinted_session = get_vinted_session(manual_cookie=manual_cookie, proxies=proxies_config)
-    if not vinted_session:
+    session_manager = SessionManager(
+        manual_cookie=manual_cookie, proxies_config=proxies_config, requests_per_minute=host_requests_per_minute,
+        quarantine_seconds=SCRAPER_SETTINGS.get("proxy_quarantine_seconds", DEFAULT_SETTINGS["proxy_quarantine_seconds"]),
+        cookie_max_age_seconds=SCRAPER_SETTINGS.get("session_cookies_max_age_seconds", DEFAULT_SETTINGS["session_cookies_max_age_seconds"]),
+    )
+    if not session_manager.start():
         msg = "Kritická chyba: Nepodařilo se vytvořit Vinted session. Ukončuji."
-        logger.critical(msg); update_status_file(msg); return
+        logger.critical(msg); update_status(msg, phase="error")
+        if STATUS_PUBLISHER: STATUS_PUBLISHER.close()
+        return
 
     run_count = 0
+    last_session_refresh_at = last_cleanup_at = time.monotonic()
+    settings_watcher, profiles_watcher = FileChangeWatcher(SCRAPER_SETTINGS_FILENAME), FileChangeWatcher(PROFILES_FILENAME)
     try:
         while True:
-            run_count += 1
-            status_msg_cycle = f"Začíná HLAVNÍ CYKLUS č. {run_count}"
-            logger.info(f"\n🏁 ========== {status_msg_cycle} ({time.strftime('%Y-%m-%d %H:%M:%S')}) ==========")
-            update_status_file(status_msg_cycle)
-            
-            if run_count > 1 and (run_count % cycles_session_refresh == 0):
-                # ... (obnova session) ...
-                update_status_file(f"Obnova session (po {run_count-1} cyklech)...")
-                logger.info(f"Preventivní obnova Vinted session po {run_count-1} cyklech...")
-                if hasattr(vinted_session, 'close'): vinted_session.close()
-                vinted_session = get_vinted_session(manual_cookie=manual_cookie, proxies=proxies_config)
-                if not vinted_session:
-                    msg = "Kritická chyba: Nepodařilo se OBNOVIT Vinted session. Ukončuji."
-                    logger.critical(msg); update_status_file(msg)
-                    save_profiles_state(PROFILES_IN_MEMORY); return
-                logger.info("Nová session pro další cykly je připravena.")
-
-            cycles_per_day_approx = max(1, (24 * 60 * 60 // main_loop_sleep)) if main_loop_sleep > 0 else 288 
-            if run_count > 1 and run_count % cycles_per_day_approx == 0 : 
-                 cleanup_old_finds(max_finds_age_days)
+            apply_config_changes() # Změny uložené během zpracování předchozího cyklu
 
             any_new_item_in_this_cycle = False
             active_profiles_for_run = [p for p in PROFILES_IN_MEMORY if p.get("vinted_url") and p.get("enabled", True)]
             if not active_profiles_for_run:
                 # ... (čekání pokud nejsou aktivní profily) ...
                 status_msg_no_profiles = "Žádné aktivní profily k dispozici. Čekám..."
-                logger.warning(status_msg_no_profiles); update_status_file(status_msg_no_profiles)
-                time.sleep(main_loop_sleep); continue
+                logger.warning(status_msg_no_profiles); update_status(status_msg_no_profiles, phase="waiting", next_poll_at=time.time() + main_loop_sleep)
+                wait_for_next_cycle(main_loop_sleep); continue
 
-            current_run_profiles = random.sample(active_profiles_for_run, len(active_profiles_for_run))
-            # ... (logování pořadí profilů) ...
-            logger.debug(f"Pořadí profilů v tomto cyklu: {[p.get('name', 'N/A') for p in current_run_profiles]}")
+            current_run_profiles = poll_scheduler.next_batch(active_profiles_for_run)
+            if not current_run_profiles: # Adaptivní plánovač: nic není splatné (nebo je vyčerpán rozpočet)
+                wait_seconds = poll_scheduler.seconds_until_next_poll()
+                logger.debug(f"Žádný profil není splatný, čekám {wait_seconds:.0f}s.")
+                update_status(f"Žádný profil není splatný, čekám {wait_seconds:.0f}s.", phase="waiting", next_poll_at=time.time() + wait_seconds)
+                wait_for_next_cycle(wait_seconds); continue
+
+            # Číslo cyklu (a s ním obnova session a čištění) se posouvá jen u dávky, která opravdu běží.
+            run_count += 1
+            status_msg_cycle = f"Začíná HLAVNÍ CYKLUS č. {run_count}"
+            logger.info(f"\n🏁 ========== {status_msg_cycle} ({time.strftime('%Y-%m-%d %H:%M:%S')}) ==========")
+            cycle_started_at = time.monotonic()
+            update_status(status_msg_cycle, phase="cycle", cycle=run_count, profile=None, next_poll_at=None)
+            # V adaptivním režimu je "cyklus" jen dávka splatných profilů, proto se obnova session
+            # a čištění nálezů řídí časem odpovídajícím stejnému počtu pevných cyklů.
+            if poll_scheduler.mode == "adaptive":
+                session_refresh_due = time.monotonic() - last_session_refresh_at >= cycles_session_refresh * main_loop_sleep
+            else:
+                session_refresh_due = run_count > 1 and (run_count % cycles_session_refresh == 0)
+            if session_refresh_due:
+                last_session_refresh_at = time.monotonic()
+                # Nová session se zahřívá na pozadí, scraping mezitím běží se stávající (při neúspěchu zůstane).
+                logger.info(f"Preventivní obnova Vinted session po {run_count-1} cyklech (zahřátí na pozadí)...")
+                session_manager.request_refresh(f"po {run_count-1} cyklech")
 
-            for profile_index, profile_config in enumerate(current_run_profiles):
-                profile_name = profile_config.get("name", f"Profil bez jména #{profile_index+1}")
-                # ... (logování a update statusu pro profil) ...
-                status_msg_profile = f"Zpracovávám profil ({profile_index + 1}/{len(current_run_profiles)}): '{profile_name}'"
-                logger.info(f"\n  🔎 {status_msg_profile}"); update_status_file(status_msg_profile)
+            cycles_per_day_approx = max(1, (24 * 60 * 60 // main_loop_sleep)) if main_loop_sleep > 0 else 288 
+            if poll_scheduler.mode == "adaptive":
+                cleanup_due = time.monotonic() - last_cleanup_at >= 24 * 60 * 60
+            else:
+                cleanup_due = run_count > 1 and run_count % cycles_per_day_approx == 0
+            if cleanup_due: 
+                 last_cleanup_at = time.monotonic()
+                 cleanup_old_finds(max_finds_age_days)
 
-                if not isinstance(profile_config.get("seen_ids"), set):
-                    profile_config["seen_ids"] = set()
+            # ... (logování pořadí profilů) ...
+            logger.debug(f"Pořadí profilů v tomto cyklu: {[p.get('name', 'N/A') for p in current_run_profiles]}")
 
-                new_items_strings, new_items_data_list, found_ids_for_profile = fetch_new_items(vinted_session, profile_config)
+            for profile_config in current_run_profiles:
+                ensure_seen_id_set(profile_config)
 
-                if new_items_data_list: 
+            if engine_mode == "async":
+                status_msg_async = f"Paralelně zpracovávám {len(current_run_profiles)} profilů (max. {async_max_concurrency} současně)..."
+                logger.info(f"\n  ⚡ {status_msg_async}"); update_status(status_msg_async, phase="profile", profile=f"{len(current_run_profiles)} profilů paralelně")
+                if run_profiles_async(session_manager.session, current_run_profiles, on_profile_result, async_max_concurrency, host_rate_limiter, keyword_matcher, circuit_breaker, on_profile_failure):
                     any_new_item_in_this_cycle = True
-                    profile_config["seen_ids"].update(found_ids_for_profile)
-                    logger.info(f"Profil '{profile_name}': Aktualizováno {len(found_ids_for_profile)} ID. Celkem v paměti: {len(profile_config['seen_ids'])}")
-                    
-                    try:
-                        with open(NEW_FINDS_FILENAME, "a", encoding="utf-8") as f_finds:
-                            for item_detail_dict in new_items_data_list:
-                                item_to_save = item_detail_dict.copy()
-                                item_to_save["profile_name_found"] = profile_name
-                                item_to_save["timestamp_found_iso"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
-                                item_to_save["timestamp_found_unix"] = time.time()
-                                f_finds.write(json.dumps(item_to_save, ensure_ascii=False) + "\n")
-                                
-                                # Odeslání Telegram notifikace
-                                if telegram_enabled:
-                                    tg_message = format_telegram_message(item_detail_dict, profile_name)
-                                    send_telegram_notification(telegram_token, telegram_chat, tg_message)
-                                    time.sleep(1) # Malá pauza mezi odesláním více notifikací
-
-                        logger.info(f"Profil '{profile_name}': {len(new_items_data_list)} nových nálezů uloženo do {NEW_FINDS_FILENAME} (a odesláno na Telegram, pokud povoleno).")
-                    except IOError as e_io:
-                        logger.error(f"Chyba při zápisu do {NEW_FINDS_FILENAME} pro profil '{profile_name}': {e_io}")
+            else:
+                query_groups = group_profiles_by_query(current_run_profiles)
+                for group_index, group in enumerate(query_groups):
+                    profile_name = get_group_label(group)
+                    # ... (logování a update statusu pro profil) ...
+                    status_msg_profile = f"Zpracovávám profil ({group_index + 1}/{len(query_groups)}): '{profile_name}'"
+                    logger.info(f"\n  🔎 {status_msg_profile}"); update_status(status_msg_profile, phase="profile", profile=profile_name)
+
+                    for profile_config, profile_results in fetch_new_items_for_group(session_manager.session, group, keyword_matcher=keyword_matcher, circuit_breaker=circuit_breaker):
+                        if profile_results is None:
+                            on_profile_failure(profile_config); continue
+                        if on_profile_result(profile_config, *profile_results):
+                            any_new_item_in_this_cycle = True
+                    commit_group_fingerprint(group)
                 
-                if profile_config != current_run_profiles[-1]: 
-                    # ... (pauza mezi profily) ...
-                    sleep_duration = random.uniform(profile_sleep_min, profile_sleep_max)
-                    status_msg_sleep = f"Pauza {sleep_duration:.1f}s před dalším profilem..."
-                    logger.info(f"    💤 {status_msg_sleep}"); update_status_file(status_msg_sleep)
-                    time.sleep(sleep_duration)
+                    if group_index < len(query_groups) - 1 and circuit_breaker.any_open():
+                        logger.debug("Jistič je otevřený - pauza mezi profily se přeskakuje.")
+                    elif group_index < len(query_groups) - 1: 
+                        # ... (pauza mezi profily) ...
+                        sleep_duration = random.uniform(profile_sleep_min, profile_sleep_max)
+                        status_msg_sleep = f"Pauza {sleep_duration:.1f}s před dalším profilem..."
+                        logger.info(f"    💤 {status_msg_sleep}"); update_status(status_msg_sleep, phase="pause")
+                        time.sleep(sleep_duration)
             
             # ... (logování a ukládání na konci cyklu) ...
+            flush_pending_finds()
+            if TELEGRAM_DISPATCHER: TELEGRAM_DISPATCHER.flush_digest()
             if not any_new_item_in_this_cycle:
                 logger.info(f"✓ Cyklus č. {run_count} dokončen. Žádné nové položky.")
             else:
                 logger.info(f"✓ Cyklus č. {run_count} dokončen s novými nálezy.")
 
             if run_count % cycles_profiles_save == 0 or any_new_item_in_this_cycle:
-                update_status_file(f"Ukládání stavu profilů po cyklu č. {run_count}...")
+                update_status(f"Ukládání stavu profilů po cyklu č. {run_count}...", phase="saving")
                 logger.info(f"Ukládání stavu profilů (seen_ids) po cyklu č. {run_count}...")
+                save_started_at = time.perf_counter()
                 save_profiles_state(PROFILES_IN_MEMORY)
+                PROFILE_SAVE_DURATION.observe(time.perf_counter() - save_started_at)
             
-            status_msg_wait = f"Čekám {main_loop_sleep}s do dalšího cyklu (č. {run_count + 1})..."
-            logger.info(f"⏱️ {status_msg_wait}"); update_status_file(status_msg_wait)
-            time.sleep(main_loop_sleep)
+            cycle_duration = time.monotonic() - cycle_started_at
+            CYCLE_DURATION.observe(cycle_duration)
+            wait_seconds = poll_scheduler.seconds_until_next_poll()
+            status_msg_wait = f"Čekám {wait_seconds:.0f}s do dalšího cyklu (č. {run_count + 1})..."
+            logger.info(f"⏱️ {status_msg_wait}")
+            update_status(status_msg_wait, phase="waiting", last_cycle_duration=cycle_duration, next_poll_at=time.time() + wait_seconds)
+            wait_for_next_cycle(wait_seconds)
 
     # ... (zbytek main - ošetření výjimek a finally blok zůstává stejný) ...
     except KeyboardInterrupt: 
         logger.info("🛑 Přerušeno uživatelem (KeyboardInterrupt v main loop).")
-        update_status_file("Scraper ukončen uživatelem.")
+        update_status("Scraper ukončen uživatelem.", phase="stopping")
     except SystemExit: 
         logger.info("Systémový požadavek na ukončení zpracován.")
     except Exception as e: 
         status_msg_error = f"💥 Neočekávaná KRITICKÁ chyba: {e}"
         logger.critical(status_msg_error, exc_info=True)
-        update_status_file(status_msg_error)
+        update_status(status_msg_error, phase="error")
     finally:
         final_status = "Scraper se ukončuje (finally blok)..."
-        logger.info(final_status); update_status_file(final_status)
+        logger.info(final_status); update_status(final_status, phase="stopping")
+        if FINDS_STORE:
+            flush_pending_finds()
+            FINDS_STORE.close()
         if PROFILES_IN_MEMORY:
             logger.info("Ukládám finální stav profilů (seen_ids)...")
-            save_profiles_state(PROFILES_IN_MEMORY)
+            save_profiles_state(PROFILES_IN_MEMORY, compact=True)
             logger.info("Finální stav profilů uložen.")
         
-        if 'vinted_session' in locals() and vinted_session and hasattr(vinted_session, 'close'):
-            vinted_session.close()
+        if TELEGRAM_DISPATCHER:
+            logger.info("Čekám na odeslání zbývajících Telegram notifikací...")
+            TELEGRAM_DISPATCHER.stop()
+        
+        if 'session_manager' in locals() and session_manager.session is not None:
+            session_manager.close()
             logger.info("Vinted session byla uzavřena.")
         
-        update_status_file("Scraper ZASTAVEN.")
+        update_status("Scraper ZASTAVEN.")
+        if STATUS_PUBLISHER: STATUS_PUBLISHER.close()
         logger.info("👋 Scraper ukončen.")
 
 
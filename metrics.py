@@ -0,0 +1,169 @@
+import bisect
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Tuple, Sequence, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 35.0)
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> list:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {} if self.labelnames else {(): 0} # Bez labelů hned s nulou
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_samples(self) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {} # key -> [počty v bucketech..., +Inf, součet]
+        if not self.labelnames:
+            self._series[()] = [0] * (len(self.buckets) + 2)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        bucket_index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[bucket_index] += 1
+            series[-1] += value
+
+    def _render_samples(self) -> list:
+        lines = []
+        for key, series in self._series.items():
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += bucket_count
+                le_label = 'le="' + _format_value(upper_bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_DURATION = REGISTRY.register(Histogram("vinted_request_duration_seconds", "Doba requestu na Vinted API.", ("host",)))
+HTTP_ERRORS = REGISTRY.register(Counter("vinted_http_errors_total", "Odpovědi 401/403/429/5xx podle profilu.", ("profile", "status")))
+REQUEST_RETRIES = REGISTRY.register(Counter("vinted_request_retries_total", "Opakované pokusy o request podle profilu a důvodu.", ("profile", "reason")))
+BACKOFF_SECONDS = REGISTRY.register(Counter("vinted_backoff_seconds_total", "Sekundy strávené čekáním před opakováním requestu."))
+ITEMS_PARSED = REGISTRY.register(Counter("vinted_items_parsed_total", "Neviděné položky z API předané k řazení a filtrování.", ("profile",)))
+RESPONSES_UNCHANGED = REGISTRY.register(Counter("vinted_unchanged_responses_total", "Odpovědi API beze změny od minula (položky se nezpracovaly) podle profilu a způsobu zjištění.", ("profile", "reason")))
+PROXY_HEALTH = REGISTRY.register(Gauge("vinted_proxy_health", "Skóre zdraví proxy v poolu (1 = bez chyb, pod 0.4 karanténa).", ("proxy",)))
+PROXY_QUARANTINES = REGISTRY.register(Counter("vinted_proxy_quarantines_total", "Kolikrát šla proxy do karantény.", ("proxy",)))
+CIRCUIT_STATE = REGISTRY.register(Gauge("vinted_circuit_state", "Stav jističe pro host (0 = zavřený, 1 = zkušební request, 2 = otevřený).", ("host",)))
+CIRCUIT_OPENS = REGISTRY.register(Counter("vinted_circuit_opens_total", "Kolikrát se jistič pro host otevřel, podle důvodu.", ("host", "reason")))
+REQUESTS_SHORT_CIRCUITED = REGISTRY.register(Counter("vinted_requests_short_circuited_total", "Requesty neposlané kvůli otevřenému jističi.", ("host",)))
+NEW_FINDS = REGISTRY.register(Counter("vinted_new_finds_total", "Nové nálezy podle profilu.", ("profile",)))
+CYCLE_DURATION = REGISTRY.register(Histogram("scraper_cycle_duration_seconds", "Doba jednoho hlavního cyklu (bez závěrečného čekání).",
+                                             buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200)))
+PROFILE_SAVE_DURATION = REGISTRY.register(Histogram("scraper_profile_state_save_seconds", "Doba uložení stavu profilů.",
+                                                    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)))
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY) -> Optional[ThreadingHTTPServer]:
+    """Spustí HTTP endpoint /metrics (Prometheus text format) ve vlákně na pozadí."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404); return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass # Pravidelné dotazy Promethea by zaplavily log
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        logger.error(f"Nepodařilo se spustit metrics endpoint na {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Metriky (Prometheus) dostupné na http://{host}:{port}/metrics")
+    return server
@@ -1,50 +1,61 @@
-import json
 import os
 import logging
-from typing import List, Dict, Any, Set
+from typing import List, Dict, Any, Set, Optional, Tuple
+
+from seen_ids import SeenIdSet, ensure_seen_id_set, seen_ids_for_json
+from json_codec import loads, load_file, dump_file, dumps_bytes, dumps_line, DECODE_ERRORS
 
 logger = logging.getLogger(__name__)
 PROFILES_FILENAME = "user_profiles.json"
+RUNTIME_STATE_KEY = "_runtime" # Stav profilu jen za běhu backendu (watermark apod.), neukládá se na disk
+# Žurnál změn stavu profilů (nová seen_ids, enabled) vedle souboru profilů; po překročení velikosti
+# (a při ukončení backendu) se sloučí do user_profiles.json a vyprázdní.
+PROFILES_JOURNAL_SUFFIX = ".journal"
+PROFILES_JOURNAL_COMPACT_BYTES = 256 * 1024
+# Stav, který drží backend - při opětovném načtení profilů z disku se nepřepisuje.
+PROFILE_STATE_KEYS = ("seen_ids", RUNTIME_STATE_KEY)
+
+def get_runtime_state(profile_config: Dict[str, Any]) -> Dict[str, Any]:
+    runtime_state = profile_config.get(RUNTIME_STATE_KEY)
+    if runtime_state is None:
+        runtime_state = profile_config[RUNTIME_STATE_KEY] = {}
+    return runtime_state
+
+def normalize_profile(p_data: Dict[str, Any], index: int) -> Dict[str, Any]:
+    p_data.setdefault("name", f"Profil bez jména #{index+1}")
+    p_data.setdefault("vinted_url", "") # Nový klíč pro URL
+    p_data.setdefault("filters", {})    # Pro lokální filtry (must_have, exclude)
+    p_data.setdefault("enabled", True)  # Přidáno pro frontend
+    ensure_seen_id_set(p_data) # Seznam z JSON -> kompaktní SeenIdSet
+    return p_data
 
 def load_profiles(filepath: str = PROFILES_FILENAME) -> List[Dict[str, Any]]:
     profiles: List[Dict[str, Any]] = []
     if not os.path.exists(filepath):
         logger.warning(f"Soubor profilů '{filepath}' nenalezen. Vracím prázdný seznam.")
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump([], f)
+            dump_file([], filepath, indent=None)
             logger.info(f"Vytvořen prázdný soubor profilů: '{filepath}'")
         except IOError as e:
             logger.error(f"Nepodařilo se vytvořit prázdný soubor profilů '{filepath}': {e}")
         return profiles
 
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            loaded_data = json.load(f)
-            if not isinstance(loaded_data, list):
-                logger.error(f"Obsah souboru '{filepath}' není seznam. Vracím prázdný seznam.")
-                return []
+        loaded_data = load_file(filepath)
+        if not isinstance(loaded_data, list):
+            logger.error(f"Obsah souboru '{filepath}' není seznam. Vracím prázdný seznam.")
+            return []
 
         for i, p_data in enumerate(loaded_data):
             if not isinstance(p_data, dict):
                 logger.warning(f"Položka #{i} v '{filepath}' není slovník. Přeskakuji.")
                 continue
             
-            p_data.setdefault("name", f"Profil bez jména #{i+1}")
-            p_data.setdefault("vinted_url", "") # Nový klíč pro URL
-            p_data.setdefault("filters", {})    # Pro lokální filtry (must_have, exclude)
-            p_data.setdefault("enabled", True)  # Přidáno pro frontend
-            
-            seen_ids_data = p_data.get("seen_ids")
-            if isinstance(seen_ids_data, list):
-                p_data["seen_ids"] = set(seen_ids_data)
-            elif not isinstance(seen_ids_data, set):
-                p_data["seen_ids"] = set()
-            
-            profiles.append(p_data)
+            profiles.append(normalize_profile(p_data, i))
         logger.info(f"Úspěšně načteno {len(profiles)} profilů z '{filepath}'.")
+        replay_profiles_journal(profiles, filepath)
 
-    except json.JSONDecodeError:
+    except DECODE_ERRORS:
         logger.error(f"Chyba při parsování JSON souboru profilů '{filepath}'.", exc_info=False)
     except Exception as e:
         logger.error(f"Neočekávaná chyba při načítání profilů z '{filepath}': {e}.", exc_info=True)
@@ -52,24 +63,182 @@ def load_profiles(filepath: str = PROFILES_FILENAME) -> List[Dict[str, Any]]:
     return profiles
 
 
+def merge_profiles_from_disk(
+    current_profiles: List[Dict[str, Any]],
+    filepath: str = PROFILES_FILENAME
+) -> Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[str], List[Tuple[Dict[str, Any], Set[str]]]]]:
+    """Převezme úpravy profilů z disku (frontend) do běžícího backendu, bez znovunačtení seen_ids.
+
+    Nezměněné profily zůstávají tytéž objekty (seen_ids i _runtime beze změny), u změněných se
+    přepíšou jen konfigurační klíče. Profily se párují podle jména - přejmenování je smazání a přidání.
+    Vrací (nový seznam v pořadí souboru, přidané profily, jména odebraných, [(profil, změněné klíče)]),
+    nebo None, pokud soubor nejde načíst (profily v paměti pak zůstávají).
+    """
+    try:
+        disk_profiles_list = load_file(filepath)
+    except (IOError, *DECODE_ERRORS) as e:
+        logger.warning(f"Změněný soubor profilů '{filepath}' se nepodařilo načíst: {e}. Pokračuji s profily v paměti.")
+        return None
+    if not isinstance(disk_profiles_list, list):
+        logger.warning(f"Obsah souboru '{filepath}' není seznam. Pokračuji s profily v paměti.")
+        return None
+
+    current_by_name = {p.get("name"): p for p in current_profiles}
+    merged_profiles, added, changed = [], [], []
+    for i, disk_profile in enumerate(disk_profiles_list):
+        if not isinstance(disk_profile, dict):
+            continue
+        disk_profile.setdefault("name", f"Profil bez jména #{i+1}")
+        mem_profile = current_by_name.pop(disk_profile["name"], None)
+        if mem_profile is None:
+            merged_profiles.append(normalize_profile(disk_profile, i)); added.append(disk_profile)
+            continue
+        disk_profile.setdefault("vinted_url", ""); disk_profile.setdefault("filters", {}); disk_profile.setdefault("enabled", True)
+        changed_keys = {key for key in set(disk_profile) | set(mem_profile)
+                        if key not in PROFILE_STATE_KEYS and disk_profile.get(key) != mem_profile.get(key)}
+        for key in changed_keys:
+            if key in disk_profile:
+                mem_profile[key] = disk_profile[key]
+            else:
+                mem_profile.pop(key, None)
+        if changed_keys:
+            changed.append((mem_profile, changed_keys))
+        merged_profiles.append(mem_profile)
+    removed_names = [name for name in current_by_name if name is not None]
+    return merged_profiles, added, removed_names, changed
+
+
+def get_journal_filepath(filepath: str = PROFILES_FILENAME) -> str:
+    return filepath + PROFILES_JOURNAL_SUFFIX
+
+def replay_profiles_journal(profiles: List[Dict[str, Any]], filepath: str = PROFILES_FILENAME) -> int:
+    """Aplikuje na načtené profily změny ze žurnálu, které ještě nebyly sloučeny do souboru profilů."""
+    journal_filepath = get_journal_filepath(filepath)
+    if not os.path.exists(journal_filepath):
+        return 0
+    profiles_by_name = {p.get("name"): p for p in profiles}
+    applied_count = 0
+    try:
+        with open(journal_filepath, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = loads(line)
+                except DECODE_ERRORS: # Neúplný poslední záznam po pádu
+                    logger.warning(f"Přeskakuji poškozený záznam v žurnálu '{journal_filepath}': {line.strip()[:100].decode('utf-8', errors='replace')}")
+                    continue
+                profile_config = profiles_by_name.get(record.get("name"))
+                if profile_config is None: # Profil mezitím smazán ve frontendu
+                    continue
+                seen_ids = ensure_seen_id_set(profile_config)
+                seen_ids.update(record.get("seen_ids_added", []))
+                seen_ids.mark_saved()
+                if "enabled" in record:
+                    profile_config["enabled"] = record["enabled"]
+                    get_runtime_state(profile_config)["journaled_enabled"] = record["enabled"]
+                applied_count += 1
+    except IOError as e:
+        logger.error(f"Chyba při čtení žurnálu profilů '{journal_filepath}': {e}")
+    if applied_count:
+        logger.info(f"Ze žurnálu '{journal_filepath}' aplikováno {applied_count} změn stavu profilů.")
+    return applied_count
+
+def append_profiles_journal(current_in_memory_profiles: List[Dict[str, Any]], filepath: str = PROFILES_FILENAME) -> bool:
+    """Připíše do žurnálu jen nová seen_ids a změny enabled od posledního uložení."""
+    journal_filepath = get_journal_filepath(filepath)
+    records, saved_profiles = [], []
+    for mem_profile in current_in_memory_profiles:
+        profile_name = mem_profile.get("name")
+        if not profile_name:
+            continue
+        record = {"name": profile_name}
+        seen_ids = mem_profile.get("seen_ids")
+        if isinstance(seen_ids, SeenIdSet) and seen_ids.unsaved_ids():
+            record["seen_ids_added"] = seen_ids.unsaved_ids()
+        runtime_state = get_runtime_state(mem_profile)
+        enabled = mem_profile.get("enabled", True)
+        if runtime_state.setdefault("journaled_enabled", enabled) != enabled:
+            record["enabled"] = enabled
+        if len(record) > 1:
+            records.append(record); saved_profiles.append(mem_profile)
+    if not records:
+        logger.debug("Žurnál profilů: žádné změny k zápisu.")
+        return True
+
+    try:
+        # Pokud předchozí zápis skončil uprostřed řádku (pád), začneme novým řádkem.
+        needs_newline = False
+        if os.path.exists(journal_filepath) and os.path.getsize(journal_filepath) > 0:
+            with open(journal_filepath, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        payload = (b"\n" if needs_newline else b"") + b"".join(dumps_line(r) for r in records)
+        with open(journal_filepath, 'ab') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+    except IOError as e:
+        logger.error(f"Chyba při zápisu žurnálu profilů '{journal_filepath}': {e}", exc_info=True)
+        return False
+
+    for mem_profile, record in zip(saved_profiles, records):
+        if "seen_ids_added" in record:
+            mem_profile["seen_ids"].mark_saved()
+        if "enabled" in record:
+            get_runtime_state(mem_profile)["journaled_enabled"] = record["enabled"]
+    logger.info(f"Stav profilů: {len(records)} změn připsáno do žurnálu '{journal_filepath}'.")
+    return True
+
 def save_profiles_state(
+    current_in_memory_profiles: List[Dict[str, Any]], 
+    filepath: str = PROFILES_FILENAME,
+    compact: bool = False
+) -> bool:
+    """Uloží stav profilů: běžně jen připíše změny do žurnálu, při compact=True (nebo velkém žurnálu)
+    sloučí stav do souboru profilů a žurnál vyprázdní."""
+    journal_filepath = get_journal_filepath(filepath)
+    journal_size = os.path.getsize(journal_filepath) if os.path.exists(journal_filepath) else 0
+    if not compact and journal_size < PROFILES_JOURNAL_COMPACT_BYTES:
+        return append_profiles_journal(current_in_memory_profiles, filepath)
+    if not write_profiles_snapshot(current_in_memory_profiles, filepath):
+        return append_profiles_journal(current_in_memory_profiles, filepath) # Změny aspoň neztratíme
+    for mem_profile in current_in_memory_profiles:
+        if isinstance(mem_profile.get("seen_ids"), SeenIdSet):
+            mem_profile["seen_ids"].mark_saved()
+        get_runtime_state(mem_profile)["journaled_enabled"] = mem_profile.get("enabled", True)
+    try:
+        # Až po úspěšném zápisu snímku; po pádu mezi tím se žurnál jen znovu (idempotentně) aplikuje.
+        if os.path.exists(journal_filepath):
+            os.remove(journal_filepath)
+    except OSError as e:
+        logger.warning(f"Nepodařilo se smazat žurnál profilů '{journal_filepath}': {e}")
+    return True
+
+def write_profiles_snapshot(
     current_in_memory_profiles: List[Dict[str, Any]], 
     filepath: str = PROFILES_FILENAME
 ) -> bool:
-    # ... (kód save_profiles_state zůstává stejný jako v poslední kompletní odpovědi) ...
+    """Sloučí profily v paměti s aktuálním souborem (úpravy z frontendu) a atomicky ho přepíše.
+
+    Backend profily nevytváří - profil, který v čitelném souboru chybí, smazal frontend a znovu se nezapíše.
+    """
     logger.debug(f"Pokus o uložení stavu {len(current_in_memory_profiles)} profilů do '{filepath}'.")
     
     disk_profiles_list: List[Dict[str, Any]] = []
+    disk_readable = False # Jen proti čitelnému souboru lze poznat smazané profily
     if os.path.exists(filepath):
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
+            with open(filepath, 'rb') as f:
                 content = f.read()
                 if content.strip(): 
-                    disk_profiles_list = json.loads(content)
+                    disk_profiles_list = loads(content)
                 if not isinstance(disk_profiles_list, list): 
                     logger.warning(f"Obsah souboru '{filepath}' při načítání pro uložení nebyl seznam. Bude přepsán.")
                     disk_profiles_list = []
-        except json.JSONDecodeError:
+                else:
+                    disk_readable = bool(content.strip())
+        except DECODE_ERRORS:
             logger.error(f"Soubor '{filepath}' je poškozený (JSONDecodeError) při načítání pro uložení. Bude přepsán aktuálním stavem z paměti.", exc_info=False)
             disk_profiles_list = [] 
         except Exception as e:
@@ -90,8 +259,9 @@ def save_profiles_state(
         mem_profile_name = mem_profile.get("name")
         if not mem_profile_name:
             profile_copy = mem_profile.copy()
-            if "seen_ids" in profile_copy and isinstance(profile_copy["seen_ids"], set):
-                profile_copy["seen_ids"] = sorted(list(profile_copy["seen_ids"])) 
+            profile_copy.pop(RUNTIME_STATE_KEY, None)
+            if "seen_ids" in profile_copy:
+                profile_copy["seen_ids"] = seen_ids_for_json(profile_copy["seen_ids"])
             final_profiles_to_save.append(profile_copy)
             continue
 
@@ -100,24 +270,22 @@ def save_profiles_state(
 
         if disk_version: # Profil existuje na disku, aktualizujeme jen seen_ids a enabled, filtry bereme z disku
             profile_to_save = disk_version.copy() 
-            if "seen_ids" in mem_profile and isinstance(mem_profile["seen_ids"], set):
-                profile_to_save["seen_ids"] = sorted(list(mem_profile["seen_ids"]))
+            if "seen_ids" in mem_profile:
+                profile_to_save["seen_ids"] = seen_ids_for_json(mem_profile["seen_ids"])
             else: 
-                profile_to_save.setdefault("seen_ids", [])
-                if isinstance(profile_to_save["seen_ids"], set): 
-                     profile_to_save["seen_ids"] = sorted(list(profile_to_save["seen_ids"]))
+                profile_to_save["seen_ids"] = seen_ids_for_json(profile_to_save.get("seen_ids"))
             # Převezmeme 'enabled' stav z paměti, pokud existuje (mohl být změněn frontendem a pak backendem)
             if "enabled" in mem_profile:
                 profile_to_save["enabled"] = mem_profile["enabled"]
 
             final_profiles_to_save.append(profile_to_save)
-        else: # Profil je nový v paměti nebo byl smazán z disku a znovu vytvořen v paměti
+        elif disk_readable: # Smazán ve frontendu od posledního převzetí změn
+            logger.info(f"Profil '{mem_profile_name}' byl ze souboru smazán, jeho stav z paměti se neukládá.")
+        else: # Soubor chybí nebo je nečitelný - zachová se stav z paměti
             logger.info(f"Profil '{mem_profile_name}' je v paměti, ale nebyl nalezen na disku (nebo je to nový). Bude uložen.")
             profile_copy = mem_profile.copy()
-            if "seen_ids" in profile_copy and isinstance(profile_copy["seen_ids"], set):
-                profile_copy["seen_ids"] = sorted(list(profile_copy["seen_ids"]))
-            else:
-                profile_copy.setdefault("seen_ids", []) 
+            profile_copy.pop(RUNTIME_STATE_KEY, None)
+            profile_copy["seen_ids"] = seen_ids_for_json(profile_copy.get("seen_ids"))
             final_profiles_to_save.append(profile_copy)
 
     for disk_name, disk_profile_data in disk_profiles_map.items():
@@ -134,38 +302,21 @@ def save_profiles_state(
         logger.warning("Výsledný seznam profilů k uložení je prázdný, ale soubor na disku obsahuje data. Ukládání se neprovede.")
         return False
 
-    backup_filepath = "" 
+    tmp_filepath = filepath + ".tmp"
     try:
-        if os.path.exists(filepath):
-            backup_filepath = filepath + ".bak"
-            try:
-                import shutil
-                shutil.copy2(filepath, backup_filepath)
-                logger.debug(f"Vytvořena záloha profilů: {backup_filepath}")
-            except Exception as e_backup:
-                logger.warning(f"Nepodařilo se vytvořit zálohu souboru profilů: {e_backup}")
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(final_profiles_to_save, f, indent=4, ensure_ascii=False)
+        with open(tmp_filepath, 'wb') as f:
+            f.write(dumps_bytes(final_profiles_to_save, indent=4))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filepath, filepath) # Atomická výměna - soubor je vždy buď starý, nebo nový
         logger.info(f"Stav profilů (celkem {len(final_profiles_to_save)}) úspěšně uložen do '{filepath}'.")
-        
-        if backup_filepath and os.path.exists(backup_filepath):
-            try:
-                os.remove(backup_filepath)
-                logger.debug(f"Záloha {backup_filepath} smazána.")
-            except Exception as e_remove_bak:
-                logger.warning(f"Nepodařilo se smazat záložní soubor {backup_filepath}: {e_remove_bak}")
         return True
     except IOError as e:
         logger.error(f"Chyba při zápisu profilů do souboru '{filepath}': {e}", exc_info=True)
-        if backup_filepath and os.path.exists(backup_filepath):
-            try:
-                import shutil
-                shutil.copy2(backup_filepath, filepath) 
-                logger.info(f"Obnoveno ze zálohy: {filepath}")
-            except Exception as e_restore:
-                logger.error(f"Nepodařilo se obnovit ze zálohy {backup_filepath}: {e_restore}")
+        try:
+            if os.path.exists(tmp_filepath): os.remove(tmp_filepath)
+        except OSError: pass
         return False
     except Exception as e: 
         logger.error(f"Neočekávaná chyba při ukládání profilů: {e}", exc_info=True)
-        return False
\ No newline at end of file
+        return False
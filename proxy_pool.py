@@ -0,0 +1,177 @@
+"""Pool proxy: pro každou proxy vlastní zahřátá session, skóre zdraví a vlastní tempo requestů.
+
+proxies_config v nastavení je buď jeden slovník pro requests ({"http": ..., "https": ...}) jako dřív,
+nebo seznam proxy (URL řetězce nebo takové slovníky). Se seznamem se requesty rozkládají mezi zdravé
+proxy, každá má vlastní HostRateLimiter. Proxy s opakovanými 403/429/timeouty jde do karantény
+a po jejím uplynutí se na pozadí znovu ověří zahřátím nové session.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from utils import HostRateLimiter
+from metrics import PROXY_HEALTH, PROXY_QUARANTINES
+
+logger = logging.getLogger(__name__)
+
+HEALTH_SMOOTHING = 0.3          # Váha posledního výsledku ve skóre zdraví (0-1)
+QUARANTINE_BELOW_HEALTH = 0.4   # Přibližně tři neúspěchy po sobě u zdravé proxy
+PROBATION_HEALTH = 0.7          # Skóre proxy, která po karanténě prošla ověřením
+MAX_QUARANTINE_SECONDS = 3600
+# Skóre výsledku requestu: 1 = v pořádku, 0 = proxy je zablokovaná / omezená.
+OUTCOME_SCORES = {"ok": 1.0, "server_error": 0.6, "error": 0.3, "timeout": 0.2, "401": 0.0, "403": 0.0, "429": 0.0}
+
+
+def normalize_proxy_config(proxy_config: Any) -> Optional[Dict[str, str]]:
+    if isinstance(proxy_config, str) and proxy_config.strip():
+        return {"http": proxy_config.strip(), "https": proxy_config.strip()}
+    if isinstance(proxy_config, dict) and proxy_config:
+        return dict(proxy_config)
+    return None
+
+
+def proxy_label(proxies: Dict[str, str]) -> str:
+    """Označení proxy pro logy a metriky - bez jména a hesla."""
+    parsed = urlparse(proxies.get("https") or proxies.get("http") or next(iter(proxies.values()), ""))
+    if not parsed.hostname:
+        return "proxy"
+    return f"{parsed.scheme}://{parsed.hostname}" + (f":{parsed.port}" if parsed.port else "")
+
+
+def outcome_for_status(status_code: int) -> str:
+    if status_code in (401, 403, 429):
+        return str(status_code)
+    return "server_error" if status_code >= 500 else "ok"
+
+
+class ProxyEntry:
+    def __init__(self, proxies: Dict[str, str], requests_per_minute: float):
+        self.proxies = proxies
+        self.label = proxy_label(proxies)
+        self.session = None
+        self.retired_sessions = []   # Vyměněné session - zavřou se až při další výměně (dobíhající requesty)
+        self.rate_limiter = HostRateLimiter(requests_per_minute)
+        self.health = 1.0
+        self.quarantined_until = 0.0 # monotonic; 0 = není v karanténě
+        self.quarantine_count = 0    # Karantény po sobě - každá další je dvakrát delší
+        self.checking = False        # Probíhá ověření po karanténě
+
+
+class ProxyPool:
+    """Rozkládá requesty mezi proxy podle zdraví a volného slotu; scraper ho dostává místo session.
+
+    session_factory(proxies) vrací zahřátou requests.Session, nebo None (get_vinted_session).
+    """
+
+    def __init__(self, proxy_configs: List[Any], session_factory: Callable, requests_per_minute: float = 30, quarantine_seconds: float = 300):
+        self.session_factory = session_factory
+        self.quarantine_seconds = max(1.0, float(quarantine_seconds))
+        self.entries = [ProxyEntry(proxies, requests_per_minute) for proxies in map(normalize_proxy_config, proxy_configs) if proxies]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def sessions(self) -> list:
+        return [entry.session for entry in self.entries if entry.session is not None]
+
+    def _warm_entry(self, entry: ProxyEntry) -> bool:
+        new_session = self.session_factory(entry.proxies)
+        if new_session is None:
+            return False
+        with self._lock:
+            old_session, entry.session = entry.session, new_session
+            retired_sessions, entry.retired_sessions = entry.retired_sessions, [old_session] if old_session is not None else []
+        for retired_session in retired_sessions:
+            retired_session.close()
+        return True
+
+    def warm_up(self) -> int:
+        """Zahřeje session všech proxy mimo karanténu; vrací počet proxy s funkční session."""
+        for entry in self.entries:
+            if entry.quarantined_until:
+                continue
+            logger.info(f"Pool proxy: zahřívám session přes {entry.label}...")
+            if not self._warm_entry(entry):
+                with self._lock:
+                    self._quarantine(entry, "zahřátí session selhalo")
+        ready_count = len(self.sessions)
+        logger.info(f"Pool proxy: {ready_count} z {len(self.entries)} proxy připraveno.")
+        return ready_count
+
+    refresh_sessions = warm_up # Preventivní obnova session zachová skóre zdraví i karantény
+
+    def set_requests_per_minute(self, requests_per_minute: float):
+        for entry in self.entries:
+            entry.rate_limiter.set_rate(requests_per_minute)
+
+    def close(self):
+        for entry in self.entries:
+            for old_session in entry.retired_sessions + ([entry.session] if entry.session is not None else []):
+                old_session.close()
+            entry.retired_sessions, entry.session = [], None
+
+    def _quarantine(self, entry: ProxyEntry, reason: str):
+        entry.quarantine_count += 1
+        duration = min(MAX_QUARANTINE_SECONDS, self.quarantine_seconds * 2 ** (entry.quarantine_count - 1))
+        entry.quarantined_until = time.monotonic() + duration
+        PROXY_QUARANTINES.inc(proxy=entry.label)
+        logger.warning(f"Pool proxy: {entry.label} do karantény na {duration:.0f}s ({reason}, skóre {entry.health:.2f}).")
+
+    def _recheck(self, entry: ProxyEntry):
+        healthy = self._warm_entry(entry)
+        with self._lock:
+            entry.checking = False
+            if healthy:
+                entry.quarantined_until, entry.health = 0.0, PROBATION_HEALTH
+                PROXY_HEALTH.set(entry.health, proxy=entry.label)
+                logger.info(f"Pool proxy: {entry.label} po karanténě znovu v provozu.")
+            else:
+                self._quarantine(entry, "ověření po karanténě selhalo")
+
+    def _start_expired_rechecks(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [e for e in self.entries if e.quarantined_until and e.quarantined_until <= now and not e.checking]
+            for entry in expired:
+                entry.checking = True
+        for entry in expired:
+            threading.Thread(target=self._recheck, args=(entry,), name="proxy-recheck", daemon=True).start()
+
+    def _is_available(self, entry: ProxyEntry, now: float) -> bool:
+        return entry.session is not None and not entry.checking and entry.quarantined_until <= now
+
+    def acquire(self, host: str) -> ProxyEntry:
+        """Vybere dostupnou proxy s nejbližším volným slotem (při shodě zdravější), rezervuje slot a počká na něj."""
+        self._start_expired_rechecks()
+        with self._lock:
+            now = time.monotonic()
+            available = [e for e in self.entries if self._is_available(e, now)]
+            if available:
+                entry = min(available, key=lambda e: (e.rate_limiter.delay_until_free(host), -e.health))
+            else: # Vše v karanténě - použije se ta, která z ní vyjde nejdřív (scraper pak čeká klasickým backoffem)
+                entry = min((e for e in self.entries if e.session is not None), key=lambda e: e.quarantined_until)
+                logger.warning(f"Pool proxy: žádná proxy mimo karanténu, používám {entry.label}.")
+            delay = entry.rate_limiter.reserve(host)
+        if delay > 0:
+            time.sleep(delay)
+        return entry
+
+    def report(self, entry: ProxyEntry, outcome: str):
+        """Započte výsledek requestu do skóre proxy; pod QUARANTINE_BELOW_HEALTH jde proxy do karantény."""
+        with self._lock:
+            entry.health = (1 - HEALTH_SMOOTHING) * entry.health + HEALTH_SMOOTHING * OUTCOME_SCORES.get(outcome, 0.5)
+            PROXY_HEALTH.set(entry.health, proxy=entry.label)
+            if outcome == "ok" and entry.health > 0.95:
+                entry.quarantine_count = 0
+            elif entry.health < QUARANTINE_BELOW_HEALTH and not entry.quarantined_until:
+                self._quarantine(entry, outcome)
+
+    def has_alternative(self, entry: ProxyEntry) -> bool:
+        """Je k dispozici jiná proxy mimo karanténu (místo čekání se dá zkusit ta)?"""
+        now = time.monotonic()
+        with self._lock:
+            return any(e is not entry and self._is_available(e, now) for e in self.entries)
@@ -0,0 +1,80 @@
+"""Předkompilovaný plán requestu profilu: API endpoint, parametry, zakódované URL a hlavičky.
+
+Plán se sestaví z vinted_url jednou a drží se v běhovém stavu profilu (_runtime); znovu se
+sestaví jen při změně vinted_url. Zakódovaná URL (podle per_page / page) se v plánu ukládá
+při prvním použití, hlavičky (bez Refereru) se sdílí pro každou dvojici User-Agent + origin.
+"""
+from types import MappingProxyType
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+from profile_manager import get_runtime_state
+from utils import build_api_params_from_url, get_api_headers
+
+REQUEST_PLAN_STATE_KEY = "request_plan"
+_API_HEADERS_BY_UA: Dict[tuple, Dict[str, str]] = {} # (User-Agent, origin) -> hlavičky; UA je jen pár (utils.USER_AGENTS)
+
+
+def build_query_key(api_endpoint: str, api_params: dict) -> tuple:
+    """Normalizovaný klíč dotazu - profily se stejným klíčem sdílí jeden request na API."""
+    normalized_params = []
+    for key, value in api_params.items():
+        value_str = str(value)
+        if "," in value_str:
+            value_str = ",".join(sorted(v.strip() for v in value_str.split(",")))
+        normalized_params.append((key, value_str))
+    return api_endpoint.rstrip("/"), tuple(sorted(normalized_params))
+
+
+class RequestPlan:
+    """Neměnná část dotazu profilu; api_params je jen pro čtení (MappingProxyType)."""
+
+    __slots__ = ("vinted_url", "api_endpoint", "api_params", "base_url", "referer_path", "referer_url", "query_key", "_pages")
+
+    def __init__(self, vinted_url: str, profile_name: str = "N/A"):
+        api_endpoint, api_params, base_url, referer_path = build_api_params_from_url(vinted_url, profile_name)
+        self.vinted_url = vinted_url
+        self.api_endpoint = api_endpoint
+        self.api_params = MappingProxyType(api_params)
+        self.base_url = base_url
+        self.referer_path = referer_path
+        self.referer_url = base_url + referer_path
+        self.query_key = build_query_key(api_endpoint, api_params)
+        self._pages: Dict[tuple, tuple] = {}
+
+    def page(self, per_page: Any = None, page: Any = None) -> tuple:
+        """(parametry, zakódovaná URL, klíč dotazu) pro dané per_page a stránku; per_page=None ponechá hodnotu z URL."""
+        cache_key = (None if per_page is None else str(per_page), None if page is None else str(page))
+        planned = self._pages.get(cache_key)
+        if planned is None:
+            params = dict(self.api_params)
+            if per_page is not None:
+                params["per_page"] = str(per_page)
+            if page is not None:
+                params["page"] = str(page)
+            planned = self._pages[cache_key] = (params, f"{self.api_endpoint}?{urlencode(params)}", build_query_key(self.api_endpoint, params))
+        return planned
+
+    def url_for(self, api_params: dict) -> str:
+        """Zakódovaná URL pro parametry plánu, u kterých se liší nejvýše per_page / page."""
+        return self.page(api_params.get("per_page"), api_params.get("page"))[1]
+
+    def headers_for(self, session_ua: str) -> Dict[str, str]:
+        """Hlavičky API requestu pro User-Agent session (nový slovník, lze ho doplnit)."""
+        cache_key = (session_ua, self.base_url)
+        headers = _API_HEADERS_BY_UA.get(cache_key)
+        if headers is None:
+            headers = _API_HEADERS_BY_UA[cache_key] = get_api_headers(session_ua=session_ua, origin_url=self.base_url)
+        return dict(headers, Referer=self.referer_url)
+
+
+def get_request_plan(profile_config: Dict[str, Any]) -> Optional[RequestPlan]:
+    """Plán profilu z běhového stavu; sestaví se znovu, pokud se vinted_url od minula změnilo. None bez vinted_url."""
+    vinted_url = profile_config.get("vinted_url", "")
+    if not vinted_url:
+        return None
+    runtime_state = get_runtime_state(profile_config)
+    plan = runtime_state.get(REQUEST_PLAN_STATE_KEY)
+    if plan is None or plan.vinted_url != vinted_url:
+        plan = runtime_state[REQUEST_PLAN_STATE_KEY] = RequestPlan(vinted_url, profile_config.get("name", "N/A"))
+    return plan
@@ -0,0 +1,62 @@
+"""Otisk odpovědi katalogu: pozná, že dotaz vrátil totéž co minule, a scraper pak položky nezpracovává.
+
+Otisk se drží v běhovém stavu každého profilu skupiny (_runtime) a porovnává se ve třech
+stupních od nejlevnějšího: 304 na podmíněný request (ETag / Last-Modified), shodný hash těla
+odpovědi a shodný seznam ID v pořadí odpovědi (tělo se může lišit v počtu oblíbení apod.).
+"""
+import hashlib
+from typing import Any, Dict, Iterable, List
+
+from profile_manager import get_runtime_state
+
+FINGERPRINT_STATE_KEY = "response_fingerprint"
+
+
+class UnchangedResponse:
+    """Návratová hodnota fetch_catalog_items místo položek, když se odpověď od minula nezměnila."""
+
+    __slots__ = ("reason",)
+
+    def __init__(self, reason: str):
+        self.reason = reason # "not_modified" / "body" / "ids"
+
+    def __repr__(self) -> str:
+        return f"UnchangedResponse({self.reason!r})"
+
+
+def body_digest(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def id_list_digest(item_ids: Iterable[Any]) -> str:
+    return hashlib.blake2b(",".join(map(str, item_ids)).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def get_group_fingerprint(profiles: List[Dict[str, Any]], query_key) -> Dict[str, Any]:
+    """Otisk minulé odpovědi, pokud ho mají všechny profily skupiny stejný a pro stejné parametry dotazu.
+
+    Nový profil ve skupině (bez otisku) nebo změna per_page otisk zneplatní - odpověď se zpracuje celá.
+    """
+    fingerprints = [get_runtime_state(p).get(FINGERPRINT_STATE_KEY) for p in profiles]
+    first = fingerprints[0] if fingerprints else None
+    if not first or first.get("query") != query_key or any(fp != first for fp in fingerprints[1:]):
+        return {}
+    return first
+
+
+def store_group_fingerprint(profiles: List[Dict[str, Any]], fingerprint: Dict[str, Any]):
+    """Uloží otisk až po zpracování odpovědi - při chybě uprostřed se příště zpracuje znovu.
+
+    Profily skupiny sdílí jeden slovník; uložený otisk se už nemění (další dotaz plní nový).
+    """
+    for profile_config in profiles:
+        get_runtime_state(profile_config)[FINGERPRINT_STATE_KEY] = fingerprint
+
+
+def conditional_headers(fingerprint: Dict[str, Any]) -> Dict[str, str]:
+    headers = {}
+    if fingerprint.get("etag"):
+        headers["If-None-Match"] = fingerprint["etag"]
+    if fingerprint.get("last_modified"):
+        headers["If-Modified-Since"] = fingerprint["last_modified"]
+    return headers
@@ -0,0 +1,173 @@
+import heapq
+import logging
+import random
+import time
+from typing import List, Dict, Any, Iterable
+
+from profile_manager import get_runtime_state
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_MODES = ("fixed", "adaptive")
+
+
+class PollScheduler:
+    """Rozhoduje, které profily se v dalším kole dotazují a jak dlouho se pak čeká.
+
+    Strategie "fixed" odpovídá původní smyčce: všechny aktivní profily v náhodném
+    pořadí a pak pevná pauza main_loop_sleep_seconds.
+
+    Strategie "adaptive" drží prioritní frontu (heap) podle času příští kontroly.
+    Interval každého profilu se odvozuje z naučené frekvence nových nálezů (EWMA)
+    a je omezen min/max intervalem. Globální rozpočet requestů za minutu se
+    přednostně dává profilům s nejvyšší očekávanou šancí na nový nález.
+    """
+
+    def __init__(self, mode: str = "fixed", main_loop_sleep: float = 300, min_interval: float = 60,
+                 max_interval: float = 1800, requests_per_minute: float = 6, target_new_per_poll: float = 1.0,
+                 rate_smoothing: float = 0.3):
+        self.configure(mode, main_loop_sleep, min_interval, max_interval, requests_per_minute)
+        self.target_new_per_poll = max(0.01, float(target_new_per_poll))
+        self.rate_smoothing = min(1.0, max(0.01, float(rate_smoothing)))
+        self._heap: List[tuple] = []
+        self._due_at_by_name: Dict[str, float] = {} # Platný čas příští kontroly; ostatní záznamy v heapu jsou zastaralé
+        self._budget_tokens = self.requests_per_minute
+        self._budget_updated_at = time.monotonic()
+        self._seeded_rates: Dict[str, float] = {}
+
+    def configure(self, mode: str, main_loop_sleep: float, min_interval: float, max_interval: float, requests_per_minute: float):
+        """Nastavení plánovače (i za běhu po změně scraper_settings.json); naplánované kontroly zůstávají."""
+        self.mode = mode if mode in SCHEDULER_MODES else "fixed"
+        self.main_loop_sleep = main_loop_sleep
+        self.min_interval = max(1.0, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.requests_per_minute = max(0.1, float(requests_per_minute))
+
+    # --- Učení frekvence nálezů ---
+
+    def seed_rates_from_finds(self, finds: Iterable[Dict[str, Any]], window_days: float = 3):
+        """Počáteční odhad frekvence (nálezů za sekundu) pro každý profil z historie nálezů."""
+        if self.mode != "adaptive":
+            return
+        counts: Dict[str, int] = {}
+        window_start = time.time() - window_days * 86400
+        try:
+            for find_data in finds:
+                if (find_data.get("timestamp_found_unix") or 0) >= window_start:
+                    profile_name = find_data.get("profile_name_found")
+                    counts[profile_name] = counts.get(profile_name, 0) + 1
+        except Exception as e:
+            logger.warning(f"Scheduler: Nepodařilo se načíst historii nálezů: {e}")
+            return
+        window_seconds = window_days * 86400
+        self._seeded_rates = {name: count / window_seconds for name, count in counts.items()}
+        logger.info(f"Scheduler: Počáteční frekvence nálezů odvozena z historie pro {len(self._seeded_rates)} profilů.")
+
+    def _rate(self, profile_config: Dict[str, Any]) -> float:
+        runtime_state = get_runtime_state(profile_config)
+        if "finds_rate" not in runtime_state:
+            runtime_state["finds_rate"] = self._seeded_rates.get(profile_config.get("name"), 0.0)
+        return runtime_state["finds_rate"]
+
+    def interval_for(self, profile_config: Dict[str, Any]) -> float:
+        rate = self._rate(profile_config)
+        if rate <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.target_new_per_poll / rate))
+
+    def record_poll(self, profile_config: Dict[str, Any], new_items_count: int):
+        """Zapíše výsledek dotazu profilu a naplánuje jeho příští kontrolu."""
+        if self.mode != "adaptive":
+            return
+        now = time.time()
+        runtime_state = get_runtime_state(profile_config)
+        last_poll_at = runtime_state.get("last_poll_at")
+        if last_poll_at and now > last_poll_at:
+            observed_rate = new_items_count / (now - last_poll_at)
+            runtime_state["finds_rate"] = (1 - self.rate_smoothing) * self._rate(profile_config) + self.rate_smoothing * observed_rate
+        runtime_state["last_poll_at"] = now
+        interval = self.interval_for(profile_config) * random.uniform(0.9, 1.1)
+        self._schedule(profile_config, now + interval)
+        logger.debug(f"Scheduler: Profil '{profile_config.get('name')}' - {new_items_count} nových, odhad {runtime_state['finds_rate'] * 3600:.2f} nálezů/h, další kontrola za {interval:.0f}s.")
+
+    def record_failed_poll(self, profile_config: Dict[str, Any], retry_in: float = 0.0):
+        """Dotaz profilu selhal (vyčerpané pokusy, otevřený jistič) - odhad frekvence se nemění.
+
+        Další pokus za min. interval, případně až po retry_in (zbývající cooldown jističe).
+        """
+        if self.mode != "adaptive":
+            return
+        delay = max(self.min_interval, retry_in) * random.uniform(1.0, 1.1)
+        self._schedule(profile_config, time.time() + delay)
+        logger.debug(f"Scheduler: Dotaz profilu '{profile_config.get('name')}' selhal, další pokus za {delay:.0f}s.")
+
+    def _schedule(self, profile_config: Dict[str, Any], due_at: float):
+        name = profile_config.get("name")
+        heapq.heappush(self._heap, (due_at, name))
+        self._due_at_by_name[name] = due_at
+
+    def _is_current(self, heap_entry: tuple) -> bool:
+        due_at, name = heap_entry
+        return self._due_at_by_name.get(name) == due_at
+
+    def poll_soon(self, profile_config: Dict[str, Any]):
+        """Naplánuje kontrolu profilu hned (nový profil nebo změněný dotaz / filtry)."""
+        if self.mode == "adaptive":
+            self._schedule(profile_config, time.time())
+
+    # --- Výběr profilů ---
+
+    def _refill_budget(self):
+        now = time.monotonic()
+        self._budget_tokens = min(self.requests_per_minute, self._budget_tokens + (now - self._budget_updated_at) * self.requests_per_minute / 60.0)
+        self._budget_updated_at = now
+
+    def next_batch(self, active_profiles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Vrátí profily, které se mají dotazovat teď."""
+        if self.mode != "adaptive":
+            return random.sample(active_profiles, len(active_profiles))
+
+        now = time.time()
+        profiles_by_name = {p.get("name"): p for p in active_profiles}
+        for name, profile_config in profiles_by_name.items():
+            if name not in self._due_at_by_name: # Nový profil (nebo první kolo) - zkontrolovat hned
+                self._schedule(profile_config, now)
+
+        due_profiles = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, name = heapq.heappop(self._heap)
+            profile_config = profiles_by_name.get(name)
+            if profile_config is None: # Profil byl mezitím vypnut/smazán
+                self._due_at_by_name.pop(name, None)
+                continue
+            if not self._is_current((due_at, name)):
+                continue # Zastaralý záznam v heapu
+            due_profiles.append(profile_config)
+            # Pojistka: pokud record_poll nepřijde (např. chyba), profil se vrátí nejpozději po max. intervalu.
+            self._schedule(profile_config, now + self.max_interval)
+
+        self._refill_budget()
+        allowed_count = int(self._budget_tokens)
+        if len(due_profiles) > allowed_count:
+            # Přednost mají profily s nejvyšším očekávaným počtem nových položek od poslední kontroly.
+            def expected_new(p):
+                last_poll_at = get_runtime_state(p).get("last_poll_at")
+                return self._rate(p) * (now - last_poll_at) if last_poll_at else float("inf")
+            due_profiles.sort(key=expected_new, reverse=True)
+            postponed = due_profiles[allowed_count:]
+            due_profiles = due_profiles[:allowed_count]
+            retry_at = now + 60.0 / self.requests_per_minute
+            for profile_config in postponed:
+                self._schedule(profile_config, retry_at)
+            logger.debug(f"Scheduler: Rozpočet requestů vyčerpán, {len(postponed)} profilů odloženo.")
+        self._budget_tokens -= len(due_profiles)
+        return due_profiles
+
+    def seconds_until_next_poll(self) -> float:
+        if self.mode != "adaptive":
+            return self.main_loop_sleep
+        while self._heap and not self._is_current(self._heap[0]): # Jinak by smyčka budila na přeplánované pojistky
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return self.min_interval
+        return max(1.0, self._heap[0][0] - time.time())
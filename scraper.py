@@ -1,17 +1,33 @@
 import requests
 import time
-import json
-import logging
 from datetime import datetime, timezone 
+from urllib.parse import urlparse
+from profile_manager import get_runtime_state
+from seen_ids import SeenIdSet, SEEN_IDS_KEEP_MIN
+from metrics import REQUEST_DURATION, HTTP_ERRORS, REQUEST_RETRIES, ITEMS_PARSED, RESPONSES_UNCHANGED
+from json_codec import dumps, decode_catalog_items, decode_catalog_ids, MAPPING_TYPES, DECODE_ERRORS
+from response_fingerprint import (
+    FINGERPRINT_STATE_KEY, UnchangedResponse, body_digest, id_list_digest, conditional_headers,
+    get_group_fingerprint, store_group_fingerprint
+)
+from vinted_item import VintedItem, format_item_for_display
+from log_facade import get_logger, Lazy
+from proxy_pool import ProxyPool, outcome_for_status
+from request_plan import get_request_plan
 from utils import (
     get_random_user_agent, 
     exponential_backoff_sleep, 
-    get_api_headers,
-    build_api_params_from_url 
 )
 
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 MAX_RETRIES = 5
+# Watermark: položky viděné všemi profily skupiny a starší než watermark - rezerva se už nezpracovávají.
+# Rezerva a počet po sobě jdoucích starých položek chrání před položkami, které v API přijdou mimo pořadí.
+WATERMARK_SAFETY_MARGIN_SECONDS = 15 * 60
+WATERMARK_STOP_AFTER_OLD_ITEMS = 3
+# Adaptivní velikost stránky: klidné dotazy stahují méně položek, rušné více a při mezeře i další stránky.
+PER_PAGE_STEPS = (24, 48, 96)
+MAX_CATCHUP_PAGES = 5
 
 def get_vinted_session(manual_cookie: str = None, proxies: dict = None):
     session = requests.Session()
@@ -20,7 +36,7 @@ def get_vinted_session(manual_cookie: str = None, proxies: dict = None):
 
     if proxies:
         session.proxies.update(proxies)
-        logger.info(f"Session bude používat proxy: {list(proxies.keys())}")
+        logger.info("Session bude používat proxy: %s", list(proxies.keys()))
 
     if manual_cookie:
         session.headers.update({"Cookie": manual_cookie})
@@ -30,9 +46,9 @@ def get_vinted_session(manual_cookie: str = None, proxies: dict = None):
         from utils import DEFAULT_VINTED_BASE_URL as WARMUP_BASE_URL
     except ImportError: 
         WARMUP_BASE_URL = "https://www.vinted.cz" 
-        logger.warning(f"Nepodařilo se importovat DEFAULT_VINTED_BASE_URL z utils, používám {WARMUP_BASE_URL}")
+        logger.warning("Nepodařilo se importovat DEFAULT_VINTED_BASE_URL z utils, používám %s", WARMUP_BASE_URL)
 
-    logger.info(f"Inicializace Vinted session s User-Agent: {initial_ua} pro {WARMUP_BASE_URL}")
+    logger.info("Inicializace Vinted session s User-Agent: %s pro %s", initial_ua, WARMUP_BASE_URL)
 
     try:
         warmup_headers = {
@@ -42,18 +58,18 @@ def get_vinted_session(manual_cookie: str = None, proxies: dict = None):
             "Connection": "keep-alive", "Upgrade-Insecure-Requests": "1",
         }
         
-        logger.debug(f"GET {WARMUP_BASE_URL} (hlavní stránka)...")
+        logger.debug("GET %s (hlavní stránka)...", WARMUP_BASE_URL)
         response_main = session.get(WARMUP_BASE_URL, headers=warmup_headers, timeout=30)
         response_main.raise_for_status()
-        logger.info(f"Hlavní stránka OK ({response_main.status_code}). Cookies v session: {bool(session.cookies)}")
+        logger.info("Hlavní stránka OK (%s). Cookies v session: %s", response_main.status_code, bool(session.cookies))
 
         catalog_url = f"{WARMUP_BASE_URL}/catalog"
         warmup_headers_catalog = warmup_headers.copy()
         warmup_headers_catalog["Referer"] = WARMUP_BASE_URL
-        logger.debug(f"GET {catalog_url} (katalog)...")
+        logger.debug("GET %s (katalog)...", catalog_url)
         response_catalog = session.get(catalog_url, headers=warmup_headers_catalog, timeout=30)
         response_catalog.raise_for_status()
-        logger.info(f"Katalog OK ({response_catalog.status_code}). Cookies v session: {bool(session.cookies)}")
+        logger.info("Katalog OK (%s). Cookies v session: %s", response_catalog.status_code, bool(session.cookies))
         
         if not manual_cookie and session.cookies: logger.info("Automaticky získané cookies pro session.")
         elif not manual_cookie and not session.cookies: logger.warning("Nepodařilo se automaticky získat cookies a nebyla poskytnuta manuální cookie.")
@@ -62,61 +78,67 @@ def get_vinted_session(manual_cookie: str = None, proxies: dict = None):
         elif manual_cookie: logger.info("Použita manuální cookie.")
 
     except requests.exceptions.RequestException as e:
-        logger.error(f"Kritická chyba při inicializaci/zahřívání Vinted session: {e}", exc_info=False)
+        logger.error("Kritická chyba při inicializaci/zahřívání Vinted session: %s", e)
         return None
         
     logger.info("Vinted session připravena.")
     return session
 
+def restore_vinted_session(cookie_record: dict, manual_cookie: str = None, proxies: dict = None):
+    """Session z cookies uložených po dřívějším zahřátí (session_manager) - bez načítání HTML stránek."""
+    session = requests.Session()
+    session.headers.update({"User-Agent": cookie_record.get("user_agent") or get_random_user_agent()})
+    if proxies:
+        session.proxies.update(proxies)
+    if manual_cookie:
+        session.headers.update({"Cookie": manual_cookie})
+    for cookie in cookie_record.get("cookies", []):
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"),
+                            expires=cookie.get("expires"), secure=cookie.get("secure", False))
+    return session
+
 def manual_cookie_in_session_headers(session, manual_cookie_value):
     if not manual_cookie_value: return False
     session_cookie_header = session.headers.get("Cookie", "")
     return manual_cookie_value in session_cookie_header
 
-def extract_item_details(item_data_raw, base_url_for_item_url) -> dict: 
+def get_cheap_item_timestamp(item_data_raw):
+    """Rychlý timestamp položky bez plného zpracování (bez ISO fallbacku a logování)."""
+    photo_data = item_data_raw.get('photo')
+    if isinstance(photo_data, MAPPING_TYPES):
+        high_res_photo = photo_data.get('high_resolution')
+        if isinstance(high_res_photo, MAPPING_TYPES) and high_res_photo.get("timestamp") is not None:
+            try: return int(high_res_photo["timestamp"])
+            except (ValueError, TypeError): pass
+    if item_data_raw.get("created_at_ts") is not None:
+        try: return int(item_data_raw["created_at_ts"])
+        except (ValueError, TypeError): pass
+    return None
+
+def resolve_item_timestamp(item_data_raw) -> tuple:
+    """Timestamp položky pro řazení a jeho zdroj (fotka, created_at_ts, ISO created_at, jinak 0)."""
     title = item_data_raw.get('title', 'N/A')
     item_id_for_log = item_data_raw.get('id', 'N/A')
-    price_amount_str, currency_str = "N/A", item_data_raw.get('currency', 'CZK')
-    price_obj = item_data_raw.get('price')
-    if isinstance(price_obj, str): price_amount_str = price_obj
-    elif isinstance(price_obj, dict):
-        price_amount_str = price_obj.get('amount', 'N/A')
-        currency_str = price_obj.get('currency', price_obj.get('currency_code', currency_str))
-    
-    try: price_numeric = float(price_amount_str)
-    except (ValueError, TypeError): price_numeric = None
-
-    status = item_data_raw.get('status', 'N/A')
-    size = item_data_raw.get('size_title', 'N/A')
-    brand = item_data_raw.get('brand_title', 'N/A')
-    
-    photo_url = None
     vinted_item_timestamp = None 
     timestamp_source = "Nenalezen"
     
     photo_data = item_data_raw.get('photo')
-    if isinstance(photo_data, dict):
-        photo_url = photo_data.get('url') # Získáme hlavní URL fotky
-        
+    if isinstance(photo_data, MAPPING_TYPES):
         # VŽDY se pokusíme získat timestamp z high_resolution, pokud existuje
         high_res_photo = photo_data.get('high_resolution')
-        if isinstance(high_res_photo, dict):
-            if not photo_url: # Pokud hlavní URL nebylo, vezmeme ho z high-res
-                photo_url = high_res_photo.get('url')
-            
-            if high_res_photo.get("timestamp") is not None:
-                try:
-                    vinted_item_timestamp = int(high_res_photo.get("timestamp"))
-                    timestamp_source = "photo.high_resolution.timestamp"
-                except ValueError:
-                    logger.warning(f"Item ID {item_id_for_log}: Neplatný formát photo.high_resolution.timestamp: {high_res_photo.get('timestamp')}")
+        if isinstance(high_res_photo, MAPPING_TYPES) and high_res_photo.get("timestamp") is not None:
+            try:
+                vinted_item_timestamp = int(high_res_photo.get("timestamp"))
+                timestamp_source = "photo.high_resolution.timestamp"
+            except ValueError:
+                logger.warning("Item ID %s: Neplatný formát photo.high_resolution.timestamp: %s", item_id_for_log, high_res_photo.get('timestamp'), item_id=item_id_for_log)
 
     if vinted_item_timestamp is None and item_data_raw.get("created_at_ts") is not None:
         try:
             vinted_item_timestamp = int(item_data_raw.get("created_at_ts"))
             timestamp_source = "created_at_ts"
         except ValueError:
-            logger.warning(f"Item ID {item_id_for_log}: Neplatný formát created_at_ts: {item_data_raw.get('created_at_ts')}")
+            logger.warning("Item ID %s: Neplatný formát created_at_ts: %s", item_id_for_log, item_data_raw.get('created_at_ts'), item_id=item_id_for_log)
 
     if vinted_item_timestamp is None:
         created_at_iso = item_data_raw.get("created_at") 
@@ -126,53 +148,21 @@ def extract_item_details(item_data_raw, base_url_for_item_url) -> dict:
                 vinted_item_timestamp = int(dt_obj.timestamp())
                 timestamp_source = f"created_at (ISO: {created_at_iso})"
             except ValueError:
-                logger.debug(f"Item ID {item_id_for_log}: Nepodařilo se parsovat ISO timestamp z 'created_at': {created_at_iso}")
+                logger.debug("Item ID %s: Nepodařilo se parsovat ISO timestamp z 'created_at': %s", item_id_for_log, created_at_iso)
         elif created_at_iso:
-             logger.debug(f"Item ID {item_id_for_log}: Pole 'created_at' není string: {created_at_iso} (typ: {type(created_at_iso)})")
+             logger.debug("Item ID %s: Pole 'created_at' není string: %s (typ: %s)", item_id_for_log, created_at_iso, type(created_at_iso))
 
     if vinted_item_timestamp is None:
-        logger.warning(f"Item ID {item_id_for_log}: PLATNÝ TIMESTAMP NENALEZEN! Titulek: {title[:30]}. Bude řazena s TS 0.")
+        logger.warning("Item ID %s: PLATNÝ TIMESTAMP NENALEZEN! Titulek: %.30s. Bude řazena s TS 0.", item_id_for_log, title, item_id=item_id_for_log)
         vinted_item_timestamp = 0 
         timestamp_source = "Fallback na 0"
-        if logger.getEffectiveLevel() <= logging.DEBUG:
-            logger.debug(f"Item ID {item_id_for_log}: RAW DATA pro položku s TS=0 (po všech pokusech):\n{json.dumps(item_data_raw, indent=2, ensure_ascii=False)}")
-    
-    logger.debug(f"Item ID {item_id_for_log}: Finální TS = {vinted_item_timestamp}, Zdroj = '{timestamp_source}', Titulek = {title[:30]}")
-
-    url_path = item_data_raw.get('url', '')
-    full_url = base_url_for_item_url + url_path if url_path and not url_path.startswith("http") else url_path or "N/A"
-
-    return {
-        "id": item_id_for_log, "title": title, "price_numeric": price_numeric,
-        "price_str": price_amount_str, "currency": currency_str, "status": status,
-        "size": size, "brand": brand, "url": full_url, "photo_url": photo_url,
-        "vinted_item_timestamp": vinted_item_timestamp , 
-        "_timestamp_source": timestamp_source, 
-    }
-
-def format_item_for_display(item_details_dict: dict) -> str:
-    title = item_details_dict.get('title', 'N/A')
-    price_numeric = item_details_dict.get('price_numeric')
-    currency = item_details_dict.get('currency', 'CZK')
+        logger.debug("Item ID %s: RAW DATA pro položku s TS=0 (po všech pokusech):\n%s", item_id_for_log, Lazy(dumps, item_data_raw, indent=2))
     
-    if price_numeric is not None:
-        formatted_price = f"{price_numeric:,.0f}".replace(",", " ") + f" {currency}"
-    else:
-        formatted_price = f"{item_details_dict.get('price_str', 'N/A')} {currency}"
-
-    status = item_details_dict.get('status', 'N/A')
-    size = item_details_dict.get('size', 'N/A')
-    brand = item_details_dict.get('brand', 'N/A')
-    full_url = item_details_dict.get('url', 'N/A')
-    
-    details_parts = []
-    if status and status != 'N/A': details_parts.append(f"Stav: {status}")
-    if size and size != 'N/A': details_parts.append(f"Velikost: {size}")
-    if brand and brand != 'N/A' and brand.lower() not in title.lower():
-        details_parts.append(f"Značka: {brand}")
-    
-    details_output_str = " – ".join(filter(None, details_parts))
-    return f"[🆕] {title} – {formatted_price} – {details_output_str}\n     {full_url}"
+    logger.debug("Item ID %s: Finální TS = %s, Zdroj = '%s', Titulek = %.30s", item_id_for_log, vinted_item_timestamp, timestamp_source, title)
+    return vinted_item_timestamp, timestamp_source
+
+def extract_item_details(item_data_raw, base_url_for_item_url) -> VintedItem:
+    return VintedItem(item_data_raw, base_url_for_item_url, *resolve_item_timestamp(item_data_raw))
 
 def check_keywords(title_to_check: str, profile_filters: dict) -> bool:
     must_have_config = profile_filters.get("must_have_keywords", [])
@@ -187,12 +177,12 @@ def check_keywords(title_to_check: str, profile_filters: dict) -> bool:
             ex_keyword = str(ex_keyword_orig) 
             processed_ex_keyword = ex_keyword if case_sensitive else ex_keyword.lower()
             if processed_ex_keyword.strip() and processed_ex_keyword.strip() in title_to_check:
-                logger.debug(f"Položka vyloučena kvůli slovu '{ex_keyword_orig}': {title_to_check[:50]}...")
+                logger.debug("Položka vyloučena kvůli slovu '%s': %.50s...", ex_keyword_orig, title_to_check)
                 return False
 
     if must_have_config:
         if not isinstance(must_have_config, list):
-            logger.warning(f"Neplatný formát must_have_keywords: {must_have_config}.")
+            logger.warning("Neplatný formát must_have_keywords: %s.", must_have_config)
             return True 
         if not must_have_config: return True
 
@@ -206,7 +196,7 @@ def check_keywords(title_to_check: str, profile_filters: dict) -> bool:
                     if processed_keyword.strip() and processed_keyword.strip() in title_to_check:
                         found_in_or_group = True; break 
                 if not found_in_or_group:
-                    logger.debug(f"Položka nesplnila OR skupinu {or_group} v must_have_keywords: {title_to_check[:50]}...")
+                    logger.debug("Položka nesplnila OR skupinu %s v must_have_keywords: %.50s...", or_group, title_to_check)
                     return False
             return True 
         elif all(isinstance(item, str) for item in must_have_config): 
@@ -214,138 +204,438 @@ def check_keywords(title_to_check: str, profile_filters: dict) -> bool:
                 keyword = str(keyword_orig)
                 processed_keyword = keyword if case_sensitive else keyword.lower()
                 if processed_keyword.strip() and processed_keyword.strip() not in title_to_check:
-                    logger.debug(f"Položka nesplnila AND klíčové slovo '{keyword_orig}' v must_have_keywords: {title_to_check[:50]}...")
+                    logger.debug("Položka nesplnila AND klíčové slovo '%s' v must_have_keywords: %.50s...", keyword_orig, title_to_check)
                     return False
             return True 
         else: 
-            logger.warning(f"Neplatný smíšený formát must_have_keywords: {must_have_config}.")
+            logger.warning("Neplatný smíšený formát must_have_keywords: %s.", must_have_config)
             return True 
     return True
 
 
-def fetch_new_items(session, profile_config):
-    profile_name = profile_config["name"]
-    vinted_url_from_profile = profile_config.get("vinted_url", "")
-    local_filters_def = profile_config.get("filters", {}) 
-    seen_ids = profile_config.get("seen_ids", set())
-    
-    if not vinted_url_from_profile:
-        logger.warning(f"Profil '{profile_name}': Chybí 'vinted_url'. Přeskakuji.")
-        return [], [], set()
-
-    api_endpoint, api_params, base_url_for_req, original_url_path_query = build_api_params_from_url(vinted_url_from_profile, profile_name)
-        
-    logger.info(f"Profil '{profile_name}': Stahuji data z API '{api_endpoint}' s parametry: {json.dumps(api_params)}")
-
-    new_items_strings, new_items_data_list, ids_to_mark_as_seen = [], [], set()
-    current_session_ua = session.headers.get("User-Agent", get_random_user_agent())
+def group_profiles_by_query(profiles: list) -> list:
+    """Seskupí profily podle (endpoint, api_params), aby se každý unikátní dotaz stahoval jen jednou za cyklus.
+
+    Skupina nese plán requestu (request_plan.RequestPlan) svého prvního profilu.
+    """
+    groups = {}
+    for profile_config in profiles:
+        plan = get_request_plan(profile_config)
+        if plan is None:
+            profile_name = profile_config.get("name", "N/A")
+            logger.warning("Profil '%s': Chybí 'vinted_url'. Přeskakuji.", profile_name, profile=profile_name)
+            continue
+        group = groups.get(plan.query_key)
+        if group is None:
+            group = groups[plan.query_key] = {
+                "query_key": plan.query_key, "plan": plan, "api_endpoint": plan.api_endpoint, "api_params": plan.api_params,
+                "base_url": plan.base_url, "referer_path": plan.referer_path, "profiles": [],
+            }
+        group["profiles"].append(profile_config)
+    coalesced = [g for g in groups.values() if len(g["profiles"]) > 1]
+    if coalesced:
+        logger.info("Sloučeno %d profilů do %d sdílených dotazů (celkem %d unikátních dotazů).", sum(len(g['profiles']) for g in coalesced), len(coalesced), len(groups))
+    return list(groups.values())
+
+
+def get_group_label(group: dict) -> str:
+    return " + ".join(p.get("name", "N/A") for p in group["profiles"])
+
+
+def inc_per_profile(counter, group: dict, amount: float = 1, **labels):
+    """Metriky se počítají pro každý profil skupiny zvlášť (popisek skupiny se mění s jejím složením)."""
+    for profile_config in group["profiles"]:
+        counter.inc(amount, profile=profile_config.get("name", "N/A"), **labels)
+
+
+def decode_catalog_response(content: bytes, response_headers, fingerprint: dict):
+    """Dekóduje odpověď a zapíše její otisk do fingerprint (v něm je na vstupu otisk minulé odpovědi).
+
+    Při shodě těla nebo seznamu ID s minulou odpovědí vrací UnchangedResponse - plné dekódování
+    se přeskočí (s msgspec se ID čtou bez dekódování zbytku položek).
+    """
+    previous = dict(fingerprint)
+    fingerprint.update(body=body_digest(content), etag=response_headers.get("ETag"), last_modified=response_headers.get("Last-Modified"))
+    if previous.get("body") == fingerprint["body"]:
+        return UnchangedResponse("body")
+    items, item_ids = None, decode_catalog_ids(content)
+    if item_ids is None:
+        items = decode_catalog_items(content)
+        item_ids = [i.get("id") for i in items]
+    fingerprint["ids"] = id_list_digest(item_ids)
+    if previous.get("ids") == fingerprint["ids"]:
+        return UnchangedResponse("ids")
+    return items if items is not None else decode_catalog_items(content)
+
+
+def backoff_or_switch_proxy(pool, proxy_entry, attempt, base_delay, context):
+    """S poolem proxy se místo čekání hned zkusí jiná dostupná proxy; bez ní klasický exponential backoff."""
+    if pool is not None and pool.has_alternative(proxy_entry):
+        logger.info("    🔀 %s - zkouším jinou proxy místo čekání.", context)
+        return
+    exponential_backoff_sleep(attempt, base_delay=base_delay, context=context)
+
+
+def fetch_catalog_items(session, group: dict, rate_limiter=None, api_params: dict = None, fingerprint: dict = None, circuit_breaker=None):
+    """Stáhne položky jednoho dotazu z API (s opakováním). Vrací seznam surových položek, nebo None při selhání.
+
+    session může být i ProxyPool - každý pokus pak jde přes proxy vybranou poolem (s jejím
+    vlastním tempem místo rate_limiter) a výsledek se započte do jejího skóre zdraví.
+    S fingerprint (otisk minulé odpovědi, viz response_fingerprint) posílá podmíněné hlavičky
+    a pro nezměněnou odpověď vrací UnchangedResponse; fingerprint se přepíše otiskem nové odpovědi.
+    S circuit_breaker (HostCircuitBreaker, jen bez poolu) se při otevřeném jističi request neposílá
+    a po 429 / dávce 403 se místo dalších pokusů vrací None - profil se zkusí v dalším cyklu.
+    """
+    profile_name = get_group_label(group)
+    plan = group["plan"]
+    api_endpoint, api_params = plan.api_endpoint, api_params if api_params is not None else plan.page()[0]
+    request_url = plan.url_for(api_params)
+    api_host = urlparse(api_endpoint).netloc
+
+    logger.info("Profil '%s': Stahuji data z API '%s' s parametry: %s", profile_name, api_endpoint, Lazy(dumps, api_params), profile=profile_name)
+    pool = session if isinstance(session, ProxyPool) else None
+    breaker = circuit_breaker if pool is None else None
+    proxy_entry = None
 
     for attempt in range(MAX_RETRIES):
-        api_request_headers = get_api_headers(
-            session_ua=current_session_ua,
-            origin_url=base_url_for_req,
-            referer_url=base_url_for_req + original_url_path_query
-        )
-        logger.debug(f"Profil '{profile_name}' Pokus {attempt + 1}/{MAX_RETRIES} s UA: {current_session_ua}, Origin: {base_url_for_req}, Referer: {api_request_headers['Referer']}")
+        if breaker is not None and not breaker.allow_request(api_host):
+            logger.info("Profil '%s': Jistič pro '%s' je otevřený (zbývá %.0fs), request se přeskakuje.", profile_name, api_host, breaker.remaining_cooldown(api_host), profile=profile_name)
+            return None
+        if pool is not None:
+            proxy_entry = pool.acquire(api_host)
+        http_session = proxy_entry.session if proxy_entry is not None else session
+        current_session_ua = http_session.headers.get("User-Agent", get_random_user_agent())
+        api_request_headers = plan.headers_for(current_session_ua)
+        if fingerprint:
+            api_request_headers.update(conditional_headers(fingerprint))
+        logger.debug("Profil '%s' Pokus %d/%d s UA: %s, Origin: %s, Referer: %s", profile_name, attempt + 1, MAX_RETRIES, current_session_ua, plan.base_url, plan.referer_url)
         
         response = None
         try:
-            response = session.get(api_endpoint, params=api_params, headers=api_request_headers, timeout=35)
+            if rate_limiter is not None and pool is None:
+                rate_limiter.acquire(api_host)
+            request_started_at = time.perf_counter()
+            response = http_session.get(request_url, headers=api_request_headers, timeout=35)
+            REQUEST_DURATION.observe(time.perf_counter() - request_started_at, host=api_host)
+            if pool is not None:
+                pool.report(proxy_entry, outcome_for_status(response.status_code))
+            if breaker is not None:
+                breaker.record_response(api_host, response.status_code, response.headers.get("Retry-After"))
             
             if response.status_code in [401, 403, 429, 500, 502, 503, 504]:
+                status_label = "5xx" if response.status_code >= 500 else str(response.status_code)
+                inc_per_profile(HTTP_ERRORS, group, status=status_label)
                 context_msg = f"Profil '{profile_name}' API vrátilo {response.status_code} (Pokus {attempt + 1})"
-                logger.warning(context_msg)
-                logger.debug(f"Obsah odpovědi při chybě ({response.status_code}): {response.text[:300] if response else 'N/A'}")
+                logger.warning(context_msg, profile=profile_name, status=response.status_code, attempt=attempt + 1)
+                logger.debug("Obsah odpovědi při chybě (%s): %.300s", response.status_code, Lazy(lambda: response.text))
+                if breaker is not None and breaker.state(api_host) != "closed":
+                    logger.info("Profil '%s': Host '%s' omezuje requesty - bez dalších pokusů, zkusí se v dalším cyklu.", profile_name, api_host, profile=profile_name)
+                    return None
                 if attempt < MAX_RETRIES - 1:
                     base_delay = 15 if response.status_code in [401, 403] else 7
-                    exponential_backoff_sleep(attempt, base_delay=base_delay, context=context_msg)
+                    inc_per_profile(REQUEST_RETRIES, group, reason=status_label)
+                    backoff_or_switch_proxy(pool, proxy_entry, attempt, base_delay, context_msg)
                     new_ua = get_random_user_agent()
                     if new_ua != current_session_ua:
-                        session.headers.update({"User-Agent": new_ua}); current_session_ua = new_ua
-                        logger.info(f"Profil '{profile_name}': User-Agent pro session změněn na: {new_ua}")
+                        http_session.headers.update({"User-Agent": new_ua}); current_session_ua = new_ua
+                        logger.info("Profil '%s': User-Agent pro session změněn na: %s", profile_name, new_ua)
                     continue
                 else:
-                    logger.error(f"Profil '{profile_name}': Nepodařilo se načíst data po {MAX_RETRIES} pokusech (status {response.status_code}).")
-                    return [], [], set()
+                    logger.error("Profil '%s': Nepodařilo se načíst data po %d pokusech (status %s).", profile_name, MAX_RETRIES, response.status_code, profile=profile_name, status=response.status_code)
+                    return None
 
+            if response.status_code == 304 and fingerprint and (fingerprint.get("etag") or fingerprint.get("last_modified")):
+                return UnchangedResponse("not_modified")
             response.raise_for_status()
-            data = response.json()
-            api_items_raw = data.get("items", [])
-            
-            if not api_items_raw:
-                logger.info(f"Profil '{profile_name}': API nevrátilo žádné položky pro dané filtry.")
-                return [], [], set()
-
-            logger.info(f"Profil '{profile_name}': Nalezeno {len(api_items_raw)} položek z API. Zpracovávám a řadím...")
-
-            processed_api_items_with_details = []
-            for item_data_raw_loop in api_items_raw:
-                item_details_loop = extract_item_details(item_data_raw_loop, base_url_for_req)
-                if item_details_loop.get("id"):
-                    processed_api_items_with_details.append(item_details_loop)
-            
-            if logger.getEffectiveLevel() <= logging.DEBUG and processed_api_items_with_details:
-                logger.debug(f"Profil '{profile_name}': Prvních 5 položek PŘED lokálním řazením (ID: TS - Titulek):")
-                for i, item_debug in enumerate(processed_api_items_with_details[:5]):
-                    logger.debug(f"  {i+1}. {item_debug.get('id')}: {item_debug.get('vinted_item_timestamp')} ({item_debug.get('_timestamp_source')}) - {item_debug.get('title', '')[:40]}")
-
-            processed_api_items_with_details.sort(key=lambda x: x.get("vinted_item_timestamp", 0), reverse=True)
-            
-            if logger.getEffectiveLevel() <= logging.DEBUG and processed_api_items_with_details:
-                logger.debug(f"Profil '{profile_name}': Prvních 5 položek PO lokálním řazení (ID: TS - Titulek):")
-                for i, item_debug in enumerate(processed_api_items_with_details[:5]):
-                    logger.debug(f"  {i+1}. {item_debug.get('id')}: {item_debug.get('vinted_item_timestamp')} ({item_debug.get('_timestamp_source')}) - {item_debug.get('title', '')[:40]}")
-
-            for item_details_sorted in processed_api_items_with_details:
-                item_id = item_details_sorted.get("id")
-                if item_id not in seen_ids:
-                    title_original = item_details_sorted.get('title', '')
-                    if not check_keywords(title_original, local_filters_def): 
-                        continue 
-                    
-                    new_items_strings.append(format_item_for_display(item_details_sorted))
-                    new_items_data_list.append(item_details_sorted) 
-                    ids_to_mark_as_seen.add(item_id)
-            
-            if new_items_data_list:
-                 logger.info(f"Profil '{profile_name}': Nalezeno {len(new_items_data_list)} nových položek po lokálním seřazení a filtrování.")
-                 for item_str in new_items_strings: 
-                    logger.info(item_str)
-            else:
-                 logger.info(f"Profil '{profile_name}': Žádné NOVÉ položky (z {len(api_items_raw)} celkem) po lokálním seřazení a filtrování klíčových slov.")
-            
-            return new_items_strings, new_items_data_list, ids_to_mark_as_seen
+            if fingerprint is None:
+                return decode_catalog_items(response.content)
+            return decode_catalog_response(response.content, response.headers, fingerprint)
 
         except requests.exceptions.Timeout as e:
-            logger.warning(f"Profil '{profile_name}' Timeout (Pokus {attempt + 1}): {e}")
+            logger.warning("Profil '%s' Timeout (Pokus %d): %s", profile_name, attempt + 1, e, profile=profile_name, attempt=attempt + 1)
+            if pool is not None:
+                pool.report(proxy_entry, "timeout")
+            if breaker is not None:
+                breaker.record_failure(api_host)
             if attempt < MAX_RETRIES - 1:
-                exponential_backoff_sleep(attempt, base_delay=20, context=f"Timeout pro '{profile_name}'")
-                new_ua = get_random_user_agent(); session.headers.update({"User-Agent": new_ua}); current_session_ua = new_ua
-                logger.info(f"Profil '{profile_name}': User-Agent změněn na {new_ua} po timeoutu.")
+                inc_per_profile(REQUEST_RETRIES, group, reason="timeout")
+                backoff_or_switch_proxy(pool, proxy_entry, attempt, 20, f"Timeout pro '{profile_name}'")
+                new_ua = get_random_user_agent(); http_session.headers.update({"User-Agent": new_ua}); current_session_ua = new_ua
+                logger.info("Profil '%s': User-Agent změněn na %s po timeoutu.", profile_name, new_ua)
                 continue
-            logger.error(f"Profil '{profile_name}': Nepodařilo se načíst data po {MAX_RETRIES} pokusech (timeout).")
-            return [], [], set()
+            logger.error("Profil '%s': Nepodařilo se načíst data po %d pokusech (timeout).", profile_name, MAX_RETRIES, profile=profile_name)
+            return None
         except requests.exceptions.SSLError as e:
-            logger.error(f"Profil '{profile_name}' SSL Chyba (Pokus {attempt + 1}): {e}")
+            logger.error("Profil '%s' SSL Chyba (Pokus %d): %s", profile_name, attempt + 1, e, profile=profile_name, attempt=attempt + 1)
+            if pool is not None:
+                pool.report(proxy_entry, "error")
+            if breaker is not None:
+                breaker.record_failure(api_host)
             if attempt < MAX_RETRIES - 1:
-                exponential_backoff_sleep(attempt, base_delay=30, context=f"SSL Chyba pro '{profile_name}'")
+                inc_per_profile(REQUEST_RETRIES, group, reason="ssl")
+                backoff_or_switch_proxy(pool, proxy_entry, attempt, 30, f"SSL Chyba pro '{profile_name}'")
                 continue
-            logger.error(f"Profil '{profile_name}': Nepodařilo se načíst data po {MAX_RETRIES} pokusech (SSL chyba).")
-            return [], [], set()
+            logger.error("Profil '%s': Nepodařilo se načíst data po %d pokusech (SSL chyba).", profile_name, MAX_RETRIES, profile=profile_name)
+            return None
         except requests.exceptions.RequestException as e:
-            logger.warning(f"Profil '{profile_name}' Obecná síťová chyba (Pokus {attempt + 1}): {e}")
+            logger.warning("Profil '%s' Obecná síťová chyba (Pokus %d): %s", profile_name, attempt + 1, e, profile=profile_name, attempt=attempt + 1)
+            if pool is not None:
+                pool.report(proxy_entry, "error")
+            if breaker is not None:
+                breaker.record_failure(api_host)
             if attempt < MAX_RETRIES - 1:
-                 exponential_backoff_sleep(attempt, base_delay=10, context=f"Síťová chyba pro '{profile_name}'")
-                 new_ua = get_random_user_agent(); session.headers.update({"User-Agent": new_ua}); current_session_ua = new_ua
-                 logger.info(f"Profil '{profile_name}': User-Agent změněn na {new_ua} po síťové chybě.")
+                 inc_per_profile(REQUEST_RETRIES, group, reason="network")
+                 backoff_or_switch_proxy(pool, proxy_entry, attempt, 10, f"Síťová chyba pro '{profile_name}'")
+                 new_ua = get_random_user_agent(); http_session.headers.update({"User-Agent": new_ua}); current_session_ua = new_ua
+                 logger.info("Profil '%s': User-Agent změněn na %s po síťové chybě.", profile_name, new_ua)
                  continue
-            logger.error(f"Profil '{profile_name}': Nepodařilo se načíst data po {MAX_RETRIES} pokusech (síťová chyba).")
-            return [], [], set()
-        except json.JSONDecodeError as e:
-            logger.error(f"Profil '{profile_name}': Chyba při parsování JSON odpovědi: {e}")
-            error_response_text = response.text if response else "Žádná odpověď od serveru."
-            logger.debug(f"   Text odpovědi (prvních 500 znaků): {error_response_text[:500]}...")
-            return [], [], set() 
-
-    logger.error(f"Profil '{profile_name}': Nepodařilo se zpracovat po všech {MAX_RETRIES} pokusech.")
-    return [], [], set()
\ No newline at end of file
+            logger.error("Profil '%s': Nepodařilo se načíst data po %d pokusech (síťová chyba).", profile_name, MAX_RETRIES, profile=profile_name)
+            return None
+        except DECODE_ERRORS as e:
+            logger.error("Profil '%s': Chyba při parsování JSON odpovědi: %s", profile_name, e, profile=profile_name)
+            logger.debug("   Text odpovědi (prvních 500 znaků): %.500s...", Lazy(lambda: response.text if response else "Žádná odpověď od serveru."))
+            return None
+
+    logger.error("Profil '%s': Nepodařilo se zpracovat po všech %d pokusech.", profile_name, MAX_RETRIES, profile=profile_name)
+    return None
+
+
+def select_new_items(sorted_candidates: list, profiles: list, total_api_items: int, keyword_matcher=None, base_url_for_item_url: str = "") -> list:
+    """Ze seřazených kandidátů (timestamp, zdroj timestampu, surová položka) vybere pro každý profil skupiny nové položky, které projdou jeho lokálními filtry.
+
+    Titulek se vyhodnocuje jednou pro všechny profily, které položku ještě neviděly
+    (KeywordMatcher); profily mimo matcher se filtrují přes check_keywords. VintedItem
+    se vytvoří jen pro položky, které přijme aspoň jeden profil, a profily ho sdílejí.
+    """
+    results = [([], [], set()) for _ in profiles]
+    for vinted_item_timestamp, timestamp_source, item_data_raw in sorted_candidates:
+        item_id = item_data_raw.get("id")
+        candidate_indexes = [i for i, p in enumerate(profiles) if item_id not in p.get("seen_ids", ())]
+        if not candidate_indexes:
+            continue
+        title_original = item_data_raw.get('title', 'N/A')
+        item = None
+        matched = {}
+        if keyword_matcher is not None:
+            matched = keyword_matcher.match(title_original, [profiles[i].get("name") for i in candidate_indexes if profiles[i].get("name") in keyword_matcher])
+        for i in candidate_indexes:
+            profile_config = profiles[i]
+            profile_name = profile_config.get("name")
+            accepted = matched[profile_name] if profile_name in matched else check_keywords(title_original, profile_config.get("filters", {}))
+            if not accepted:
+                continue
+            if item is None:
+                item = VintedItem(item_data_raw, base_url_for_item_url, vinted_item_timestamp, timestamp_source)
+            new_items_strings, new_items_data_list, ids_to_mark_as_seen = results[i]
+            new_items_strings.append(item.display)
+            new_items_data_list.append(item) 
+            ids_to_mark_as_seen.add(item_id)
+    
+    for profile_config, (new_items_strings, new_items_data_list, _) in zip(profiles, results):
+        profile_name = profile_config.get("name", "N/A")
+        if new_items_data_list:
+             logger.info("Profil '%s': Nalezeno %d nových položek po lokálním seřazení a filtrování.", profile_name, len(new_items_data_list), profile=profile_name, new_items=len(new_items_data_list))
+             for item_str in new_items_strings: 
+                logger.info(item_str, profile=profile_name)
+        else:
+             logger.info("Profil '%s': Žádné NOVÉ položky (z %d celkem) po lokálním seřazení a filtrování klíčových slov.", profile_name, total_api_items, profile=profile_name, new_items=0)
+    
+    return results
+
+
+def _next_per_page(per_page: int, arrivals_count, pages_fetched: int) -> int:
+    step_index = PER_PAGE_STEPS.index(per_page) if per_page in PER_PAGE_STEPS else len(PER_PAGE_STEPS) - 1
+    if arrivals_count is None:
+        return per_page
+    if pages_fetched > 1: # Byla mezera - rovnou na maximum
+        step_index = len(PER_PAGE_STEPS) - 1
+    elif arrivals_count >= per_page // 2:
+        step_index = min(len(PER_PAGE_STEPS) - 1, step_index + 1)
+    elif arrivals_count <= per_page // 10:
+        step_index = max(0, step_index - 1)
+    return PER_PAGE_STEPS[step_index]
+
+
+def fetch_catalog_pages(session, group: dict, rate_limiter=None, fingerprint: dict = None, circuit_breaker=None):
+    """Stáhne položky skupiny s adaptivním per_page a případným dohledáním mezery přes další stránky.
+
+    Pokud jsou všechny položky plné stránky novější než dosud známé (watermark ID) a nikdo
+    ze skupiny je neviděl, mohly mezi dvěma dotazy přibýt další - stahuje se page=2..n,
+    dokud se nenarazí na známou položku (nejvýše MAX_CATCHUP_PAGES stran).
+    Do fingerprint se zapíše otisk první stránky; když se od minula nezměnila, vrací UnchangedResponse.
+    """
+    profile_name = get_group_label(group)
+    group_profiles = group["profiles"]
+    runtime_states = [get_runtime_state(p) for p in group_profiles]
+    known_watermark_id = min((rs.get("watermark_id") or 0) for rs in runtime_states)
+    per_page = max((rs.get("per_page") or PER_PAGE_STEPS[-1]) for rs in runtime_states)
+    request_params, _, query_key = group["plan"].page(per_page)
+
+    def is_known(item_data_raw):
+        item_id = item_data_raw.get("id")
+        if isinstance(item_id, int) and item_id <= known_watermark_id:
+            return True
+        return any(item_id in p.get("seen_ids", ()) for p in group_profiles)
+
+    if fingerprint is not None:
+        fingerprint.update(get_group_fingerprint(group_profiles, query_key), query=query_key)
+
+    page_items = fetch_catalog_items(session, group, rate_limiter, request_params, fingerprint, circuit_breaker)
+    if page_items is None:
+        return None
+    if isinstance(page_items, UnchangedResponse): # Nic nepřibylo - jen případně zmenšíme per_page
+        next_per_page = _next_per_page(per_page, 0 if known_watermark_id else None, 1)
+        for runtime_state in runtime_states:
+            runtime_state["per_page"] = next_per_page
+        return page_items
+    api_items_raw, page = list(page_items), 1
+    # Bez watermarku (první dotaz profilu) se mezera nehledá - vše je stejně "nové".
+    while known_watermark_id and len(page_items) >= per_page and page < MAX_CATCHUP_PAGES and not any(is_known(i) for i in page_items):
+        page += 1
+        logger.info("Profil '%s': Všech %d položek je nových - možná mezera, stahuji stranu %d.", profile_name, len(page_items), page, profile=profile_name)
+        page_items = fetch_catalog_items(session, group, rate_limiter, group["plan"].page(per_page, page)[0], circuit_breaker=circuit_breaker)
+        if not page_items:
+            break
+        api_items_raw.extend(page_items)
+
+    if page > 1: # Mezi stránkami se výpis mohl posunout - odstraníme duplicity
+        unique_ids, deduplicated = set(), []
+        for item_data_raw in api_items_raw:
+            item_id = item_data_raw.get("id")
+            if item_id in unique_ids: continue
+            unique_ids.add(item_id); deduplicated.append(item_data_raw)
+        api_items_raw = deduplicated
+
+    arrivals_count = sum(1 for i in api_items_raw if isinstance(i.get("id"), int) and i["id"] > known_watermark_id) if known_watermark_id else None
+    next_per_page = _next_per_page(per_page, arrivals_count, page)
+    if next_per_page != per_page:
+        logger.debug("Profil '%s': per_page %d -> %d (nových od minula: %s, stran: %d).", profile_name, per_page, next_per_page, arrivals_count, page)
+    for runtime_state in runtime_states:
+        runtime_state["per_page"] = next_per_page
+    return api_items_raw
+
+
+def reset_query_state(profile_config: dict):
+    """Zapomene watermark, per_page a otisk odpovědi profilu - po změně jeho dotazu nebo filtrů (seen_ids zůstávají)."""
+    runtime_state = get_runtime_state(profile_config)
+    for key in ("watermark_ts", "watermark_id", "per_page", FINGERPRINT_STATE_KEY):
+        runtime_state.pop(key, None)
+
+
+def evict_seen_ids_below_window(group: dict, api_items_raw: list):
+    """Zahodí ze seen_ids profilů skupiny ID starší než nejstarší položka okna newest_first.
+
+    Taková položka se do výpisu vrátí jen výjimečně (po smazání novějších), proto
+    SeenIdSet vždy ponechává SEEN_IDS_KEEP_MIN nejnovějších ID. Pro jiné řazení
+    než newest_first se nic nezahazuje.
+    """
+    if group["api_params"].get("order") != "newest_first":
+        return
+    item_ids = [i.get("id") for i in api_items_raw if isinstance(i.get("id"), int)]
+    if not item_ids:
+        return
+    floor_id = min(item_ids)
+    for profile_config in group["profiles"]:
+        seen_ids = profile_config.get("seen_ids")
+        if isinstance(seen_ids, SeenIdSet):
+            evicted_count = seen_ids.evict_below(floor_id, SEEN_IDS_KEEP_MIN)
+            if evicted_count:
+                logger.debug("Profil '%s': %d starých ID (pod %s) odstraněno ze seen_ids, zbývá %d.", profile_config.get('name', 'N/A'), evicted_count, floor_id, len(seen_ids))
+
+
+def fetch_new_items_for_group(session, group: dict, rate_limiter=None, keyword_matcher=None, circuit_breaker=None) -> list:
+    """Jeden request pro skupinu profilů se stejným dotazem; výsledky se rozdělí jednotlivým profilům.
+
+    Vrací seznam dvojic (profile_config, (new_items_strings, new_items_data_list, ids_to_mark_as_seen));
+    když se dotaz nepodařil (vyčerpané pokusy, otevřený jistič), je místo trojice None.
+    """
+    profile_name = get_group_label(group)
+    empty_results = [(profile_config, ([], [], set())) for profile_config in group["profiles"]]
+
+    group_profiles = group["profiles"]
+    fingerprint = {}
+    api_items_raw = fetch_catalog_pages(session, group, rate_limiter, fingerprint, circuit_breaker)
+    if api_items_raw is None:
+        return [(profile_config, None) for profile_config in group_profiles]
+    if isinstance(api_items_raw, UnchangedResponse):
+        logger.info("Profil '%s': Odpověď API se od minula nezměnila (%s), položky se nezpracovávají.", profile_name, api_items_raw.reason, profile=profile_name, unchanged=api_items_raw.reason)
+        inc_per_profile(RESPONSES_UNCHANGED, group, reason=api_items_raw.reason)
+        store_group_fingerprint(group_profiles, fingerprint)
+        return empty_results
+    if not api_items_raw:
+        logger.info("Profil '%s': API nevrátilo žádné položky pro dané filtry.", profile_name, profile=profile_name)
+        return empty_results
+
+    logger.info("Profil '%s': Nalezeno %d položek z API. Zpracovávám a řadím...", profile_name, len(api_items_raw), profile=profile_name, api_items=len(api_items_raw))
+
+    runtime_states = [get_runtime_state(p) for p in group_profiles]
+    watermark_ts = min((rs.get("watermark_ts") or 0) for rs in runtime_states)
+    watermark_id = min((rs.get("watermark_id") or 0) for rs in runtime_states)
+    newest_ts, newest_id = watermark_ts, watermark_id
+    skipped_seen_count, old_seen_streak = 0, 0
+
+    sorted_candidates = []
+    for item_index, item_data_raw_loop in enumerate(api_items_raw):
+        raw_item_id = item_data_raw_loop.get("id")
+        cheap_ts = get_cheap_item_timestamp(item_data_raw_loop)
+        if isinstance(raw_item_id, int): newest_id = max(newest_id, raw_item_id)
+        if cheap_ts: newest_ts = max(newest_ts, cheap_ts)
+
+        if raw_item_id and all(raw_item_id in p.get("seen_ids", ()) for p in group_profiles):
+            # Položka je viděná všemi profily skupiny - plné zpracování by nemělo žádný efekt.
+            skipped_seen_count += 1
+            is_clearly_older = (watermark_ts and cheap_ts is not None and cheap_ts < watermark_ts - WATERMARK_SAFETY_MARGIN_SECONDS
+                                and isinstance(raw_item_id, int) and raw_item_id < watermark_id)
+            old_seen_streak = old_seen_streak + 1 if is_clearly_older else 0
+            if old_seen_streak >= WATERMARK_STOP_AFTER_OLD_ITEMS:
+                skipped_seen_count += len(api_items_raw) - item_index - 1
+                logger.debug("Profil '%s': Pod watermarkem (%s, ID %s) - zbylých %d položek se přeskakuje.", profile_name, watermark_ts, watermark_id, len(api_items_raw) - item_index - 1)
+                break
+            continue
+        old_seen_streak = 0
+
+        if raw_item_id:
+            sorted_candidates.append(resolve_item_timestamp(item_data_raw_loop) + (item_data_raw_loop,))
+
+    for runtime_state in runtime_states:
+        runtime_state["watermark_ts"] = max(runtime_state.get("watermark_ts") or 0, newest_ts)
+        runtime_state["watermark_id"] = max(runtime_state.get("watermark_id") or 0, newest_id)
+    if skipped_seen_count:
+        logger.debug("Profil '%s': %d již viděných položek přeskočeno bez zpracování.", profile_name, skipped_seen_count)
+    inc_per_profile(ITEMS_PARSED, group, len(sorted_candidates))
+    evict_seen_ids_below_window(group, api_items_raw)
+    
+    if logger.debug_enabled and sorted_candidates:
+        logger.debug("Profil '%s': Prvních 5 položek PŘED lokálním řazením (ID: TS - Titulek):", profile_name)
+        for i, (ts_debug, source_debug, raw_debug) in enumerate(sorted_candidates[:5]):
+            logger.debug("  %d. %s: %s (%s) - %.40s", i + 1, raw_debug.get('id'), ts_debug, source_debug, raw_debug.get('title', 'N/A'))
+
+    sorted_candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+    
+    if logger.debug_enabled and sorted_candidates:
+        logger.debug("Profil '%s': Prvních 5 položek PO lokálním řazení (ID: TS - Titulek):", profile_name)
+        for i, (ts_debug, source_debug, raw_debug) in enumerate(sorted_candidates[:5]):
+            logger.debug("  %d. %s: %s (%s) - %.40s", i + 1, raw_debug.get('id'), ts_debug, source_debug, raw_debug.get('title', 'N/A'))
+
+    profile_results = select_new_items(sorted_candidates, group_profiles, len(api_items_raw), keyword_matcher, group["base_url"])
+    group["pending_fingerprint"] = fingerprint # Uloží se až commit_group_fingerprint po zpracování výsledků
+    return list(zip(group_profiles, profile_results))
+
+
+def commit_group_fingerprint(group: dict):
+    """Uloží otisk odpovědi skupiny, když volající zpracoval výsledky všech jejích profilů.
+
+    Při chybě zpracování se otisk neukládá - příští dotaz by jinak stejný seznam ID přeskočil jako nezměněný a nálezy by se ztratily.
+    """
+    fingerprint = group.pop("pending_fingerprint", None)
+    if fingerprint is not None:
+        store_group_fingerprint(group["profiles"], fingerprint)
+
+
+def fetch_new_items(session, profile_config, rate_limiter=None, keyword_matcher=None, circuit_breaker=None):
+    groups = group_profiles_by_query([profile_config])
+    if not groups:
+        return [], [], set()
+    profile_results = fetch_new_items_for_group(session, groups[0], rate_limiter, keyword_matcher, circuit_breaker)[0][1]
+    commit_group_fingerprint(groups[0])
+    return profile_results if profile_results is not None else ([], [], set())
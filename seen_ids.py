@@ -0,0 +1,113 @@
+import logging
+from array import array
+from bisect import bisect_left
+from itertools import chain
+from typing import Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Kolik nejnovějších ID profilu se ponechá vždy, i když jsou pod spodní hranicí okna API.
+# Okno newest_first je nejvýše PER_PAGE_STEPS[-1] * MAX_CATCHUP_PAGES položek (96 * 5),
+# rezerva pokrývá položky, které se do okna vrátí po prodeji/smazání novějších.
+SEEN_IDS_KEEP_MIN = 1000
+
+
+class SeenIdSet:
+    """Množina viděných ID položek v seřazeném poli array('q') (8 bajtů na ID).
+
+    Nová ID se nejdřív sbírají v malé množině a do pole se slévají dávkově, dotaz
+    na přítomnost je O(1) v dávce nebo O(log n) bisekcí v poli. Nečíselná ID
+    (nemělo by se stávat) zůstávají trvale v množině.
+    """
+
+    __slots__ = ("_ids", "_pending", "_unsaved")
+
+    MERGE_THRESHOLD = 256
+
+    def __init__(self, ids: Iterable = ()):
+        self._ids = array("q")
+        self._pending: set = set()
+        self._unsaved: list = []
+        self.update(ids)
+        self._merge()
+        self._unsaved = [] # Počáteční ID jsou už uložená
+
+    def __contains__(self, item_id) -> bool:
+        if item_id in self._pending:
+            return True
+        if type(item_id) is not int:
+            return False
+        ids = self._ids
+        index = bisect_left(ids, item_id)
+        return index < len(ids) and ids[index] == item_id
+
+    def add(self, item_id):
+        if item_id in self:
+            return
+        self._pending.add(item_id)
+        self._unsaved.append(item_id)
+        if len(self._pending) >= self.MERGE_THRESHOLD:
+            self._merge()
+
+    def update(self, item_ids: Iterable):
+        for item_id in item_ids:
+            self.add(item_id)
+
+    def _merge(self):
+        new_ids = [i for i in self._pending if type(i) is int]
+        if not new_ids:
+            return
+        # Pole je seřazené, takže sorted() (Timsort) jen slévá dva běhy.
+        self._ids = array("q", sorted(chain(self._ids, new_ids)))
+        self._pending.difference_update(new_ids)
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._pending)
+
+    def __iter__(self) -> Iterator:
+        self._merge()
+        yield from self._ids
+        yield from self._pending
+
+    def __repr__(self) -> str:
+        return f"SeenIdSet({len(self)} ID)"
+
+    def evict_below(self, floor_id: int, keep_min: int = SEEN_IDS_KEEP_MIN) -> int:
+        """Zahodí ID menší než floor_id, ale vždy ponechá alespoň keep_min nejnovějších. Vrací počet zahozených."""
+        self._merge()
+        cut = min(bisect_left(self._ids, floor_id), max(0, len(self._ids) - keep_min))
+        if cut > 0:
+            del self._ids[:cut]
+        return cut
+
+    def to_list(self) -> list:
+        """Seřazený seznam pro uložení do JSON (stejný formát jako dřív sorted(set))."""
+        self._merge()
+        return self._ids.tolist() + sorted(self._pending, key=str)
+
+    def unsaved_ids(self) -> list:
+        """ID přidaná od posledního uložení (pro žurnál stavu profilů)."""
+        return list(self._unsaved)
+
+    def mark_saved(self):
+        self._unsaved = []
+
+    @property
+    def nbytes(self) -> int:
+        return self._ids.itemsize * len(self._ids)
+
+
+def ensure_seen_id_set(profile_config: dict) -> SeenIdSet:
+    """Vrátí seen_ids profilu jako SeenIdSet (seznam nebo set z JSON/UI převede)."""
+    seen_ids = profile_config.get("seen_ids")
+    if not isinstance(seen_ids, SeenIdSet):
+        seen_ids = profile_config["seen_ids"] = SeenIdSet(seen_ids if isinstance(seen_ids, (list, set, tuple)) else ())
+    return seen_ids
+
+
+def seen_ids_for_json(seen_ids) -> list:
+    if isinstance(seen_ids, SeenIdSet):
+        return seen_ids.to_list()
+    if isinstance(seen_ids, set):
+        return sorted(seen_ids)
+    return seen_ids if isinstance(seen_ids, list) else []
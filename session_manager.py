@@ -0,0 +1,195 @@
+"""Vinted session pro scraping: zahřátí nové session na pozadí, atomická výměna a cookies na disku.
+
+Scraper si session bere přes SessionManager.session před každým dotazem, takže výměna za nově
+zahřátou session je jen přepsání atributu - rozběhnuté requesty dobíhají na staré session,
+která se zavře až při další výměně. Cookies zahřáté session se ukládají i s platností do
+SESSION_COOKIES_FILENAME, po restartu se session obnoví z nich bez načítání HTML stránek.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from json_codec import load_file, dump_file, DECODE_ERRORS
+from proxy_pool import ProxyPool, proxy_label
+from scraper import get_vinted_session, restore_vinted_session
+
+logger = logging.getLogger(__name__)
+
+SESSION_COOKIES_FILENAME = "vinted_session_cookies.json"
+DEFAULT_COOKIE_MAX_AGE_SECONDS = 6 * 3600 # Platnost uložených cookies bez vlastní expirace (session cookies)
+COOKIE_EXPIRY_MARGIN_SECONDS = 300        # Cookies, kterým zbývá méně, se už neobnovují
+AUTH_FAILURE_THRESHOLD = 3                # Tolik 401/403 ...
+AUTH_FAILURE_WINDOW_SECONDS = 120         # ... během této doby = předčasné zahřátí nové session
+
+
+def session_cookie_record(session, max_age_seconds: float) -> Dict[str, Any]:
+    """Cookies session pro uložení; expires_at = nejbližší expirace cookie, nejvýše now + max_age_seconds."""
+    now = time.time()
+    cookies = [{"name": c.name, "value": c.value, "domain": c.domain, "path": c.path, "expires": c.expires, "secure": bool(c.secure)}
+               for c in session.cookies if not c.expires or c.expires > now]
+    expiries = [c["expires"] for c in cookies if c["expires"]]
+    return {
+        "saved_at": int(now),
+        "expires_at": int(min(expiries + [now + max_age_seconds])),
+        "user_agent": session.headers.get("User-Agent"),
+        "cookies": cookies,
+    }
+
+
+def load_cookie_records(filepath: str = SESSION_COOKIES_FILENAME) -> Dict[str, Any]:
+    if not os.path.exists(filepath):
+        return {}
+    try:
+        records = load_file(filepath)
+        return records if isinstance(records, dict) else {}
+    except (IOError, *DECODE_ERRORS) as e:
+        logger.warning(f"Nepodařilo se načíst uložené cookies z '{filepath}': {e}")
+        return {}
+
+
+def save_cookie_record(key: str, record: Dict[str, Any], filepath: str = SESSION_COOKIES_FILENAME):
+    """Zapíše cookies jedné session (klíč = direct / označení proxy) přes dočasný soubor, čitelný jen pro vlastníka."""
+    records = load_cookie_records(filepath)
+    records[key] = record
+    temp_filepath = filepath + ".tmp"
+    try:
+        dump_file(records, temp_filepath, indent=2)
+        os.chmod(temp_filepath, 0o600)
+        os.replace(temp_filepath, filepath)
+    except OSError as e:
+        logger.warning(f"Nepodařilo se uložit cookies session do '{filepath}': {e}")
+
+
+def load_valid_cookie_record(key: str, filepath: str = SESSION_COOKIES_FILENAME) -> Optional[Dict[str, Any]]:
+    record = load_cookie_records(filepath).get(key)
+    if not isinstance(record, dict) or not record.get("cookies"):
+        return None
+    if record.get("expires_at", 0) - COOKIE_EXPIRY_MARGIN_SECONDS <= time.time():
+        return None
+    return record
+
+
+class SessionManager:
+    """Drží aktuální session (nebo ProxyPool, když je proxies_config seznam) a obnovuje ji na pozadí.
+
+    cookie_max_age_seconds <= 0 vypne ukládání i obnovu cookies z disku.
+    """
+
+    def __init__(self, manual_cookie: str = "", proxies_config=None, requests_per_minute: float = 30, quarantine_seconds: float = 300,
+                 cookie_max_age_seconds: float = DEFAULT_COOKIE_MAX_AGE_SECONDS, cookies_filepath: str = SESSION_COOKIES_FILENAME):
+        self.manual_cookie = manual_cookie
+        self.proxies_config = proxies_config
+        self.requests_per_minute = requests_per_minute
+        self.quarantine_seconds = quarantine_seconds
+        self.cookie_max_age_seconds = cookie_max_age_seconds
+        self.cookies_filepath = cookies_filepath
+        self._session = None
+        self._retired_sessions = []
+        self._auth_failures = deque()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._starting = False
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        return self._session
+
+    @property
+    def refreshing(self) -> bool:
+        return self._refresh_thread is not None and self._refresh_thread.is_alive()
+
+    def _create_session(self, proxies: Optional[dict], track_auth_failures: bool):
+        """Při startu zkusí session obnovit z uložených cookies, jinak (a při každé obnově) ji zahřeje."""
+        persist = self.cookie_max_age_seconds and self.cookie_max_age_seconds > 0
+        key = proxy_label(proxies) if proxies else "direct"
+        session = None
+        if persist and self._starting:
+            record = load_valid_cookie_record(key, self.cookies_filepath)
+            if record:
+                session = restore_vinted_session(record, manual_cookie=self.manual_cookie, proxies=proxies)
+                logger.info(f"Session ({key}) obnovena z uložených cookies (platné do {time.strftime('%Y-%m-%d %H:%M', time.localtime(record['expires_at']))}), zahřívání přeskočeno.")
+        if session is None:
+            session = get_vinted_session(manual_cookie=self.manual_cookie, proxies=proxies)
+            if session is not None and persist:
+                save_cookie_record(key, session_cookie_record(session, self.cookie_max_age_seconds), self.cookies_filepath)
+        if session is not None and track_auth_failures:
+            session.hooks["response"].append(self._on_response)
+        return session
+
+    def start(self) -> bool:
+        """Připraví první session (synchronně - bez ní nelze začít). Vrací False, pokud se nepodařila."""
+        self._starting = True
+        try:
+            if isinstance(self.proxies_config, list):
+                pool = ProxyPool(self.proxies_config, lambda proxies: self._create_session(proxies, track_auth_failures=False),
+                                 requests_per_minute=self.requests_per_minute, quarantine_seconds=self.quarantine_seconds)
+                self._session = pool if pool.warm_up() else None
+            else:
+                self._session = self._create_session(self.proxies_config, track_auth_failures=True)
+        finally:
+            self._starting = False
+        return self._session is not None
+
+    def set_requests_per_minute(self, requests_per_minute: float):
+        """Nové tempo pro proxy z poolu (bez poolu tempo řídí HostRateLimiter v main)."""
+        self.requests_per_minute = requests_per_minute
+        if isinstance(self._session, ProxyPool):
+            self._session.set_requests_per_minute(requests_per_minute)
+
+    def request_refresh(self, reason: str) -> bool:
+        """Spustí zahřátí nové session na pozadí; False, pokud už jedno běží."""
+        with self._lock:
+            if self.refreshing:
+                return False
+            self._refresh_thread = threading.Thread(target=self._refresh, args=(reason,), name="session-prewarm", daemon=True)
+            self._refresh_thread.start()
+        return True
+
+    def _refresh(self, reason: str):
+        started_at = time.monotonic()
+        logger.info(f"Zahřívám novou Vinted session na pozadí ({reason})...")
+        if isinstance(self._session, ProxyPool):
+            self._session.refresh_sessions() # Pool vyměňuje session každé proxy sám
+            return
+        new_session = self._create_session(self.proxies_config, track_auth_failures=True)
+        if new_session is None:
+            logger.error("Novou Vinted session se nepodařilo zahřát, pokračuji se stávající.")
+            return
+        with self._lock:
+            old_session, self._session = self._session, new_session
+            retired_sessions, self._retired_sessions = self._retired_sessions, [old_session] if old_session is not None else []
+            self._auth_failures.clear()
+        for retired_session in retired_sessions:
+            retired_session.close()
+        logger.info(f"Nová Vinted session vyměněna za běhu (zahřátí {time.monotonic() - started_at:.1f}s).")
+
+    def _on_response(self, response, *args, **kwargs):
+        if response.status_code in (401, 403):
+            self.report_auth_failure()
+
+    def report_auth_failure(self):
+        """Započte 401/403; při AUTH_FAILURE_THRESHOLD během AUTH_FAILURE_WINDOW_SECONDS zahřeje novou session hned."""
+        now = time.monotonic()
+        with self._lock:
+            self._auth_failures.append(now)
+            while now - self._auth_failures[0] > AUTH_FAILURE_WINDOW_SECONDS:
+                self._auth_failures.popleft()
+            clustered = len(self._auth_failures) >= AUTH_FAILURE_THRESHOLD
+            if clustered:
+                self._auth_failures.clear()
+        if clustered and self.request_refresh(f"{AUTH_FAILURE_THRESHOLD}x 401/403 za {AUTH_FAILURE_WINDOW_SECONDS}s"):
+            logger.warning("Opakované 401/403 - session se obnovuje předčasně.")
+
+    def wait_for_refresh(self, timeout: float = None):
+        thread = self._refresh_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def close(self):
+        self.wait_for_refresh(timeout=30)
+        for old_session in self._retired_sessions + ([self._session] if self._session is not None else []):
+            old_session.close()
+        self._retired_sessions, self._session = [], None
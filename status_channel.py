@@ -0,0 +1,120 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from json_codec import loads, dumps_bytes, DECODE_ERRORS
+
+logger = logging.getLogger(__name__)
+
+STATUS_CHANNEL_FILENAME = "scraper_status.mmap"
+STATUS_RECORD_SIZE = 4096
+HEARTBEAT_INTERVAL_SECONDS = 5.0
+# Po kolika intervalech bez heartbeatu se backend považuje za neběžící (pád, kill -9).
+HEARTBEAT_STALE_AFTER_INTERVALS = 3
+
+# Hlavička záznamu: magic, verze formátu, sekvence (seqlock - lichá = probíhá zápis),
+# PID, čas heartbeatu, délka JSON payloadu. Za hlavičkou následuje JSON.
+_HEADER = struct.Struct("<4sIQIdI")
+_MAGIC = b"VSST"
+_FORMAT_VERSION = 1
+_MAX_PAYLOAD = STATUS_RECORD_SIZE - _HEADER.size
+_MAX_FIELD_CHARS = 200 # Delší textová pole se při přetečení záznamu zkrátí (např. popisek sloučené skupiny profilů)
+_MINIMAL_FIELDS = ("phase", "message", "cycle", "updated_at", "next_poll_at")
+
+
+def _shorten(value: str) -> str:
+    return value if len(value) <= _MAX_FIELD_CHARS else value[:_MAX_FIELD_CHARS - 1] + "…"
+
+
+class StatusPublisher:
+    """Backend zapisuje stav (fáze, profil, trvání cyklu, příští dotaz) do malého mmap záznamu.
+
+    Zápis je jen kopie do paměti (bez open/truncate souboru), heartbeat obnovuje
+    vlákno na pozadí i během dlouhých pauz mezi cykly.
+    """
+
+    def __init__(self, filepath: str = STATUS_CHANNEL_FILENAME):
+        self.filepath = filepath
+        self._fields: Dict[str, Any] = {}
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        with open(filepath, "a+b") as f:
+            f.truncate(STATUS_RECORD_SIZE)
+        self._file = open(filepath, "r+b")
+        self._mmap = mmap.mmap(self._file.fileno(), STATUS_RECORD_SIZE)
+
+    def start(self):
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="status-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+
+    def publish(self, **fields):
+        """Aktualizuje zadaná pole (ostatní zůstávají) a zapíše záznam."""
+        with self._lock:
+            self._fields.update(fields)
+            self._fields["updated_at"] = time.time()
+            self._write()
+
+    def _heartbeat_loop(self):
+        while not self._stop_event.wait(HEARTBEAT_INTERVAL_SECONDS):
+            with self._lock:
+                self._write()
+
+    def _write(self):
+        payload = dumps_bytes(self._fields)
+        if len(payload) > _MAX_PAYLOAD: # Zkrácený JSON by byl nečitelný - zkracují se hodnoty, ne zakódované bajty
+            shortened = {k: _shorten(v) if isinstance(v, str) else v for k, v in self._fields.items()}
+            payload = dumps_bytes(shortened)
+            if len(payload) > _MAX_PAYLOAD: # Nevejde se ani tak - jen minimální platný záznam
+                payload = dumps_bytes({k: shortened[k] for k in _MINIMAL_FIELDS if k in shortened})
+        self._sequence += 1 # Liché - čtenář ví, že zápis probíhá
+        self._mmap[:_HEADER.size] = _HEADER.pack(_MAGIC, _FORMAT_VERSION, self._sequence, os.getpid(), time.time(), 0)
+        self._mmap[_HEADER.size:_HEADER.size + len(payload)] = payload
+        self._sequence += 1
+        self._mmap[:_HEADER.size] = _HEADER.pack(_MAGIC, _FORMAT_VERSION, self._sequence, os.getpid(), time.time(), len(payload))
+
+    def close(self, final_phase: str = "stopped"):
+        self._stop_event.set()
+        if self._heartbeat_thread:
+            self._heartbeat_thread.join(timeout=2)
+        try:
+            self.publish(phase=final_phase)
+            self._mmap.close()
+            self._file.close()
+        except (ValueError, OSError) as e:
+            logger.debug(f"Status kanál: chyba při zavírání: {e}")
+
+
+def read_status(filepath: str = STATUS_CHANNEL_FILENAME, retries: int = 5) -> Optional[Dict[str, Any]]:
+    """Přečte poslední stav backendu (pro UI). Vrací None, pokud záznam neexistuje nebo je nečitelný.
+
+    Do výsledku doplní pid, heartbeat_at a alive (heartbeat není starší než
+    HEARTBEAT_STALE_AFTER_INTERVALS intervalů a backend nehlásí fázi "stopped").
+    """
+    try:
+        with open(filepath, "rb") as f:
+            if os.fstat(f.fileno()).st_size < STATUS_RECORD_SIZE:
+                return None
+            with mmap.mmap(f.fileno(), STATUS_RECORD_SIZE, access=mmap.ACCESS_READ) as record:
+                for _ in range(retries):
+                    magic, version, sequence, pid, heartbeat_at, payload_length = _HEADER.unpack(record[:_HEADER.size])
+                    if magic != _MAGIC or version != _FORMAT_VERSION:
+                        return None
+                    if sequence % 2:
+                        time.sleep(0.001); continue
+                    payload = record[_HEADER.size:_HEADER.size + payload_length]
+                    if _HEADER.unpack(record[:_HEADER.size])[2] != sequence: # Mezitím přepsáno
+                        continue
+                    status = loads(payload) if payload_length else {}
+                    status.update(pid=pid, heartbeat_at=heartbeat_at)
+                    status["alive"] = (status.get("phase") != "stopped"
+                                       and time.time() - heartbeat_at < HEARTBEAT_INTERVAL_SECONDS * HEARTBEAT_STALE_AFTER_INTERVALS)
+                    return status
+    except DECODE_ERRORS + (OSError, ValueError, struct.error) as e:
+        logger.debug(f"Status kanál: nelze přečíst '{filepath}': {e}")
+    return None
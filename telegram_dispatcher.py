@@ -0,0 +1,271 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+
+import requests
+
+from utils import HostRateLimiter
+from json_codec import loads, dumps_line, DECODE_ERRORS
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_OUTBOX_FILENAME = "telegram_outbox.jsonl"
+TELEGRAM_API_HOST = "api.telegram.org"
+TELEGRAM_PER_CHAT_MESSAGES_PER_MINUTE = 55 # Telegram: cca 1 zpráva/s do jednoho chatu
+TELEGRAM_GLOBAL_MESSAGES_PER_MINUTE = 25 * 60 # Telegram: cca 30 zpráv/s na bota
+DIGEST_MAX_ITEMS_PER_MESSAGE = 10 # Také limit sendMediaGroup
+MAX_SEND_ATTEMPTS = 5
+
+MARKDOWN_V2_SPECIAL_CHARS = "_*[]()~`>#+-=|{}.!\\"
+
+
+def escape_markdown_v2(text) -> str:
+    return "".join("\\" + ch if ch in MARKDOWN_V2_SPECIAL_CHARS else ch for ch in str(text))
+
+
+def format_telegram_message(item_details: dict, profile_name: str) -> str:
+    """Formátuje zprávu pro Telegram s MarkdownV2."""
+    title = item_details.get('title', 'N/A').replace("-", "\\-").replace(".", "\\.").replace("!", "\\!").replace("(", "\\(").replace(")", "\\)") # Escapování pro MarkdownV2
+    price_num = item_details.get('price_numeric')
+    currency = item_details.get('currency', 'CZK')
+    url = item_details.get('url', '#')
+
+    price_str = "N/A"
+    if price_num is not None:
+        price_str = f"{price_num:,.0f}".replace(",", " ") + f" {currency}"
+    else:
+        price_str = f"{item_details.get('price_str', 'N/A')} {currency}"
+
+    message = (
+        f"🔥 *Nový Nález \\- Profil: {profile_name.replace('-', '\\-')}*\n\n"
+        f"*{title}*\n"
+        f"Cena: *{price_str}*\n"
+        f"Stav: {item_details.get('status', 'N/A')}\n"
+        f"Velikost: {item_details.get('size', 'N/A')}\n"
+        f"Značka: {item_details.get('brand', 'N/A')}\n\n"
+        f"[Odkaz na Vinted]({url})"
+    )
+    return message
+
+
+def _format_digest_price(item_details: dict) -> str:
+    price_num = item_details.get('price_numeric')
+    currency = item_details.get('currency', 'CZK')
+    if price_num is not None:
+        return f"{price_num:,.0f}".replace(",", " ") + f" {currency}"
+    return f"{item_details.get('price_str', 'N/A')} {currency}"
+
+
+def format_telegram_digest(finds: List[tuple], part: int = 1, parts: int = 1) -> str:
+    """Souhrnná MarkdownV2 zpráva pro více nálezů (seznam dvojic (item_details, profile_name))."""
+    header = f"🔥 *{len(finds)} nových nálezů*"
+    if parts > 1: header += escape_markdown_v2(f" ({part}/{parts})")
+    lines = [header, ""]
+    for item_details, profile_name in finds:
+        lines.append(
+            f"• [{escape_markdown_v2(item_details.get('title', 'N/A'))}]({item_details.get('url', '#')}) "
+            f"– *{escape_markdown_v2(_format_digest_price(item_details))}* – _{escape_markdown_v2(profile_name)}_"
+        )
+    return "\n".join(lines)
+
+
+def send_telegram_request(bot_token: str, method: str, payload: dict, timeout: float = 15):
+    """Zavolá metodu Bot API. Vrací (stav, retry_after): stav je "ok", "retry" nebo "failed"."""
+    api_url = f"https://{TELEGRAM_API_HOST}/bot{bot_token}/{method}"
+    try:
+        response = requests.post(api_url, json=payload, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"Síťová chyba při odesílání Telegram notifikace: {e}")
+        return "retry", None
+    if response.status_code == 200:
+        logger.debug(f"Odpověď Telegram API: {response.text[:300]}")
+        return "ok", None
+    retry_after = None
+    try:
+        retry_after = loads(response.content).get("parameters", {}).get("retry_after")
+    except DECODE_ERRORS:
+        pass
+    if response.status_code == 429 or response.status_code >= 500:
+        logger.warning(f"Telegram API vrátilo {response.status_code}" + (f", retry_after={retry_after}s." if retry_after else "."))
+        return "retry", retry_after
+    logger.error(f"Telegram API odmítlo zprávu ({response.status_code}): {response.text[:300]}")
+    return "failed", None
+
+
+class TelegramDispatcher:
+    """Odesílání Telegram notifikací na pozadí.
+
+    Zprávy se nejdřív zapíší do trvalé fronty (outbox JSONL, potvrzení se připisují jako
+    {"ack": id}), takže po pádu/restartu se neodeslané zprávy odešlou znovu. Každý chat má
+    vlastní pracovní vlákno s tempem podle limitu Telegramu; různé chaty se obsluhují paralelně
+    a společně dodržují globální limit bota. Odpověď 429 s retry_after se respektuje.
+
+    V režimu digest se nálezy jednoho cyklu sbírají a flush_digest() je odešle jako několik
+    souhrnných zpráv (případně media group s fotkami).
+    """
+
+    def __init__(self, bot_token: str, chat_id: str, outbox_path: str = TELEGRAM_OUTBOX_FILENAME,
+                 digest_mode: bool = False, digest_media_groups: bool = False):
+        self.bot_token = bot_token
+        self.chat_id = str(chat_id)
+        self.outbox_path = outbox_path
+        self.digest_mode = digest_mode
+        self.digest_media_groups = digest_media_groups
+        self._chat_limiter = HostRateLimiter(TELEGRAM_PER_CHAT_MESSAGES_PER_MINUTE, jitter_ratio=0)
+        self._global_limiter = HostRateLimiter(TELEGRAM_GLOBAL_MESSAGES_PER_MINUTE, jitter_ratio=0)
+        self._chat_queues: Dict[str, queue.Queue] = {}
+        self._workers: List[threading.Thread] = []
+        self._outbox_lock = threading.Lock()
+        self._digest_buffer: List[tuple] = []
+        self._pending_count = 0
+        self._stop_event = threading.Event()
+
+    # --- Trvalá fronta ---
+
+    def _append_outbox(self, record: Dict[str, Any]):
+        with self._outbox_lock:
+            try:
+                with open(self.outbox_path, "ab") as f:
+                    f.write(dumps_line(record))
+            except IOError as e:
+                logger.error(f"Chyba při zápisu do Telegram outboxu '{self.outbox_path}': {e}")
+
+    def _ack(self, message_id: str):
+        self._append_outbox({"ack": message_id})
+        with self._outbox_lock:
+            self._pending_count -= 1
+            all_sent = self._pending_count <= 0
+        if all_sent:
+            self._compact_outbox()
+
+    def _compact_outbox(self):
+        """Přepíše outbox jen s nepotvrzenými zprávami (atomicky přes dočasný soubor)."""
+        with self._outbox_lock:
+            pending = self._read_pending_records()
+            temp_filepath = self.outbox_path + ".tmp"
+            try:
+                with open(temp_filepath, "wb") as f:
+                    f.write(b"".join(dumps_line(record) for record in pending))
+                os.replace(temp_filepath, self.outbox_path)
+            except IOError as e:
+                logger.warning(f"Nepodařilo se zkompaktovat Telegram outbox: {e}")
+            return pending
+
+    def _read_pending_records(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.outbox_path):
+            return []
+        records, acked = {}, set()
+        with open(self.outbox_path, "rb") as f:
+            for line in f:
+                try: record = loads(line)
+                except DECODE_ERRORS: continue
+                if "ack" in record: acked.add(record["ack"])
+                elif "id" in record: records[record["id"]] = record
+        return [r for message_id, r in records.items() if message_id not in acked]
+
+    # --- Veřejné API ---
+
+    def start(self):
+        pending = self._compact_outbox()
+        if pending:
+            logger.info(f"Telegram: {len(pending)} neodeslaných zpráv z předchozího běhu bude odesláno.")
+        for record in pending:
+            self._pending_count += 1
+            self._route(record)
+
+    def stop(self, timeout: float = 10):
+        """Počká na odeslání fronty (max. timeout) a ukončí vlákna. Neodeslané zprávy zůstanou v outboxu."""
+        self.flush_digest()
+        deadline = time.monotonic() + timeout
+        for chat_queue in self._chat_queues.values():
+            while chat_queue.unfinished_tasks and time.monotonic() < deadline:
+                time.sleep(0.1)
+        self._stop_event.set()
+        for chat_queue in self._chat_queues.values():
+            chat_queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=max(0.1, deadline - time.monotonic()))
+
+    def enqueue(self, item_details: dict, profile_name: str, chat_id: Optional[str] = None):
+        """Zařadí nález k odeslání a okamžitě se vrátí."""
+        if self.digest_mode:
+            self._digest_buffer.append((item_details, profile_name))
+            return
+        self._submit({"method": "sendMessage", "chat_id": str(chat_id or self.chat_id),
+                      "payload": {"text": format_telegram_message(item_details, profile_name), "parse_mode": "MarkdownV2"}})
+
+    def flush_digest(self):
+        """Odešle nálezy nasbírané v režimu digest (volá se na konci cyklu)."""
+        if not self._digest_buffer:
+            return
+        finds, self._digest_buffer = self._digest_buffer, []
+        chunks = [finds[i:i + DIGEST_MAX_ITEMS_PER_MESSAGE] for i in range(0, len(finds), DIGEST_MAX_ITEMS_PER_MESSAGE)]
+        for part, chunk in enumerate(chunks, start=1):
+            photos = [(item, profile) for item, profile in chunk if item.get("photo_url")]
+            if self.digest_media_groups and len(photos) >= 2:
+                media = [{"type": "photo", "media": item["photo_url"], "parse_mode": "MarkdownV2",
+                          "caption": format_telegram_digest([(item, profile)])} for item, profile in photos]
+                self._submit({"method": "sendMediaGroup", "chat_id": self.chat_id, "payload": {"media": media}})
+                chunk = [f for f in chunk if not f[0].get("photo_url")]
+                if not chunk: continue
+            self._submit({"method": "sendMessage", "chat_id": self.chat_id,
+                          "payload": {"text": format_telegram_digest(chunk, part, len(chunks)), "parse_mode": "MarkdownV2",
+                                      "disable_web_page_preview": True}})
+        logger.info(f"Telegram digest: {len(finds)} nálezů zařazeno k odeslání v {len(chunks)} zprávách.")
+
+    # --- Odesílání ---
+
+    def _submit(self, record: Dict[str, Any]):
+        record["id"] = uuid.uuid4().hex
+        record["created"] = time.time()
+        self._append_outbox(record)
+        with self._outbox_lock:
+            self._pending_count += 1
+        self._route(record)
+
+    def _route(self, record: Dict[str, Any]):
+        chat_id = record["chat_id"]
+        chat_queue = self._chat_queues.get(chat_id)
+        if chat_queue is None:
+            chat_queue = self._chat_queues[chat_id] = queue.Queue()
+            worker = threading.Thread(target=self._chat_worker, args=(chat_id, chat_queue), name=f"telegram-{chat_id}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+        chat_queue.put(record)
+
+    def _chat_worker(self, chat_id: str, chat_queue: queue.Queue):
+        while True:
+            record = chat_queue.get()
+            if record is None:
+                chat_queue.task_done()
+                return
+            try:
+                self._deliver(chat_id, record)
+            except Exception as e:
+                logger.error(f"Neočekávaná chyba při odesílání Telegram notifikace: {e}", exc_info=True)
+            finally:
+                chat_queue.task_done()
+
+    def _deliver(self, chat_id: str, record: Dict[str, Any]):
+        payload = dict(record["payload"], chat_id=chat_id)
+        for attempt in range(MAX_SEND_ATTEMPTS):
+            if self._stop_event.is_set():
+                return # Zůstává v outboxu pro příští běh
+            self._chat_limiter.acquire(chat_id)
+            self._global_limiter.acquire(TELEGRAM_API_HOST)
+            status, retry_after = send_telegram_request(self.bot_token, record["method"], payload)
+            if status == "ok":
+                logger.info(f"Telegram notifikace odeslána na chat ID {chat_id}.")
+                self._ack(record["id"])
+                return
+            if status == "failed":
+                self._ack(record["id"])
+                return
+            delay = float(retry_after) if retry_after else min(60.0, 2.0 * (2 ** attempt))
+            self._stop_event.wait(delay)
+        logger.error(f"Telegram notifikaci se nepodařilo odeslat ani po {MAX_SEND_ATTEMPTS} pokusech, zahazuji.")
+        self._ack(record["id"])
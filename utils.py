@@ -2,8 +2,11 @@ import random
 import time
 import re 
 import logging
+import threading
 from urllib.parse import urlparse, parse_qs, urlunparse
 
+from metrics import BACKOFF_SECONDS
+
 logger = logging.getLogger(__name__)
 
 USER_AGENTS = [
@@ -112,5 +115,61 @@ def build_api_params_from_url(vinted_url: str, profile_name: str) -> tuple[str,
 
 def exponential_backoff_sleep(attempt, base_delay=4, max_delay=240, context="API"):
     delay = min(max_delay, base_delay * (1.8 ** attempt)) + random.uniform(0.5, 2.0)
+    BACKOFF_SECONDS.inc(delay)
     logger.info(f"    ⏳ {context} chyba/omezení. Opakuji pokus za {delay:.2f} sekund (pokus č. {attempt + 1})...")
-    time.sleep(delay)
\ No newline at end of file
+    time.sleep(delay)
+
+
+def tail_lines(filepath: str, max_lines: int = 100, block_size: int = 8192) -> list:
+    """Posledních max_lines řádků souboru; čte po blocích od konce, takže nezáleží na velikosti souboru."""
+    with open(filepath, "rb") as f:
+        f.seek(0, 2)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= max_lines:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+    lines = data.decode("utf-8", errors="replace").splitlines(keepends=True)
+    return lines[-max_lines:] if max_lines > 0 else []
+
+
+class HostRateLimiter:
+    """Globální rozpočet requestů na host, sdílený všemi profily (i napříč vlákny).
+
+    Nahrazuje slepé pauzy mezi profily: každý request si rezervuje další volný
+    slot pro daný host a případně počká, dokud slot nenastane.
+    """
+
+    def __init__(self, requests_per_minute: float, jitter_ratio: float = 0.25):
+        self.set_rate(requests_per_minute)
+        self.jitter_ratio = max(0.0, jitter_ratio)
+        self._next_slot: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def set_rate(self, requests_per_minute: float):
+        """Změna rozpočtu za běhu; už rezervované sloty platí, nový interval se použije od další rezervace."""
+        self.min_interval = 60.0 / requests_per_minute if requests_per_minute and requests_per_minute > 0 else 0.0
+
+    def reserve(self, host: str) -> float:
+        """Rezervuje slot pro host a vrátí, kolik sekund je třeba počkat."""
+        if self.min_interval <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            interval = self.min_interval * (1 + random.uniform(0, self.jitter_ratio))
+            self._next_slot[host] = slot + interval
+            return slot - now
+
+    def delay_until_free(self, host: str) -> float:
+        """Kolik sekund zbývá do volného slotu pro host, bez rezervace."""
+        with self._lock:
+            return max(0.0, self._next_slot.get(host, 0.0) - time.monotonic())
+
+    def acquire(self, host: str):
+        delay = self.reserve(host)
+        if delay > 0:
+            logger.debug(f"Rate limiter: čekám {delay:.2f}s na volný slot pro host '{host}'.")
+            time.sleep(delay)
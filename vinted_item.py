@@ -0,0 +1,144 @@
+import logging
+from typing import Any, Dict
+
+from json_codec import MAPPING_TYPES
+
+logger = logging.getLogger(__name__)
+
+# Pořadí klíčů záznamu nálezu v new_finds.jsonl (dřívější dict z extract_item_details).
+ITEM_RECORD_KEYS = (
+    "id", "title", "price_numeric", "price_str", "currency", "status", "size", "brand",
+    "url", "photo_url", "vinted_item_timestamp", "_timestamp_source",
+)
+_ATTRIBUTE_BY_KEY = dict(zip(ITEM_RECORD_KEYS, (
+    "id", "title", "price_numeric", "price_str", "currency", "status", "size", "brand",
+    "url", "photo_url", "vinted_item_timestamp", "timestamp_source",
+)))
+
+
+class VintedItem:
+    """Položka katalogu, která prošla kontrolou seen_ids a klíčových slov.
+
+    Hned jsou k dispozici jen ID, titulek a timestamp (ty potřebuje řazení a filtrování);
+    cena, URL, fotka a text pro výpis se z odpovědi API dopočítají až při prvním přístupu.
+    get() funguje jako u dřívějšího slovníku, takže Telegram a výpisy čtou položku stejně.
+    """
+
+    __slots__ = ("id", "title", "vinted_item_timestamp", "timestamp_source", "_raw", "_base_url", "_price", "_url", "_display")
+
+    def __init__(self, item_data_raw, base_url_for_item_url: str, vinted_item_timestamp: int, timestamp_source: str):
+        self.id = item_data_raw.get("id", "N/A")
+        self.title = item_data_raw.get("title", "N/A")
+        self.vinted_item_timestamp = vinted_item_timestamp
+        self.timestamp_source = timestamp_source
+        self._raw = item_data_raw
+        self._base_url = base_url_for_item_url
+        self._price = None
+        self._url = None
+        self._display = None
+
+    def __repr__(self) -> str:
+        return f"VintedItem({self.id!r}, {self.title[:30]!r})"
+
+    def _parsed_price(self) -> tuple:
+        if self._price is None:
+            price_amount_str, currency_str = "N/A", self._raw.get("currency", "CZK")
+            price_obj = self._raw.get("price")
+            if isinstance(price_obj, str): price_amount_str = price_obj
+            elif isinstance(price_obj, MAPPING_TYPES):
+                price_amount_str = price_obj.get("amount", "N/A")
+                currency_str = price_obj.get("currency", price_obj.get("currency_code", currency_str))
+            try: price_numeric = float(price_amount_str)
+            except (ValueError, TypeError): price_numeric = None
+            self._price = (price_numeric, price_amount_str, currency_str)
+        return self._price
+
+    @property
+    def price_numeric(self):
+        return self._parsed_price()[0]
+
+    @property
+    def price_str(self):
+        return self._parsed_price()[1]
+
+    @property
+    def currency(self):
+        return self._parsed_price()[2]
+
+    @property
+    def status(self):
+        return self._raw.get("status", "N/A")
+
+    @property
+    def size(self):
+        return self._raw.get("size_title", "N/A")
+
+    @property
+    def brand(self):
+        return self._raw.get("brand_title", "N/A")
+
+    @property
+    def url(self) -> str:
+        if self._url is None:
+            url_path = self._raw.get("url", "")
+            self._url = self._base_url + url_path if url_path and not url_path.startswith("http") else url_path or "N/A"
+        return self._url
+
+    @property
+    def photo_url(self):
+        photo_data = self._raw.get("photo")
+        if not isinstance(photo_data, MAPPING_TYPES):
+            return None
+        photo_url = photo_data.get("url")
+        high_res_photo = photo_data.get("high_resolution")
+        if not photo_url and isinstance(high_res_photo, MAPPING_TYPES):
+            photo_url = high_res_photo.get("url")
+        return photo_url
+
+    @property
+    def display(self) -> str:
+        """Řádek pro log / výpis (format_item_for_display), spočítaný jednou pro všechny profily."""
+        if self._display is None:
+            self._display = format_item_for_display(self)
+        return self._display
+
+    def get(self, key: str, default: Any = None) -> Any:
+        attribute = _ATTRIBUTE_BY_KEY.get(key)
+        return getattr(self, attribute) if attribute is not None else default
+
+    def __getitem__(self, key: str) -> Any:
+        attribute = _ATTRIBUTE_BY_KEY.get(key)
+        if attribute is None:
+            raise KeyError(key)
+        return getattr(self, attribute)
+
+    def to_record(self, **extra_fields) -> Dict[str, Any]:
+        """Slovník pro úložiště nálezů - stejné klíče a pořadí jako dřív, extra_fields se připojí na konec."""
+        record = {key: getattr(self, attribute) for key, attribute in _ATTRIBUTE_BY_KEY.items()}
+        record.update(extra_fields)
+        return record
+
+
+def format_item_for_display(item_details_dict) -> str:
+    title = item_details_dict.get('title', 'N/A')
+    price_numeric = item_details_dict.get('price_numeric')
+    currency = item_details_dict.get('currency', 'CZK')
+
+    if price_numeric is not None:
+        formatted_price = f"{price_numeric:,.0f}".replace(",", " ") + f" {currency}"
+    else:
+        formatted_price = f"{item_details_dict.get('price_str', 'N/A')} {currency}"
+
+    status = item_details_dict.get('status', 'N/A')
+    size = item_details_dict.get('size', 'N/A')
+    brand = item_details_dict.get('brand', 'N/A')
+    full_url = item_details_dict.get('url', 'N/A')
+
+    details_parts = []
+    if status and status != 'N/A': details_parts.append(f"Stav: {status}")
+    if size and size != 'N/A': details_parts.append(f"Velikost: {size}")
+    if brand and brand != 'N/A' and brand.lower() not in title.lower():
+        details_parts.append(f"Značka: {brand}")
+
+    details_output_str = " – ".join(filter(None, details_parts))
+    return f"[🆕] {title} – {formatted_price} – {details_output_str}\n     {full_url}"